@@ -0,0 +1,52 @@
+"""
+Compare the time taken to clean URLs by the reference implementation of the differential tests,
+the interpreted Cleaner and the Cleaner running generated code (backend="generated").
+
+Usage: python3 external/benchmark_codegen.py [number_of_urls]
+"""
+import os
+import sys
+import time
+
+from unalix import Cleaner
+
+# The reference implementation and corpus of the differential tests
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests"))
+
+import url_cleaner_reference
+
+total = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+urls = url_cleaner_reference.generate_urls(count=total)
+
+def measure(name, function, urls):
+    # Compile the regexes first
+    for url in urls[:1000]:
+        function(url)
+
+    start = time.perf_counter()
+
+    for url in urls:
+        function(url)
+
+    elapsed = time.perf_counter() - start
+
+    print(f"{name:<28} {elapsed:8.2f} s {len(urls) / elapsed:12,.0f} URLs/s")
+
+for backend in ("interpreted", "generated"):
+    start = time.perf_counter()
+
+    cleaner = Cleaner(backend=backend)
+    cleaner.ensure_built()
+
+    print(f"{f'build ({backend})':<28} {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+print()
+
+# The reference implementation is much slower, so it only gets a part of the URLs
+measure("reference loop", url_cleaner_reference.clear_url, urls[:total // 20])
+
+for options in ({}, {"stripEmpty": True, "stripDuplicates": True}):
+    for backend in ("interpreted", "generated"):
+        cleaner = Cleaner(backend=backend, **options)
+        measure(f"{backend}{' (strip)' if options else ''}", cleaner.clear, urls)
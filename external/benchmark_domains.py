@@ -0,0 +1,59 @@
+"""
+Compare types.Domains lookups with a linear scan of the same domains, using large allowlists.
+
+Usage: python3 external/benchmark_domains.py [number_of_domains]
+"""
+import sys
+import time
+
+from unalix import types
+
+total = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+names = [f"{'.' if index % 2 else ''}site{index}.example{index % 100}.com" for index in range(total)]
+
+def linear_match(domains, domain):
+    domain = domain.lower().strip(".")
+
+    for name in domains:
+        name = name.lower()
+
+        if name.startswith("."):
+            if domain == name[1:] or domain.endswith(name):
+                return True
+        elif domain == name:
+            return True
+
+    return False
+
+def measure(name, function, repeat):
+    start = time.perf_counter()
+
+    for _ in range(repeat):
+        function()
+
+    elapsed = time.perf_counter() - start
+
+    print(f"{name:<40} {elapsed / repeat * 1000000:14,.2f} us")
+
+# The quadratic build only gets a fraction of the domains, or it would take minutes
+partial = names[:min(total, 10000)]
+
+def build_list():
+    # What add_domain() used to do: a linear membership test for each new domain
+    domains = []
+
+    for name in partial:
+        if name not in domains:
+            domains.append(name)
+
+measure(f"build list ({len(partial):,} domains)", build_list, 1)
+measure(f"build Domains ({len(partial):,} domains)", lambda: types.Domains(partial), 10)
+measure(f"build Domains ({total:,} domains)", lambda: types.Domains(names), 3)
+
+domains = types.Domains(names)
+allowlist = list(domains)
+
+for domain in (f"site{total - 2}.example{(total - 2) % 100}.com", f"www.site{total - 1}.example{(total - 1) % 100}.com", "unknown.example.org"):
+    measure(f"linear scan {domain}", lambda: linear_match(allowlist, domain), 3)
+    measure(f"Domains.match {domain}", lambda: domains.match(domain), 100000)
@@ -0,0 +1,112 @@
+"""
+Compare unalix.clean_ndjson() and unalix.clean_csv() with the naive approach of decoding each record,
+calling unalix.clear_url() on the field and encoding the record again.
+
+Usage: python3 external/benchmark_records.py [number_of_records]
+"""
+import csv
+import io
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+import unalix
+
+total = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+urls = [
+    "https://deezer.com/track/891177062?utm_source=deezer",
+    "https://natura.com.br/p/2458?consultoria=promotop",
+    "https://www.amazon.com/dp/B08L5TNJHG?tag=affiliate-20&ref_=nav",
+    "https://example.com/articles/{}?utm_medium=social&page=2",
+    "https://www.google.com/url?q=https://pypi.org/project/Unalix&sa=D"
+]
+
+generator = random.Random(0)
+
+def make_record(index):
+    return {
+        "id": index,
+        "timestamp": "2021-06-01T12:00:00Z",
+        "user": {"name": f"user{index}", "agent": "Mozilla/5.0 (X11; Linux x86_64)", "tags": ["a", "b", "c"]},
+        "url": generator.choice(urls).format(index),
+        "payload": {"values": [generator.random() for _ in range(8)], "text": "lorem ipsum " * 8}
+    }
+
+def ndjson_lines():
+    for index in range(total):
+        yield json.dumps(make_record(index)) + "\n"
+
+def csv_lines():
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["id", "timestamp", "name", "url", "text"])
+
+    for index in range(total):
+        record = make_record(index)
+        writer.writerow([index, record["timestamp"], record["user"]["name"], record["url"], record["payload"]["text"]])
+
+    buffer.seek(0)
+
+    return buffer.readlines()
+
+def naive_ndjson(lines):
+    for line in lines:
+        record = json.loads(line)
+        record["url"] = unalix.clear_url(record["url"])
+        yield json.dumps(record) + "\n"
+
+def naive_csv(lines):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    reader = csv.reader(lines)
+
+    writer.writerow(next(reader))
+
+    for row in reader:
+        row[3] = unalix.clear_url(row[3])
+        writer.writerow(row)
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate()
+
+def measure(name, function, lines):
+    start = time.perf_counter()
+
+    for line in function(lines):
+        pass
+
+    elapsed = time.perf_counter() - start
+
+    print(f"{name:<28} {elapsed:8.2f} s {total / elapsed:12,.0f} records/s")
+
+def measure_memory(name, function, lines):
+    tracemalloc.start()
+
+    for line in function(lines):
+        pass
+
+    current, peak = tracemalloc.get_traced_memory()
+
+    tracemalloc.stop()
+
+    print(f"{name:<28} {peak / 1024:10,.0f} KiB peak")
+
+# Warm up (rulesets are loaded on first use)
+unalix.clear_url(urls[0])
+
+ndjson = list(ndjson_lines())
+
+measure("naive json + clear_url", naive_ndjson, ndjson)
+measure("unalix.clean_ndjson", lambda lines: unalix.clean_ndjson(lines, ["url"]), ndjson)
+
+
+rows = csv_lines()
+
+measure("naive csv + clear_url", naive_csv, rows)
+measure("unalix.clean_csv", lambda lines: unalix.clean_csv(lines, ["url"]), rows)
+
+# Memory used while streaming records that are generated on the fly (it does not grow with the number of records)
+measure_memory("unalix.clean_ndjson", lambda lines: unalix.clean_ndjson(lines, ["url"]), ndjson_lines())
@@ -0,0 +1,55 @@
+"""
+Measure the memory used by the loaded rulesets and the cost of common operations on them.
+
+Usage: python3 external/benchmark_rulesets_memory.py
+"""
+import gc
+import time
+import tracemalloc
+
+from unalix import config
+from unalix.core import coreutils
+
+def load():
+    return coreutils.rulesets_from_files(config.PATH_RULESETS, ignored_providers=config.IGNORED_PROVIDERS)
+
+def measure(name, function, repeat):
+    start = time.perf_counter()
+
+    for _ in range(repeat):
+        function()
+
+    elapsed = time.perf_counter() - start
+
+    print(f"{name:<36} {elapsed / repeat * 1000000:10.2f} us")
+
+# Modules and caches used while loading are not part of the footprint
+load()
+gc.collect()
+
+tracemalloc.start()
+
+rulesets = load()
+
+gc.collect()
+loaded, peak = tracemalloc.get_traced_memory()
+
+for ruleset in rulesets.iter():
+    for patterns in (ruleset.rules, ruleset.rawRules, ruleset.referralMarketing, ruleset.exceptions, ruleset.redirections):
+        for pattern in patterns.iter():
+            pattern.compiled
+
+gc.collect()
+compiled, peak = tracemalloc.get_traced_memory()
+
+tracemalloc.stop()
+
+print(f"{'loaded rulesets':<36} {loaded / 1024:10,.0f} KiB")
+print(f"{'loaded rulesets (regexes compiled)':<36} {compiled / 1024:10,.0f} KiB")
+
+ruleset = max(rulesets.iter(), key=lambda ruleset: len(ruleset.rules))
+
+measure("dict(ruleset)", lambda: dict(ruleset), 10000)
+measure("repr(ruleset)", lambda: repr(ruleset), 10000)
+measure("pattern in ruleset.rules", lambda: "utm_source" in ruleset.rules, 100000)
+measure("str(rulesets)", lambda: str(rulesets), 10)
@@ -0,0 +1,64 @@
+"""
+Report what coreutils.optimize_rulesets() does to the bundled rulesets, and compare the time taken
+to clean URLs with and without it.
+
+Usage: python3 external/benchmark_rulesets_optimizer.py [number_of_urls]
+"""
+import os
+import sys
+import time
+
+from unalix import config, Cleaner
+from unalix.core import coreutils
+
+# The corpus of the differential tests
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests"))
+
+import url_cleaner_reference
+
+total = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+urls = url_cleaner_reference.generate_urls(count=total)
+
+def load(optimize):
+    return coreutils.rulesets_from_files(config.PATH_RULESETS, ignored_providers=config.IGNORED_PROVIDERS, optimize=optimize)
+
+def measure(name, function, repeat):
+    start = time.perf_counter()
+
+    for _ in range(repeat):
+        function()
+
+    elapsed = (time.perf_counter() - start) / repeat
+
+    print(f"{name:<28} {elapsed * 1000:10.2f} ms")
+
+statistics = coreutils.optimize_rulesets(load(optimize=False))
+
+print(f"{'':<28} {'before':>10} {'after':>10}")
+
+for name, (before, after) in statistics.items():
+    print(f"{name:<28} {before:10,} {after:10,}")
+
+print()
+
+measure("load (optimize=False)", lambda: load(optimize=False), 5)
+measure("load (optimize=True)", lambda: load(optimize=True), 5)
+
+print()
+
+for optimize in (False, True):
+    cleaner = Cleaner(rulesets=load(optimize=optimize))
+
+    # Compile the regexes first
+    for url in urls:
+        cleaner.clear(url)
+
+    start = time.perf_counter()
+
+    for url in urls:
+        cleaner.clear(url)
+
+    elapsed = time.perf_counter() - start
+
+    print(f"{f'clear (optimize={optimize})':<28} {elapsed:10.2f} s {total / elapsed:12,.0f} URLs/s")
@@ -77,6 +77,11 @@ setuptools.setup(
     packages=setuptools.find_packages(),
     include_package_data=True,
     package_data=package_data,
+    entry_points={
+        "console_scripts": [
+            "unalix = unalix.__main__:main"
+        ]
+    },
     classifiers=classifiers,
     python_requires=">=3.6",
 )
@@ -0,0 +1,172 @@
+import asyncio
+import http.client
+
+import pytest
+
+import unalix
+from unalix.core import async_http
+
+hostname = "127.0.0.1"
+
+RESPONSES = {
+    b"/redirect": (
+        b"HTTP/1.1 301 Moved Permanently\r\n"
+        b"Location: /chunked?utm_source=127.0.0.1\r\n"
+        b"Content-Length: 5\r\n"
+        b"\r\n"
+        b"moved"
+    ),
+    b"/chunked": (
+        b"HTTP/1.1 302 Found\r\n"
+        b"location: /ok\r\n"
+        b"Transfer-Encoding: chunked\r\n"
+        b"\r\n"
+        b"5;name=value\r\nmoved\r\n0\r\nExpires: 0\r\n\r\n"
+    ),
+    b"/ok": (
+        b"HTTP/1.1 200 OK\r\n"
+        b"Content-Length: 2\r\n"
+        b"\r\n"
+        b"ok"
+    ),
+    b"/close": (
+        b"HTTP/1.1 301 Moved Permanently\r\n"
+        b"Location: /ok\r\n"
+        b"Connection: close\r\n"
+        b"\r\n"
+    )
+}
+
+
+async def start_server(connections, heads=None):
+
+    async def handle(reader, writer):
+        connections.append(writer)
+
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError:
+                break
+
+            if heads is not None:
+                heads.append(head)
+
+            response = RESPONSES[head.split(b" ")[1]]
+            writer.write(response)
+
+            if b"Connection: close" in response:
+                break
+
+        writer.close()
+        await writer.wait_closed()
+
+    server = await asyncio.start_server(handle, hostname, 0)
+
+    return (server, f"http://{hostname}:{server.sockets[0].getsockname()[1]}")
+
+
+def test_head_parser():
+
+    data = (
+        b"HTTP/1.1 301 Moved Permanently\r\n"
+        b"Location: https://example.com/\r\n"
+        b"X-Folded: a\r\n"
+        b"  b\r\n"
+        b"\r\n"
+        b"body"
+    )
+
+    # Any split of the data gives the same result
+    for size in (1, 7, len(data)):
+        parser = async_http.HeadParser()
+
+        pieces = [data[index:index + size] for index in range(0, len(data), size)]
+
+        while not parser.feed(pieces.pop(0)):
+            pass
+
+        assert (parser.http_version, parser.status_code, parser.status_message) == (1.1, 301, "Moved Permanently")
+        assert parser.headers()["location"] == "https://example.com/"
+        assert parser.headers()["X-Folded"] == "a b"
+        assert parser.rest + b"".join(pieces) == b"body"
+
+    with pytest.raises(http.client.LineTooLong):
+        async_http.HeadParser(max_size=64).feed(b"HTTP/1.1 200 OK\r\nX-Large: " + b"a" * 64)
+
+    with pytest.raises(http.client.HTTPException):
+        async_http.HeadParser(max_headers=1).feed(b"HTTP/1.1 200 OK\r\nA: 1\r\nB: 2\r\n\r\n")
+
+    with pytest.raises(http.client.BadStatusLine):
+        async_http.HeadParser().feed(b"SSH-2.0-OpenSSH\r\n")
+
+
+def test_aunshort_url_keep_alive():
+
+    event_loop = asyncio.new_event_loop()
+
+    async def main():
+        connections = []
+        server, base_url = await start_server(connections)
+
+        # Both redirects go through the same connection, which is closed before returning
+        assert await unalix.aunshort_url(f"{base_url}/redirect") == f"{base_url}/ok"
+        assert len(connections) == 1
+
+        # The server sees the connection closed by the client
+        await asyncio.sleep(0.1)
+        assert connections[0].transport.is_closing()
+
+        async with unalix.AsyncConnectionPool() as pool:
+            for _ in range(3):
+                assert await unalix.aunshort_url(f"{base_url}/redirect", pool=pool) == f"{base_url}/ok"
+
+            assert len(connections) == 2
+            assert pool.pool_info().idle == 1
+
+            # The server closes this connection, so the redirect needs a new one
+            assert await unalix.aunshort_url(f"{base_url}/close", pool=pool) == f"{base_url}/ok"
+            assert len(connections) == 3
+
+        assert pool.pool_info().connections == 0
+
+        # No connection is left open by the client
+        await asyncio.sleep(0.1)
+        assert all(writer.transport.is_closing() for writer in connections)
+
+        server.close()
+        await server.wait_closed()
+
+    try:
+        event_loop.run_until_complete(main())
+    finally:
+        event_loop.close()
+
+
+def test_aunshort_url_headers():
+
+    event_loop = asyncio.new_event_loop()
+
+    async def main():
+        connections, heads = [], []
+        server, base_url = await start_server(connections, heads)
+
+        # Headers given by the caller replace the default ones, whatever their case
+        headers = {"host": "example.com", "User-Agent": "a", "user-agent": "b"}
+
+        assert await unalix.aunshort_url(f"{base_url}/ok", headers=headers) == f"{base_url}/ok"
+
+        lines = heads[0].lower().split(b"\r\n")
+
+        assert [line for line in lines if line.startswith(b"host:")] == [b"host: example.com"]
+        assert [line for line in lines if line.startswith(b"user-agent:")] == [b"user-agent: b"]
+
+        await asyncio.sleep(0.1)
+
+        server.close()
+        await server.wait_closed()
+
+    try:
+        event_loop.run_until_complete(main())
+    finally:
+        event_loop.close()
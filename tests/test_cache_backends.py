@@ -0,0 +1,194 @@
+import asyncio
+import gc
+import http.server
+import os
+import socketserver
+import threading
+import time
+import _thread as thread
+
+import pytest
+
+import unalix
+
+hostname = "127.0.0.1"
+port = 56890
+
+base_url = f"http://{hostname}:{port}"
+
+requests = []
+
+class Server(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        requests.append(self.path)
+
+        if self.path == "/ok":
+            self.send_response(200)
+        else:
+            self.send_response(301)
+            self.send_header("Location", f"{base_url}/ok")
+
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+class ThreadingServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+server = ThreadingServer((hostname, port), Server)
+
+thread.start_new_thread(server.serve_forever, ())
+
+
+@pytest.fixture(params=("memory", "sqlite"))
+def make_backend(request, tmp_path):
+
+    backends = []
+
+    def make_backend(**kwargs):
+        if request.param == "memory":
+            backend = unalix.MemoryCacheBackend(**kwargs)
+        else:
+            backend = unalix.SQLiteCacheBackend(str(tmp_path / "cache.sqlite"), **kwargs)
+
+        backends.append(backend)
+
+        return backend
+
+    yield make_backend
+
+    for backend in backends:
+        backend.close()
+
+
+def test_cache_backend(make_backend, tmp_path):
+
+    backend = make_backend(compact_interval=0)
+    now = time.time()
+
+    backend.put_many([
+        ("a", ("redirect", "https://example.com/", now + 60), now + 60),
+        ("b", ("error", ["ConnectError", "Failed"], None), now + 60),
+        ("c", ("final", True, now - 1), now - 1)
+    ])
+
+    assert backend.get_many(["a", "b", "c", "d"]) == {
+        "a": ("redirect", "https://example.com/", now + 60),
+        "b": ("error", ["ConnectError", "Failed"], None)
+    }
+    assert backend.get("c") is None
+
+    assert backend.compact() == 1
+    assert backend.compact() == 0
+
+    snapshot = str(tmp_path / "snapshot.jsonl")
+
+    assert backend.save_snapshot(snapshot) == 2
+
+    backend.clear()
+
+    assert backend.get_many(["a", "b"]) == {}
+    assert backend.load_snapshot(snapshot) == 2
+    assert backend.get("a") == ("redirect", "https://example.com/", now + 60)
+
+    assert backend.load_snapshot(str(tmp_path / "missing.jsonl")) == 0
+
+
+def test_background_compaction(make_backend):
+
+    backend = make_backend(compact_interval=0.05)
+
+    backend.put("a", ("final", False, 0), time.time() + 0.05)
+    backend.put("b", ("final", False, 0), time.time() + 60)
+
+    time.sleep(0.3)
+
+    assert [key for key, value, expires in backend.items()] == ["b"]
+    assert backend.compact(now=time.time() + 120) == 1
+
+
+def test_compaction_keeps_replaced_entries():
+
+    backend = unalix.MemoryCacheBackend(compact_interval=0)
+    now = time.time()
+
+    keys = [f"key {number}" for number in range(20000)]
+
+    for key in keys:
+        backend.put(key, ("final", False, 0), now - 1)
+
+    stopped = threading.Event()
+
+    def compact():
+        while not stopped.is_set():
+            backend.compact(now=now)
+
+    compactor = threading.Thread(target=compact)
+    compactor.start()
+
+    # Expired entries replaced by fresh ones while compacting are kept
+    try:
+        for key in keys:
+            backend.put(key, ("final", True, 0), now + 60)
+    finally:
+        stopped.set()
+        compactor.join()
+
+    assert len(backend.get_many(keys)) == len(keys)
+
+
+def test_sqlite_thread_connections(tmp_path):
+
+    with unalix.SQLiteCacheBackend(str(tmp_path / "cache.sqlite"), compact_interval=0) as backend:
+        threads = [threading.Thread(target=backend.get, args=("a",)) for _ in range(4)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        gc.collect()
+
+        # Only the connection of this thread is left
+        assert backend.connections == {backend.connect()}
+
+
+def test_shared_sqlite_cache(tmp_path):
+
+    path = str(tmp_path / "cache.sqlite")
+
+    # Each process opens its own backend on the same database
+    with unalix.SQLiteCacheBackend(path) as first, unalix.SQLiteCacheBackend(path) as second:
+        assert first.connect().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+        requests.clear()
+
+        assert unalix.unshort_url(f"{base_url}/short", cache=unalix.RedirectCache(backend=first)) == f"{base_url}/ok"
+        assert requests == ["/short", "/ok"]
+
+        event_loop = asyncio.new_event_loop()
+
+        try:
+            result = event_loop.run_until_complete(
+                unalix.aunshort_url(f"{base_url}/short", cache=unalix.RedirectCache(backend=second))
+            )
+        finally:
+            event_loop.close()
+
+        assert result == f"{base_url}/ok"
+        assert requests == ["/short", "/ok"]
+
+        # Batched lookups are split to stay within the limits of SQLite
+        keys = [f"key {number}" for number in range(2000)]
+
+        second.put_many((key, (key,), time.time() + 60) for key in keys)
+
+        assert len(first.get_many(keys + ["missing"])) == 2000
+
+    assert not os.path.exists(path + "-wal")
@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+
+import pytest
+
+from unalix import clean_csv, clean_ndjson, clear_url
+
+dirty_url = "https://deezer.com/track/891177062?utm_source=deezer"
+clean_url = "https://deezer.com/track/891177062"
+
+def test_clean_ndjson():
+
+    records = [
+        '{"id": 1,  "link": {"href": "%s", "rel": ["a"]}, "url": "%s", "text": "caf\\u00e9"}\n' % (dirty_url, dirty_url),
+        '{"url": "https:\\/\\/deezer.com\\/track\\/891177062?utm_source=deezer"}',
+        '{"id": 2, "link": 5, "url": null}\n',
+        '[1, 2]\n',
+        '   \n'
+    ]
+
+    results = list(clean_ndjson(records, ["link.href", "url"]))
+
+    # Only the cleaned values are touched; the rest of the record is kept byte for byte
+    assert results[0] == '{"id": 1,  "link": {"href": "%s", "rel": ["a"]}, "url": "%s", "text": "caf\\u00e9"}\n' % (clean_url, clean_url)
+    assert json.loads(results[1]) == {"url": clean_url}
+    assert results[2:] == records[2:]
+
+    for record, result in zip(records[:2], results):
+        expected = json.loads(record)
+
+        if "link" in expected:
+            expected["link"]["href"] = clear_url(expected["link"]["href"])
+
+        expected["url"] = clear_url(expected["url"])
+
+        assert json.loads(result) == expected
+
+    with pytest.raises(json.JSONDecodeError):
+        list(clean_ndjson(['{"id": 1 "url": "%s"}' % dirty_url], ["url"]))
+
+    # A field can't be cleaned along with fields inside it
+    for fields in (["link", "link.href"], ["link.href", "link"]):
+        with pytest.raises(ValueError):
+            list(clean_ndjson(records, fields))
+
+    assert list(clean_ndjson(records, ["url", "url"])) == list(clean_ndjson(records, ["url"]))
+
+
+def test_clean_csv():
+
+    rows = [
+        ["id", "url", "note"],
+        ["1", dirty_url, "multi\nline, \"quoted\""],
+        ["2", "https://natura.com.br/p/2458?consultoria=promotop", ""],
+        ["3", "https://example.com/?q=\"a,b\"&utm_source=x", "x"],
+        ["4", "", "no url"]
+    ]
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+
+    text = buffer.getvalue()
+
+    result = "".join(clean_csv(io.StringIO(text, newline=""), ["url"]))
+
+    assert list(csv.reader(io.StringIO(result))) == [rows[0]] + [[row[0], clear_url(row[1]), row[2]] for row in rows[1:]]
+    assert result.startswith(f"id,url,note\r\n1,{clean_url},\"multi\nline, \"\"quoted\"\"\"\r\n")
+
+    assert "".join(clean_csv(io.StringIO(text, newline=""), [1], header=False)) == result
+
+    with pytest.raises(ValueError):
+        list(clean_csv(io.StringIO(text, newline=""), ["link"]))
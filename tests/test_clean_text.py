@@ -0,0 +1,37 @@
+import random
+
+from unalix import clean_text, clean_text_stream
+from unalix.core import text_cleaner
+
+TEXT = (
+    "Listen: https://deezer.com/track/891177062?utm_source=deezer. "
+    "(see https://en.wikipedia.org/wiki/Foo_(bar)) "
+    "<a href=\"https://www.google.com/url?q=https://pypi.org/project/Unalix\">x</a> "
+    "HTTP://example.com?utm_medium=a, again https://deezer.com/track/891177062?utm_source=deezer"
+)
+
+def test_clean_text():
+
+    assert clean_text(TEXT) == (
+        "Listen: https://deezer.com/track/891177062. "
+        "(see https://en.wikipedia.org/wiki/Foo_(bar)) "
+        "<a href=\"https://pypi.org/project/Unalix\">x</a> "
+        "http://example.com, again https://deezer.com/track/891177062"
+    )
+
+    assert clean_text("no links here, just http:// and https") == "no links here, just http:// and https"
+    assert clean_text(TEXT, ignoreRules=True).startswith("Listen: https://deezer.com/track/891177062?utm_source=deezer. ")
+
+    assert text_cleaner.trim_url("https://example.com/a_(b)).") == "https://example.com/a_(b)"
+
+
+def test_clean_text_stream():
+
+    generator = random.Random(0)
+    expected = clean_text(TEXT)
+
+    for _ in range(500):
+        cuts = sorted(generator.sample(range(1, len(TEXT)), generator.randint(1, 40)))
+        chunks = [TEXT[start:end] for start, end in zip([0] + cuts, cuts + [len(TEXT)])]
+
+        assert "".join(clean_text_stream(chunks)) == expected, cuts
@@ -0,0 +1,109 @@
+import http.server
+import json
+import _thread as thread
+
+from unalix import clear_url
+from unalix.__main__ import main
+
+hostname = "127.0.0.1"
+port = 56886
+
+base_url = f"http://{hostname}:{port}"
+
+class Server(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == "/ok":
+            self.send_response(200)
+        else:
+            self.send_response(301)
+            self.send_header("Location", f"{base_url}/ok?utm_source=127.0.0.1")
+
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+server = http.server.HTTPServer((hostname, port), Server)
+
+thread.start_new_thread(server.serve_forever, ())
+
+URLS = [
+    "https://deezer.com/track/891177062?utm_source=deezer",
+    "",
+    "http://[::1",
+    "https://natura.com.br/p/2458?consultoria=promotop",
+    "https://www.google.com/url?q=https://pypi.org/project/Unalix"
+]
+
+def test_clean(tmp_path):
+
+    source = tmp_path / "urls.txt"
+    source.write_bytes(("\r\n".join(URLS * 50)).encode())
+
+    expected = "".join(f"{url if url == 'http://[::1' else clear_url(url)}\n" for url in URLS * 50)
+
+    for options in ([], ["--block-size", "64"], ["--workers", "2", "--block-size", "256"]):
+        destination = tmp_path / "cleaned.txt"
+
+        assert main(["clean", str(source), "-o", str(destination), *options]) == 1
+        assert destination.read_text() == expected
+
+    destination = tmp_path / "cleaned.txt"
+
+    assert main(["clean", "--ignore-rules", str(source), "-o", str(destination)]) == 1
+    assert destination.read_text().startswith(f"{URLS[0]}\n")
+
+
+def test_clean_records(tmp_path):
+
+    source = tmp_path / "records.ndjson"
+    source.write_text(
+        '{"id": 1, "link": {"href": "https://deezer.com/track/891177062?utm_source=deezer"}}\n'
+        '{"id": 2, "link": {"href": "https://deezer.com/track/891177062"}}\n'
+        '{"id": 3}\n'
+    )
+
+    destination = tmp_path / "cleaned.ndjson"
+
+    assert main(["clean", "--field", "link.href", str(source), "-o", str(destination)]) == 0
+
+    lines = destination.read_text().splitlines()
+
+    assert json.loads(lines[0]) == {"id": 1, "link": {"href": "https://deezer.com/track/891177062"}}
+    assert lines[1:] == ['{"id": 2, "link": {"href": "https://deezer.com/track/891177062"}}', '{"id": 3}']
+
+
+def test_clean_csv(tmp_path):
+
+    source = tmp_path / "export.csv"
+    source.write_bytes(
+        b'id,url,note\r\n' +
+        b'1,https://deezer.com/track/891177062?utm_source=deezer,"two\nlines"\r\n'
+        b'2,"https://natura.com.br/p/2458?consultoria=promotop",x\r\n' * 20
+    )
+
+    expected = (
+        b'id,url,note\r\n' +
+        b'1,https://deezer.com/track/891177062,"two\nlines"\r\n'
+        b'2,"https://natura.com.br/p/2458",x\r\n' * 20
+    )
+
+    for options in ([], ["--block-size", "16"], ["--workers", "2", "--block-size", "100"]):
+        destination = tmp_path / "cleaned.csv"
+
+        assert main(["clean", "--column", "url", str(source), "-o", str(destination), *options]) == 0
+        assert destination.read_bytes() == expected
+
+    assert main(["clean", "--column", "link", str(source), "-o", str(destination)]) == 1
+
+
+def test_unshort(tmp_path):
+
+    source = tmp_path / "urls.txt"
+    source.write_text("\n".join(f"{base_url}/redirect-{index}" for index in range(20)) + "\n\nhttp://127.0.0.1:1/\n")
+
+    destination = tmp_path / "unshortened.txt"
+
+    assert main(["unshort", "--concurrency", "4", str(source), "-o", str(destination)]) == 1
+    assert destination.read_text() == f"{base_url}/ok\n" * 20 + "\nhttp://127.0.0.1:1/\n"
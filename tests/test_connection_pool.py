@@ -0,0 +1,146 @@
+import http.client
+import http.server
+import os
+import socket
+import socketserver
+import _thread as thread
+
+import pytest
+
+import unalix
+from unalix.core import connection_pool
+
+hostname = "127.0.0.1"
+port = 56887
+
+base_url = f"http://{hostname}:{port}"
+
+connections = []
+
+class Server(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        connections.append(self.client_address)
+        super().setup()
+
+    def do_GET(self):
+        body = b""
+
+        if self.path == "/ok":
+            self.send_response(200)
+            body = b"ok"
+        else:
+            self.send_response(301)
+            self.send_header("Location", f"{base_url}/ok?utm_source=127.0.0.1")
+            body = b"moved"
+
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        # Close the connection without telling the client, like servers dropping idle connections do
+        if self.path == "/close":
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+class ThreadingServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+server = ThreadingServer((hostname, port), Server)
+
+thread.start_new_thread(server.serve_forever, ())
+
+
+def test_keep_alive():
+
+    with unalix.ConnectionPool() as pool:
+        connections.clear()
+
+        for _ in range(3):
+            assert unalix.unshort_url(f"{base_url}/redirect", pool=pool) == f"{base_url}/ok"
+
+        assert len(connections) == 1
+        assert pool.pool_info().reused == 5
+        assert pool.pool_info().idle == 1
+
+    assert pool.pool_info().connections == 0
+
+    connections.clear()
+
+    assert unalix.unshort_url(f"{base_url}/redirect", pool=False) == f"{base_url}/ok"
+    assert len(connections) == 2
+
+
+def test_stale_connection_retry(monkeypatch):
+
+    # Pretend the closed connection still looks alive, so the request is sent through it
+    monkeypatch.setattr(connection_pool, "is_dropped", lambda connection: False)
+
+    with unalix.ConnectionPool() as pool:
+        connections.clear()
+
+        assert unalix.unshort_url(f"{base_url}/close", pool=pool, max_retries=0) == f"{base_url}/ok"
+        assert unalix.unshort_url(f"{base_url}/ok", pool=pool, max_retries=0) == f"{base_url}/ok"
+
+        # The redirect to /ok went through the closed connection first, then through a new one
+        assert len(connections) == 2
+        assert pool.pool_info().reused == 2
+
+
+def test_limits():
+
+    pool = unalix.ConnectionPool(max_connections=1, max_connections_per_host=1)
+
+    connection, reused = pool.acquire("http", hostname, port, timeout=1)
+
+    assert not reused
+
+    with pytest.raises(TimeoutError):
+        pool.acquire("http", "localhost", port, timeout=0.1)
+
+    pool.release(connection)
+
+    # The idle connection of the other host is closed to make room
+    connection, reused = pool.acquire("http", "localhost", port, timeout=1)
+
+    assert not reused
+    assert pool.pool_info().connections == 1
+
+    pool.release(connection, reusable=False)
+
+    assert pool.pool_info().connections == 0
+
+
+def test_is_dropped_high_file_descriptor():
+
+    try:
+        import resource
+    except ImportError:
+        pytest.skip("needs the resource module")
+
+    soft_limit, hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+
+    if soft_limit != resource.RLIM_INFINITY and soft_limit <= 2000:
+        pytest.skip("file descriptor limit too low")
+
+    local, remote = socket.socketpair()
+
+    # select.select() rejects file descriptors from 1024 on
+    os.dup2(local.fileno(), 2000)
+    local.close()
+
+    connection = http.client.HTTPConnection("127.0.0.1")
+    connection.sock = socket.socket(fileno=2000)
+
+    try:
+        assert not connection_pool.is_dropped(connection)
+
+        remote.close()
+
+        assert connection_pool.is_dropped(connection)
+    finally:
+        connection.close()
@@ -0,0 +1,42 @@
+import http.cookiejar
+import json
+
+from unalix import types
+from unalix.core import cookie_policies
+
+
+def test_domains():
+
+    domains = types.Domains([".example.com", "example.org", "EXAMPLE.net", ".example.com"])
+
+    assert list(domains) == [".example.com", "example.org", "EXAMPLE.net"]
+    assert json.loads(str(domains)) == list(domains)
+
+    assert ".example.com" in domains
+    assert "example.com" not in domains
+    assert "example.net" in domains
+
+    for domain in ("example.com", ".example.com", "www.example.com", "a.b.example.com", "EXAMPLE.org", "example.net"):
+        assert domains.match(domain)
+
+    for domain in ("example.co", "notexample.com", "www.example.org", "com", ""):
+        assert not domains.match(domain)
+
+    domains.add_domain(".example.org")
+
+    assert domains.match("www.example.org")
+
+
+def test_cookie_strict_allow():
+
+    def make_cookie(domain):
+        return http.cookiejar.Cookie(
+            0, "name", "value", None, False, domain, True, domain.startswith("."),
+            "/", False, False, None, False, None, None, {}
+        )
+
+    policy = cookie_policies.COOKIE_STRICT_ALLOW
+
+    assert policy.set_ok(make_cookie(".aliexpress.ru"), None)
+    assert policy.set_ok(make_cookie("m.aliexpress.ru"), None)
+    assert not policy.set_ok(make_cookie(".example.com"), None)
@@ -0,0 +1,68 @@
+import json
+import os
+import subprocess
+import sys
+
+import unalix
+
+
+def run_python(code, *options):
+
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.path.dirname(os.path.dirname(unalix.__file__))
+
+    process = subprocess.run(
+        [sys.executable, *options, "-c", code],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=environment,
+        check=True,
+        universal_newlines=True
+    )
+
+    return process
+
+
+def test_import_is_lazy():
+
+    process = run_python(
+        "import json, sys, unalix; print(json.dumps(sorted(sys.modules)))"
+    )
+
+    modules = json.loads(process.stdout)
+
+    # The HTTP client, OpenSSL and the event loop are only loaded by the functions that need them
+    for module in (
+        "asyncio",
+        "ssl",
+        "http.client",
+        "http.cookiejar",
+        "unalix.core.ssl_context",
+        "unalix.core.url_unshort"
+    ):
+        assert module not in modules, module
+
+    process = run_python(
+        "import unalix; from unalix.core import url_cleaner; print(url_cleaner.get_rulesets.loaded())"
+    )
+
+    assert process.stdout.strip() == "False"
+
+
+def test_lazy_module_attributes():
+
+    from unalix.core import cookie_policies, url_cleaner, url_unshort
+
+    assert url_cleaner.rulesets is url_cleaner.get_rulesets()
+    assert cookie_policies.ALLOWED_DOMAINS is cookie_policies.get_allowed_domains()
+    assert url_unshort.body_redirects is url_unshort.get_body_redirects()
+
+    # Before Python 3.7, where modules can't define __getattr__, the names are bound on import
+    process = run_python(
+        "import sys; sys.version_info = (3, 6, 15, 'final', 0); "
+        "from unalix.core import cookie_policies, url_cleaner, url_unshort; "
+        "print(all(name in vars(module) for module, name in ("
+        "(url_cleaner, 'rulesets'), (cookie_policies, 'ALLOWED_DOMAINS'), (url_unshort, 'body_redirects'))))"
+    )
+
+    assert process.stdout.strip() == "True"
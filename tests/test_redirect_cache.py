@@ -0,0 +1,204 @@
+import asyncio
+import email.message
+import http.cookiejar
+import http.server
+import socketserver
+import ssl
+import time
+import _thread as thread
+
+import pytest
+
+import unalix
+from unalix.core import redirect_cache
+
+hostname = "127.0.0.1"
+port = 56889
+
+base_url = f"http://{hostname}:{port}"
+
+requests = []
+
+REDIRECTS = {
+    "/entry": (301, "/short", None),
+    "/short": (301, "/temporary", None),
+    "/temporary": (302, "/ok?utm_source=127.0.0.1", "Cache-Control: max-age=60"),
+    "/uncacheable": (302, "/ok", "Cache-Control: no-store"),
+    "/expired": (307, "/ok", "Expires: 0"),
+    "/loop-a": (301, "/loop-b", None),
+    "/loop-b": (301, "/loop-a", None)
+}
+
+ERRORS = {
+    "/missing": (404, "Cache-Control: max-age=3600"),
+    "/busy": (429, "Cache-Control: max-age=3600")
+}
+
+class Server(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        requests.append(self.path)
+
+        if self.path in REDIRECTS:
+            status, location, header = REDIRECTS[self.path]
+
+            self.send_response(status)
+            self.send_header("Location", f"{base_url}{location}")
+
+            if header is not None:
+                self.send_header(*header.split(": "))
+        elif self.path in ERRORS:
+            status, header = ERRORS[self.path]
+
+            self.send_response(status)
+            self.send_header(*header.split(": "))
+        else:
+            self.send_response(200)
+
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+class ThreadingServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+server = ThreadingServer((hostname, port), Server)
+
+thread.start_new_thread(server.serve_forever, ())
+
+
+def make_headers(*lines):
+
+    headers = email.message.Message()
+
+    for line in lines:
+        name, value = line.split(": ")
+        headers[name] = value
+
+    return headers
+
+
+def test_get_ttl(monkeypatch):
+
+    monkeypatch.setattr(unalix.config, "HTTP_CACHE_TTL", 10)
+    monkeypatch.setattr(unalix.config, "HTTP_CACHE_PERMANENT_TTL", 1000)
+
+    assert redirect_cache.get_ttl(301, make_headers()) == 1000
+    assert redirect_cache.get_ttl(308, make_headers()) == 1000
+    assert redirect_cache.get_ttl(302, make_headers()) == 10
+    assert redirect_cache.get_ttl(301, make_headers("Cache-Control: public, max-age=30")) == 30
+    assert redirect_cache.get_ttl(307, make_headers("Cache-Control: private, max-age=0")) is None
+    assert redirect_cache.get_ttl(301, make_headers("Cache-Control: no-store")) is None
+    assert redirect_cache.get_ttl(302, make_headers("Cache-Control: no-cache")) is None
+    assert redirect_cache.get_ttl(302, make_headers("Expires: 0")) is None
+    assert redirect_cache.get_ttl(
+        303, make_headers("Date: Wed, 21 Oct 2015 07:28:00 GMT", "Expires: Wed, 21 Oct 2015 08:28:00 GMT")
+    ) == 3600
+
+
+def test_redirect_cache():
+
+    cache = unalix.RedirectCache()
+
+    requests.clear()
+
+    assert unalix.unshort_url(f"{base_url}/short", cache=cache) == f"{base_url}/ok"
+    assert requests == ["/short", "/temporary", "/ok"]
+
+    # Results and hops are answered from the cache
+    assert unalix.unshort_url(f"{base_url}/short", cache=cache) == f"{base_url}/ok"
+    assert unalix.unshort_url(f"{base_url}/temporary", cache=cache) == f"{base_url}/ok"
+    assert requests == ["/short", "/temporary", "/ok"]
+
+    # Only the first hop of a chain ending in cached hops is requested
+    assert unalix.unshort_url(f"{base_url}/entry", cache=cache) == f"{base_url}/ok"
+    assert requests[3:] == ["/entry"]
+
+    # Cached hops count as redirects
+    with pytest.raises(unalix.TooManyRedirectsError):
+        unalix.unshort_url(f"{base_url}/short", cache=cache, max_redirects=1)
+
+    assert len(requests) == 4
+
+    # Responses that must not be stored are requested again
+    for path in ("/uncacheable", "/expired"):
+        for _ in range(2):
+            assert unalix.unshort_url(f"{base_url}{path}", cache=cache) == f"{base_url}/ok"
+
+    assert requests[4:] == ["/uncacheable", "/uncacheable", "/expired", "/expired"]
+
+    # Errors are stored too (and the loop itself is followed through the cached hops)
+    for _ in range(2):
+        with pytest.raises(unalix.TooManyRedirectsError):
+            unalix.unshort_url(f"{base_url}/loop-a", cache=cache, max_redirects=3)
+
+    assert requests[8:] == ["/loop-a", "/loop-b"]
+
+    # The cache is shared with aunshort_url()
+    event_loop = asyncio.new_event_loop()
+
+    try:
+        assert event_loop.run_until_complete(unalix.aunshort_url(f"{base_url}/short", cache=cache)) == f"{base_url}/ok"
+        assert event_loop.run_until_complete(unalix.aunshort_url(f"{base_url}/temporary", cache=cache)) == f"{base_url}/ok"
+    finally:
+        event_loop.close()
+
+    assert len(requests) == 10
+
+    # Caching is disabled by default
+    assert unalix.unshort_url(f"{base_url}/short") == f"{base_url}/ok"
+    assert len(requests) == 13
+
+    # Entries are not shared with calls using other headers or SSL contexts, and errors are not
+    # replayed to them
+    headers = dict(unalix.config.HTTP_HEADERS, Accept="text/html")
+
+    assert unalix.unshort_url(f"{base_url}/short", cache=cache, headers=headers) == f"{base_url}/ok"
+    assert unalix.unshort_url(f"{base_url}/short", cache=cache, headers=headers) == f"{base_url}/ok"
+    assert len(requests) == 16
+
+    with pytest.raises(unalix.TooManyRedirectsError):
+        unalix.unshort_url(f"{base_url}/loop-a", cache=cache, max_redirects=3, context=unalix.SSL_CONTEXT_UNVERIFIED)
+
+    assert requests[16:] == ["/loop-a", "/loop-b"]
+
+    # Custom SSL contexts and cookie jars skip the cache
+    context = ssl.create_default_context()
+
+    for _ in range(2):
+        assert unalix.unshort_url(f"{base_url}/short", cache=cache, context=context) == f"{base_url}/ok"
+        assert unalix.unshort_url(f"{base_url}/short", cache=cache, cookies=http.cookiejar.CookieJar()) == f"{base_url}/ok"
+
+    assert len(requests) == 30
+
+
+def test_redirect_cache_errors():
+
+    cache = unalix.RedirectCache()
+
+    requests.clear()
+
+    # Client errors are only kept for a short time, and statuses that are retried are never kept
+    for _ in range(2):
+        assert unalix.unshort_url(f"{base_url}/missing", cache=cache) == f"{base_url}/missing"
+        assert unalix.unshort_url(f"{base_url}/busy", cache=cache) == f"{base_url}/busy"
+
+    assert requests == ["/missing", "/busy", "/busy"]
+
+    deadline = time.time() + unalix.config.HTTP_CACHE_NEGATIVE_TTL
+
+    assert all(expires <= deadline for key, value, expires in cache.backend.items())
+
+    # Entries are not shared with calls using other cookie policies, and custom ones skip the cache
+    policy = http.cookiejar.DefaultCookiePolicy()
+
+    for _ in range(2):
+        assert unalix.unshort_url(f"{base_url}/short", cache=cache) == f"{base_url}/ok"
+        assert unalix.unshort_url(f"{base_url}/short", cache=cache, cookies_policy=unalix.COOKIE_REJECT_ALL) == f"{base_url}/ok"
+        assert unalix.unshort_url(f"{base_url}/short", cache=cache, cookies_policy=policy) == f"{base_url}/ok"
+
+    assert len(requests) == 3 + 3 + 3 + 3 + 3
@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from unalix import config
+from unalix.config import paths
+from unalix.core import coreutils
+
+
+def test_rulesets_snapshot(tmp_path):
+
+    directory = str(tmp_path / "cache")
+
+    built = coreutils.rulesets_from_snapshot(config.PATH_RULESETS, ignored_providers=config.IGNORED_PROVIDERS, directory=directory)
+    snapshots = os.listdir(directory)
+
+    assert len(snapshots) == 1
+
+    loaded = coreutils.rulesets_from_snapshot(config.PATH_RULESETS, ignored_providers=config.IGNORED_PROVIDERS, directory=directory)
+
+    assert loaded is not built
+    assert repr(loaded) == repr(built)
+    assert loaded.host_index.labels == built.host_index.labels
+    assert loaded.host_index.fallback == built.host_index.fallback
+
+    for loaded_ruleset, built_ruleset in zip(loaded.iter(), built.iter()):
+        assert repr(loaded_ruleset.rulesFilters) == repr(built_ruleset.rulesFilters)
+        assert repr(loaded_ruleset.referralMarketingFilters) == repr(built_ruleset.referralMarketingFilters)
+
+        for pattern in loaded_ruleset.rules.iter():
+            assert pattern.compiled.pattern.startswith("(%(?:26|23)|&|^)")
+
+    # Changing the content of a ruleset file invalidates the snapshot
+    paths = []
+
+    for index, path in enumerate(config.PATH_RULESETS):
+        copy = str(tmp_path / f"{index}.json")
+        shutil.copyfile(path, copy)
+        paths.append(copy)
+
+    assert coreutils.rulesets_snapshot_key(paths) == coreutils.rulesets_snapshot_key(config.PATH_RULESETS)
+
+    with open(file=paths[-1], mode="a") as file:
+        file.write("\n")
+
+    assert coreutils.rulesets_snapshot_key(paths) != coreutils.rulesets_snapshot_key(config.PATH_RULESETS)
+
+    # Corrupted snapshots are rebuilt
+    with open(file=os.path.join(directory, snapshots[0]), mode="wb") as file:
+        file.write(b"garbage")
+
+    # Snapshots of other keys are deleted when a new one is written, unless they were used recently
+    # or belong to another interpreter
+    tag = coreutils.interpreter_tag()
+    month_ago = time.time() - 30 * 24 * 3600
+
+    for name, used in (
+        (f"rulesets-{tag}-stale.pickle", month_ago),
+        (f"rulesets-{tag}-recent.pickle", time.time()),
+        ("rulesets-otherpython-99-stale.pickle", month_ago)
+    ):
+        path = os.path.join(directory, name)
+
+        with open(file=path, mode="wb") as file:
+            file.write(b"snapshot")
+
+        os.utime(path, (used, used))
+
+    rebuilt = coreutils.rulesets_from_snapshot(config.PATH_RULESETS, ignored_providers=config.IGNORED_PROVIDERS, directory=directory)
+
+    assert repr(rebuilt) == repr(built)
+    assert sorted(os.listdir(directory)) == sorted(snapshots + [f"rulesets-{tag}-recent.pickle", "rulesets-otherpython-99-stale.pickle"])
+
+    # Loading a snapshot marks it as used, without changing its modification time
+    path = os.path.join(directory, snapshots[0])
+    os.utime(path, (month_ago, month_ago))
+
+    coreutils.rulesets_from_snapshot(config.PATH_RULESETS, ignored_providers=config.IGNORED_PROVIDERS, directory=directory)
+
+    assert os.stat(path).st_atime > month_ago
+    assert os.stat(path).st_mtime == month_ago
+
+
+def test_cache_directory(monkeypatch):
+
+    monkeypatch.setenv("XDG_CACHE_HOME", "relative")
+    monkeypatch.setattr(os.path, "expanduser", lambda path: path)
+
+    # The home directory couldn't be determined
+    assert paths.get_cache_home() == tempfile.gettempdir()
+
+    monkeypatch.setenv("XDG_CACHE_HOME", "/var/cache")
+
+    assert paths.get_cache_home() == "/var/cache"
+
+
+def test_rulesets_representation():
+
+    rulesets = coreutils.rulesets_from_files(config.PATH_RULESETS, ignored_providers=config.IGNORED_PROVIDERS)
+    ruleset = rulesets[0]
+
+    # Rulesets are compact and their patterns can't be modified once loaded
+    assert not hasattr(ruleset, "__dict__")
+    assert isinstance(ruleset.rules.base_list, tuple)
+
+    assert list(dict(ruleset)) == [
+        "providerName", "urlPattern", "completeProvider", "rules", "rawRules",
+        "referralMarketing", "exceptions", "redirections", "forceRedirection"
+    ]
+    assert dict(ruleset)["rules"] == list(ruleset.rules.iter())
+    assert repr(ruleset).startswith(f"unalix.types.Ruleset(providerName={ruleset.providerName!r}, urlPattern=")
+    assert f"rules=Patterns({list(ruleset.rules.iter())!r})" in repr(ruleset)
+
+    assert json.loads(str(rulesets))[0] == json.loads(json.dumps(dict(ruleset)))
+
+    assert ruleset.rules[0] in ruleset.rules
+    assert "not-a-rule" not in ruleset.rules
@@ -0,0 +1,150 @@
+import asyncio
+import http.server
+import socketserver
+import threading
+import time
+import _thread as thread
+
+import pytest
+
+import unalix
+
+port = 56888
+
+lock = threading.Lock()
+
+# Host header -> number of requests being handled, and the highest numbers seen
+active = {}
+highest = {}
+
+class Server(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        host = self.headers["Host"]
+
+        with lock:
+            active[host] = active.get(host, 0) + 1
+            active["total"] = active.get("total", 0) + 1
+
+            for key in (host, "total"):
+                highest[key] = max(highest.get(key, 0), active[key])
+
+        time.sleep(0.02)
+
+        with lock:
+            active[host] -= 1
+            active["total"] -= 1
+
+        if self.path.startswith("/ok"):
+            self.send_response(200)
+        else:
+            self.send_response(301)
+            self.send_header("Location", f"/ok{self.path}?utm_source=127.0.0.1")
+
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+class ThreadingServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+server = ThreadingServer(("127.0.0.1", port), Server)
+
+thread.start_new_thread(server.serve_forever, ())
+
+URLS = [f"http://{host}:{port}/{number}" for number in range(12) for host in ("127.0.0.1", "localhost")]
+
+EXPECTED = [f"http://{host}:{port}/ok/{number}" for number in range(12) for host in ("127.0.0.1", "localhost")]
+
+
+def check(results, ordered):
+
+    # Errors are yielded as results
+    errors = [item for item in results if item[0] == "ftp://127.0.0.1/"]
+
+    assert len(errors) == 1
+    assert isinstance(errors[0][1], unalix.UnsupportedProtocolError)
+
+    if ordered:
+        assert results[-1] is errors[0]
+
+    results.remove(errors[0])
+
+    if ordered:
+        assert [url for url, result in results] == URLS
+    else:
+        results.sort(key=lambda item: URLS.index(item[0]))
+
+    assert [result for url, result in results] == EXPECTED
+
+    assert highest["total"] <= 4
+
+    for host in ("127.0.0.1", "localhost"):
+        assert highest[f"{host}:{port}"] <= 2
+
+    highest.clear()
+
+
+def test_unshort_urls():
+
+    for ordered in (False, True):
+        results = list(unalix.unshort_urls(URLS + ["ftp://127.0.0.1/"], concurrency=4, per_host=2, ordered=ordered))
+        check(results, ordered)
+
+
+def test_aunshort_urls():
+
+    event_loop = asyncio.new_event_loop()
+
+    async def collect(urls, ordered):
+        return [item async for item in unalix.aunshort_urls(urls, concurrency=4, per_host=2, ordered=ordered)]
+
+    async def generate():
+        for url in URLS + ["ftp://127.0.0.1/"]:
+            yield url
+
+    try:
+        results = event_loop.run_until_complete(collect(URLS + ["ftp://127.0.0.1/"], ordered=True))
+        check(results, ordered=True)
+
+        results = event_loop.run_until_complete(collect(generate(), ordered=False))
+        check(results, ordered=False)
+    finally:
+        event_loop.close()
+
+
+def test_aunshort_urls_cancel():
+
+    event_loop = asyncio.new_event_loop()
+
+    collected = []
+
+    async def collect():
+        async for item in unalix.aunshort_urls(URLS, concurrency=4, per_host=2):
+            collected.append(item)
+
+    async def cancel():
+        task = asyncio.ensure_future(collect())
+
+        while not collected:
+            await asyncio.sleep(0.01)
+
+        task.cancel()
+
+        # Cancellation propagates instead of being yielded as the results of the pending URLs
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    try:
+        event_loop.run_until_complete(cancel())
+    finally:
+        event_loop.close()
+
+    assert 0 < len(collected) < len(URLS)
+    assert not any(isinstance(result, BaseException) for url, result in collected)
+
+    highest.clear()
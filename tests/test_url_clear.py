@@ -1,4 +1,8 @@
-from unalix import clear_url
+import json
+import urllib.parse
+
+from unalix import clear_url, set_clear_url_cache, Cleaner, types
+from unalix.core import coreutils, url_cleaner
 
 def test_clear_url():
 
@@ -60,4 +64,109 @@ def test_clear_url():
     # https://github.com/AmanoTeam/Unalix-nim/issues/5
     unmodified_url = "https://docs.julialang.org/en/v1/stdlib/REPL/#Key-bindings"
     assert clear_url(unmodified_url) == unmodified_url
-    
\ No newline at end of file
+    
+
+def test_cleaner():
+
+    cleaner = Cleaner(ignoreReferralMarketing=True, stripEmpty=True)
+
+    assert cleaner.clear("https://natura.com.br/p/2458?consultoria=promotop&empty=") == "https://natura.com.br/p/2458?consultoria=promotop"
+    assert cleaner("https://deezer.com/track/891177062?utm_source=deezer") == "https://deezer.com/track/891177062"
+
+    # Providers with nothing left to do are not part of the pipeline
+    cleaner = Cleaner(ignoreRules=True, ignoreReferralMarketing=True, ignoreRawRules=True)
+    cleaner.build()
+
+    assert all(redirections for (_, _, _, redirections, _, _) in cleaner.providers)
+    assert cleaner.clear("https://www.google.com/url?q=https://pypi.org/project/Unalix") == "https://pypi.org/project/Unalix"
+
+    try:
+        clear_url("https://deezer.com", ignoreEverything=True)
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("unknown options must be rejected")
+
+
+def test_clear_url_cache():
+
+    cache = types.LRUCache(max_entries=2)
+    cleaner = Cleaner(cache=cache)
+
+    urls = [
+        "https://deezer.com/track/891177062?utm_source=deezer",
+        "https://natura.com.br/p/2458?consultoria=promotop",
+        "https://www.amazon.com/gp/B08CH7RHDP/ref=as_li_ss_tl"
+    ]
+
+    results = [cleaner.clear(url) for url in urls + urls[-1:]]
+
+    assert results[:3] == [clear_url(url) for url in urls]
+    assert cache.cache_info()[:4] == (1, 3, 2, 2)
+
+    # The least recently used entry was evicted
+    assert cleaner.cache_key(urls[0]) not in cache
+    assert cleaner.cache_key(urls[2]) in cache
+
+    # Cleaners with other settings don't use each other's results
+    cache = types.LRUCache()
+    url = "https://www.google.com/url?q=https://example.com/"
+
+    assert Cleaner(cache=cache).clear(url) == "https://example.com/"
+    assert Cleaner(cache=cache, max_unwraps=0).clear(url) == url
+    assert Cleaner(cache=cache, rulesets=types.Rulesets()).clear(url) == url
+    assert len(cache) == 3
+
+    cache = types.LRUCache(max_entries=None, max_bytes=400)
+    cleaner = Cleaner(cache=cache)
+
+    list(cleaner.clear_urls(urls))
+
+    assert 0 < cache.cache_info().bytes <= 400
+    assert len(cache) < len(urls)
+
+    # Reloading the rulesets drops the cached results
+    set_clear_url_cache(cache)
+
+    try:
+        assert clear_url(urls[0]) == results[0]
+        assert len(cache)
+
+        url_cleaner.reload_rulesets()
+
+        assert clear_url(urls[1]) == results[1]
+        assert len(cache) == 1
+    finally:
+        set_clear_url_cache(None)
+
+
+def test_clear_url_unwraps(tmp_path):
+
+    url = "https://pypi.org/project/Unalix"
+
+    for _ in range(4):
+        url = "https://www.google.com/url?q=" + urllib.parse.quote(url, safe="")
+
+    assert Cleaner().unwrap(url) == ("https://pypi.org/project/Unalix", 4)
+
+    # Past the limit, the remaining redirections are left alone
+    result, unwraps = Cleaner(max_unwraps=2).unwrap(url)
+
+    assert unwraps == 2
+    assert result.startswith("https://www.google.com/url?q=")
+
+    # Redirection loops stop at the first URL seen twice
+    path = tmp_path / "rulesets.json"
+    path.write_text(json.dumps({
+        "providers": {
+            "loop": {
+                "urlPattern": r"^https?:\/\/loop\.example",
+                "redirections": [r"^https:\/\/(.*)", r"^http:\/\/(.*)"]
+            }
+        }
+    }))
+
+    cleaner = Cleaner(rulesets=coreutils.rulesets_from_files([path]))
+
+    assert cleaner.unwrap("https://loop.example/path") == ("http://loop.example/path", 1)
+    assert cleaner.clear("http://loop.example/path") == "http://loop.example/path"
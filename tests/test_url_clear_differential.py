@@ -0,0 +1,295 @@
+import json
+import os
+import random
+import time
+
+import pytest
+
+from unalix import clear_url, clear_urls, clear_url_bytes, needs_cleaning, Cleaner, config, types
+from unalix.core import codegen, coreutils, url_cleaner
+
+import url_cleaner_reference
+
+
+URLS = url_cleaner_reference.generate_urls(count=2000)
+
+OPTIONS = [
+    {},
+    {"ignoreReferralMarketing": True},
+    {"ignoreRules": True},
+    {"ignoreExceptions": True},
+    {"ignoreRawRules": True},
+    {"ignoreRedirections": True},
+    {"skipBlocked": True},
+    {"skipLocal": True},
+    {"stripDuplicates": True, "stripEmpty": True}
+]
+
+
+@pytest.mark.parametrize("options", OPTIONS)
+def test_clear_url_matches_reference(options):
+
+    urls = URLS if not options else URLS[:300]
+
+    for url in urls:
+        assert clear_url(url, **options) == url_cleaner_reference.clear_url(url, **options), url
+
+
+@pytest.mark.parametrize("options", OPTIONS[:2] + OPTIONS[-2:])
+def test_clear_urls_matches_reference(options):
+
+    # A small chunk size so that host groups are split across chunks
+    results = list(clear_urls(iter(URLS), chunk_size=97, **options))
+
+    assert results == [url_cleaner_reference.clear_url(url, **options) for url in URLS]
+
+
+def test_ipv6_hosts():
+
+    for url, expected in (
+        ("http://[::1]:8080/x?utm_source=a", "http://[::1]:8080/x"),
+        ("https://[2001:db8::1]/x?utm_source=a", "https://[2001:db8::1]/x"),
+        ("https://[2001:db8::1]:443/x?gclid=1#a", "https://[2001:db8::1]/x#a")
+    ):
+        assert clear_url(url) == expected == url_cleaner_reference.clear_url(url)
+        assert needs_cleaning(url)
+
+    assert clear_url("http://[::1]:8080/x?utm_source=a", skipLocal=True) == "http://[::1]:8080/x?utm_source=a"
+
+    # Other hosts keep everything before the first colon, as before
+    for url in ("https://bing.com::80/x", "https://bing.com:a:8080/x?utm_source=a", "https://bing.com:/x"):
+        assert clear_url(url) == url_cleaner_reference.clear_url(url)
+
+    assert clear_url("https://bing.com::80/x") == "https://bing.com/x"
+    assert clear_url("https://bing.com:a:8080/x?utm_source=a") == "https://bing.com:8080/x"
+    assert not needs_cleaning("http://[::1]:8080/x")
+
+
+def test_clear_urls_workers():
+
+    urls = URLS[:500]
+
+    results = list(clear_urls(urls, chunk_size=37, workers=2, stripEmpty=True))
+
+    assert results == list(clear_urls(urls, stripEmpty=True))
+
+    # Custom rulesets are sent to the workers
+    cleaner = Cleaner(rulesets=url_cleaner.get_rulesets())
+
+    assert list(cleaner.clear_urls(urls, chunk_size=37, workers=2)) == list(clear_urls(urls))
+
+    # So are max_unwraps and the backend
+    redirects = ["https://www.google.com/url?q=https://example.com/"] * 3
+
+    for cleaner in (Cleaner(max_unwraps=0), Cleaner(max_unwraps=0, backend="generated")):
+        assert list(cleaner.clear_urls(redirects, chunk_size=1, workers=2)) == list(cleaner.clear_urls(redirects)) == redirects
+
+
+def test_query_filters_match_rule_regexes():
+
+    generator = random.Random(0)
+
+    # Rules of the providers that run on all URLs are dropped from the following ones (see coreutils.optimize_rulesets())
+    always_running = {"rules": [], "referralMarketing": []}
+
+    for ruleset in url_cleaner.rulesets.iter():
+        for name, patterns, query_filters in (
+            ("rules", ruleset.rules, ruleset.rulesFilters),
+            ("referralMarketing", ruleset.referralMarketing, ruleset.referralMarketingFilters)
+        ):
+            if not len(patterns):
+                continue
+
+            names = [pattern.replace("(?:%3F)?", "") for pattern in patterns.iter()] + ["q", "id"]
+
+            for _ in range(200):
+                query = url_cleaner_reference.generate_query(generator, names)
+
+                expected = query
+                result = query
+
+                for previous_patterns, previous_query_filters in always_running[name]:
+                    for pattern in previous_patterns.iter():
+                        expected = pattern.compiled.sub(r"\g<1>", expected)
+
+                    for query_filter in previous_query_filters:
+                        result = query_filter(result)
+
+                for pattern in patterns.iter():
+                    expected = pattern.compiled.sub(r"\g<1>", expected)
+
+                for query_filter in query_filters:
+                    result = query_filter(result)
+
+                assert result == expected, (ruleset.providerName, query)
+
+            if coreutils.matches_everything(ruleset.urlPattern) and not len(ruleset.exceptions):
+                always_running[name].append((patterns, query_filters))
+
+
+@pytest.mark.parametrize("options", OPTIONS)
+def test_optimized_rulesets_match_unoptimized(options):
+
+    rulesets = coreutils.rulesets_from_files(config.PATH_RULESETS, ignored_providers=config.IGNORED_PROVIDERS, optimize=False)
+    statistics = coreutils.optimize_rulesets(
+        coreutils.rulesets_from_files(config.PATH_RULESETS, ignored_providers=config.IGNORED_PROVIDERS, optimize=False)
+    )
+
+    assert statistics["patterns"][0] == statistics["patterns"][1]
+    assert statistics["pattern_objects"][1] < statistics["pattern_objects"][0]
+    assert statistics["query_filters"][1] < statistics["query_filters"][0]
+
+    unoptimized = Cleaner(rulesets=rulesets, **options)
+    optimized = Cleaner(**options)
+
+    for url in URLS:
+        assert optimized.clear(url) == unoptimized.clear(url), url
+
+
+def test_optimize_rulesets_drops_covered_rules(tmp_path):
+
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({
+        "providers": {
+            "first": {"urlPattern": "^https?:\\/\\/example\\.com", "rules": ["utm_source", "(?:%3F)?gclid", "ref_?"]},
+            "global": {"urlPattern": ".*", "rules": ["utm_source", "(?:%3F)?gclid", "ref_?", "id[a-z]*"]},
+            "second": {"urlPattern": "^https?:\\/\\/example\\.com", "rules": ["utm_source", "(?:%3F)?gclid", "ref_?", "ts", "[a-z]*%26x"]},
+            "third": {"urlPattern": "^https?:\\/\\/example\\.com", "rules": ["gclid"], "referralMarketing": ["utm_source"]}
+        }
+    }))
+
+    rulesets = coreutils.rulesets_from_files([path], optimize=False)
+    optimized = coreutils.rulesets_from_files([path])
+
+    first, global_rules, second, third = optimized.iter()
+
+    # Rules before the global ones are kept, the following ones only keep what the global ones don't remove
+    assert len(first.rulesFilters) == 2
+    assert [str(query_filter) for query_filter in second.rulesFilters] == [
+        str(types.FieldNames(["ts"])), str(types.FieldPattern(types.RulePattern("[a-z]*%26x")))
+    ]
+    assert third.rulesFilters == () and len(third.referralMarketingFilters) == 1
+
+    # Identical patterns and query filters are shared
+    assert first.rules[0] is global_rules.rules[0]
+    assert first.rulesFilters[0] is global_rules.rulesFilters[0]
+
+    generator = random.Random(0)
+    names = ["utm_source", "gclid", "ref", "ref_", "id", "idx", "ts", "a%26x", "q"]
+
+    for _ in range(2000):
+        url = "https://example.com/?" + url_cleaner_reference.generate_query(generator, names)
+
+        for options in OPTIONS:
+            assert Cleaner(rulesets=optimized, **options).clear(url) == Cleaner(rulesets=rulesets, **options).clear(url), url
+
+
+def test_rule_stays_in_field():
+
+    for pattern in ("utm_source", "(?:%3F)?utm(?:_[a-z_]*)?", "ref_?", r"\bc_[a-z]+", r"[\w-]+ariation", "no[Ii]ndex"):
+        assert coreutils.rule_stays_in_field(pattern), pattern
+
+    for pattern in ("[a-z%0-9]*ie", "[^a-z%0-9]adId", "__mk_.+", "c(?:_.+)?", "(ref)", "(?i)ref", "(?m)ref", "%24deep_link", "a(?=b)"):
+        assert not coreutils.rule_stays_in_field(pattern), pattern
+
+
+def test_extract_redirection_matches_sub():
+
+    urls = URLS[:300] + [url + "\n" + url for url in URLS[:50]]
+
+    for ruleset in url_cleaner.rulesets.iter():
+        for redirection in ruleset.redirections.iter():
+            for url in urls:
+                expected = redirection.compiled.sub(r"\g<1>", url)
+                result = url_cleaner.extract_redirection(redirection.compiled, url)
+
+                assert (url if result is None else result) == expected, (redirection, url)
+
+
+def test_required_literals():
+
+    assert coreutils.required_literal(r"^https?:\/\/(?:[a-z0-9-]+\.)*?google(?:\.[a-z]{2,}){1,}\/url\?") == "google"
+    assert coreutils.required_literal(r"(%(?:26|23)|&|^)utm_[a-z]+(?:(?:=|%3[Dd])[^&]*)") == "utm_"
+    assert coreutils.required_literal(r"(?:ref|tag)=") == "="
+    assert coreutils.required_literal(r"(?i)utm_source") == ""
+    assert coreutils.required_literal(r"a?b*") == ""
+
+    # Every match of a gated regex contains its literal
+    for ruleset in url_cleaner.rulesets.iter():
+        for patterns in (ruleset.rules, ruleset.referralMarketing, ruleset.rawRules, ruleset.exceptions, ruleset.redirections):
+            for pattern in patterns.iter():
+                for url in URLS[:200]:
+                    for match in pattern.compiled.finditer(url):
+                        assert pattern.literal in match.group(), (pattern, url)
+
+
+@pytest.mark.parametrize("options", OPTIONS)
+def test_needs_cleaning_agrees_with_clear_url(options):
+
+    urls = URLS if not options else URLS[:300]
+
+    for url in urls:
+        assert needs_cleaning(url, **options) == (clear_url(url, **options) != url), url
+
+
+@pytest.mark.parametrize("options", OPTIONS)
+def test_clear_url_bytes_agrees_with_clear_url(options):
+
+    urls = URLS if not options else URLS[:300]
+
+    for url in urls:
+        expected = clear_url(url, **options)
+        encoded = url.encode("utf-8", "surrogateescape")
+
+        for data in (encoded, bytearray(encoded), memoryview(encoded)):
+            result = clear_url_bytes(data, **options)
+
+            # Unchanged URLs are given back as they are, without copies
+            if expected == url:
+                assert result is data, url
+            else:
+                assert result == expected.encode("utf-8", "surrogateescape"), url
+
+
+@pytest.mark.parametrize("options", OPTIONS)
+def test_generated_backend_matches_interpreted(options, tmp_path, monkeypatch):
+
+    monkeypatch.setattr(config, "PATH_CACHE", str(tmp_path))
+
+    urls = URLS if not options else URLS[:500]
+
+    # Unused modules of older generations are deleted, those of other options are kept
+    tag = coreutils.interpreter_tag()
+    month_ago = time.time() - 30 * 24 * 3600
+
+    (tmp_path / f"providers-{tag}-stale-0.py").write_text("")
+    (tmp_path / "providers-{}-{}-0.py".format(tag, codegen.source_key(frozenset(("other",))).partition("-")[0])).write_text("")
+
+    for path in tmp_path.glob("providers-*.py"):
+        os.utime(str(path), (month_ago, month_ago))
+
+    interpreted = Cleaner(**options)
+    generated = Cleaner(backend="generated", **options)
+
+    for url in urls:
+        assert generated.clear(url) == interpreted.clear(url), url
+
+    # The generated module is cached on disk, and reused by the next cleaner
+    assert len(list(tmp_path.glob("providers-*.py"))) == 2
+    assert not (tmp_path / f"providers-{tag}-stale-0.py").exists()
+
+    cached = Cleaner(backend="generated", **options)
+
+    for url in urls[:100]:
+        assert cached.clear(url) == interpreted.clear(url), url
+
+    # Code generated for custom rulesets is not cached
+    custom = Cleaner(backend="generated", rulesets=url_cleaner.get_rulesets(), **options)
+
+    for url in urls[:100]:
+        assert custom.clear(url) == interpreted.clear(url), url
+
+    assert len(list(tmp_path.glob("providers-*.py"))) == 2
+
+    with pytest.raises(ValueError):
+        Cleaner(backend="compiled")
@@ -0,0 +1,316 @@
+"""
+Reference implementation of the ClearURLs rule processing, used by the differential tests.
+
+This is the straightforward per-ruleset loop that unalix.clear_url() used to run, built
+directly from the JSON rulesets. It intentionally shares no code with the unalix package
+so that optimizations in the package can be checked against it.
+"""
+import ipaddress
+import json
+import urllib.parse
+
+import re
+
+from unalix import config
+from unalix import utils
+
+
+class ReferenceURL(str):
+
+
+    def __init__(self, url):
+
+        (
+            self.scheme, self.netloc, self.path,
+            self.params, self.query, self.fragment
+        ) = urllib.parse.urlparse(url)
+
+        self.port = None
+
+        if self.netloc.startswith("["):
+            host, separator, part = self.netloc.rpartition(":")
+
+            if separator and "]" not in part:
+                self.netloc = host
+            else:
+                part = ""
+        else:
+            parts = self.netloc.split(sep=":")
+            self.netloc, part = parts[0], (parts[-1] if len(parts) > 1 else "")
+
+        if part.isnumeric():
+            self.port = int(part)
+
+        if self.port is None:
+            if self.scheme == "http":
+                self.port = 80
+            elif self.scheme == "https":
+                self.port = 443
+
+
+    def islocal(self):
+
+        local_domains = (
+            "localhost",
+            "localhost.localdomain",
+            "ip6-localhost",
+            "ip6-loopback"
+        )
+
+        netloc = self.netloc[1:-1] if self.netloc.startswith("[") else self.netloc
+
+        try:
+            address = ipaddress.ip_address(netloc)
+        except ValueError:
+            return netloc in local_domains
+        else:
+            return address.is_private
+
+
+    def geturl(self):
+
+        if self.port is not None and self.port not in (80, 443):
+            netloc = f"{self.netloc}:{self.port}"
+        else:
+            netloc = self.netloc
+
+        return urllib.parse.urlunparse((
+            self.scheme, netloc, self.path,
+            self.params, self.query, self.fragment
+        ))
+
+
+    def prepend_scheme_if_needed(self):
+
+        (
+            scheme, netloc, path,
+            params, query, fragment
+        ) = urllib.parse.urlparse(self.geturl(), "http")
+
+        if not netloc:
+            netloc, path = path, netloc
+
+        return ReferenceURL(
+            urllib.parse.urlunparse((scheme, netloc, path, params, query, fragment)).replace("http:///", "http://")
+        )
+
+
+def load_rulesets():
+
+    rulesets = []
+
+    for path in config.PATH_RULESETS:
+        with open(file=path, mode="r") as file:
+            providers = json.loads(file.read())["providers"]
+
+        for providerName, provider in providers.items():
+            if providerName in config.IGNORED_PROVIDERS:
+                continue
+
+            rulesets.append({
+                "urlPattern": re.compile(provider["urlPattern"]),
+                "completeProvider": provider.get("completeProvider", False),
+                "rules": [
+                    re.compile(rf"(%(?:26|23)|&|^){rule}(?:(?:=|%3[Dd])[^&]*)")
+                    for rule in provider.get("rules", [])
+                ],
+                "rawRules": [re.compile(rule) for rule in provider.get("rawRules", [])],
+                "referralMarketing": [
+                    re.compile(rf"(%(?:26|23)|&|^){rule}(?:(?:=|%3[Dd])[^&]*)")
+                    for rule in provider.get("referralMarketing", [])
+                ],
+                "exceptions": [re.compile(rule) for rule in provider.get("exceptions", [])],
+                "redirections": [re.compile(f"{rule}.*") for rule in provider.get("redirections", [])]
+            })
+
+    return rulesets
+
+
+RULESETS = load_rulesets()
+
+
+def clear_url(
+    url,
+    ignoreReferralMarketing=False,
+    ignoreRules=False,
+    ignoreExceptions=False,
+    ignoreRawRules=False,
+    ignoreRedirections=False,
+    skipBlocked=False,
+    skipLocal=False,
+    stripDuplicates=False,
+    stripEmpty=False
+):
+
+    for ruleset in RULESETS:
+
+        url = ReferenceURL(url.geturl() if isinstance(url, ReferenceURL) else url)
+
+        if skipLocal and url.islocal():
+            return url
+
+        if skipBlocked and ruleset["completeProvider"]:
+            continue
+
+        if ruleset["urlPattern"].match(f"{url.scheme}://{url.netloc}"):
+            if not ignoreExceptions:
+                if any(exception.match(url) for exception in ruleset["exceptions"]):
+                    continue
+
+            if not ignoreRedirections:
+                for redirection in ruleset["redirections"]:
+                    result = redirection.sub(r"\g<1>", url)
+
+                    if not result or result == url:
+                        continue
+
+                    url = ReferenceURL(utils.requote_uri(urllib.parse.unquote(result)))
+                    url = url.prepend_scheme_if_needed()
+
+                    return clear_url(
+                        url=url,
+                        ignoreReferralMarketing=ignoreReferralMarketing,
+                        ignoreRules=ignoreRules,
+                        ignoreExceptions=ignoreExceptions,
+                        ignoreRawRules=ignoreRawRules,
+                        ignoreRedirections=ignoreRedirections,
+                        skipBlocked=skipBlocked,
+                        skipLocal=skipLocal,
+                        stripDuplicates=stripDuplicates,
+                        stripEmpty=stripEmpty
+                    )
+
+            for component in ("query", "fragment"):
+                value = getattr(url, component)
+
+                if not value:
+                    continue
+
+                if not ignoreRules:
+                    for rule in ruleset["rules"]:
+                        value = rule.sub(r"\g<1>", value)
+                if not ignoreReferralMarketing:
+                    for referral in ruleset["referralMarketing"]:
+                        value = referral.sub(r"\g<1>", value)
+
+                setattr(url, component, value)
+
+            if url.path and not ignoreRawRules:
+                for rawRule in ruleset["rawRules"]:
+                    url.path = rawRule.sub("", url.path)
+
+        url = url.geturl()
+
+    url = ReferenceURL(url)
+
+    if url.query:
+        url.query = utils.filter_query(query=url.query, stripEmpty=stripEmpty, stripDuplicates=stripDuplicates)
+
+    if url.fragment:
+        url.fragment = utils.filter_query(query=url.fragment, stripEmpty=stripEmpty, stripDuplicates=stripDuplicates)
+
+    return url.geturl()
+
+
+def _field_names():
+
+    names = ["q", "id", "page", "p1", "s", "v", "lang"]
+
+    for path in config.PATH_RULESETS:
+        with open(file=path, mode="r") as file:
+            providers = json.loads(file.read())["providers"]
+
+        for provider in providers.values():
+            for rule in provider.get("rules", []) + provider.get("referralMarketing", []):
+                name = rule.replace("(?:%3F)?", "")
+                if re.fullmatch(r"[A-Za-z0-9_.\-]+", name):
+                    names.append(name)
+                else:
+                    names.append(re.sub(r"[^A-Za-z0-9_]", "", name) or "x")
+
+    return sorted(set(names))
+
+
+def _hosts():
+
+    hosts = ["example.com", "localhost", "127.0.0.1", "0.0.0.0", "10.0.0.1", "www.example.org", "[::1]", "[2001:db8::1]"]
+
+    for path in config.PATH_RULESETS:
+        with open(file=path, mode="r") as file:
+            providers = json.loads(file.read())["providers"]
+
+        for provider in providers.values():
+            literal = re.search(r"(?:\?|\^https\?:\\/\\/|/)((?:[a-z0-9-]|\\\.|\\-)+)", provider["urlPattern"])
+            if literal is None:
+                continue
+            host = literal.group(1).replace("\\.", ".").replace("\\-", "-").strip(".")
+            if "." not in host:
+                host += ".com"
+            hosts.extend((host, f"www.{host}", f"m.{host}.br"))
+
+    return sorted(set(hosts))
+
+
+VALUES = ["", "1", "abc", "a%26utm_source%3Dx", "x%23gclid=1", "%3Dz", "https%3A%2F%2Fexample.com%2F", "a=b", "%3F"]
+
+SEPARATORS = ["=", "=", "=", "%3D", "%3d", ""]
+
+
+def generate_query(generator, names):
+
+    fields = []
+
+    for _ in range(generator.randint(0, 6)):
+        name = generator.choice(names)
+        if generator.random() < 0.1:
+            name = "%3F" + name
+        fields.append(name + generator.choice(SEPARATORS) + generator.choice(VALUES))
+
+    joiner = generator.choice(["&", "&", "&", "%26", "%23"])
+
+    return joiner.join(fields)
+
+
+def generate_urls(count, seed=0):
+    """
+    Generate a deterministic corpus of URLs exercising rules, referral marketing, raw rules,
+    redirections and exceptions, including the awkward encodings the rule regexes care about.
+    """
+
+    import random
+
+    generator = random.Random(seed)
+
+    names = _field_names()
+    hosts = _hosts()
+
+    paths = [
+        "/", "", "/track/891177062", "/gp/B08CH7RHDP/ref=as_li_ss_tl", "/a;b", "/x/ref=abc/dp/123",
+        "/foo/bar/dp/B00", "/url", "/amp/s/example.com/page", "/search", "/s", "/l.php", "/redirect"
+    ]
+    ports = ["", "", "", ":80", ":443", ":8080"]
+
+    urls = []
+
+    for _ in range(count):
+        scheme = generator.choice(["http", "https"])
+        url = f"{scheme}://{generator.choice(hosts)}{generator.choice(ports)}{generator.choice(paths)}"
+
+        roll = generator.random()
+
+        if roll < 0.1:
+            url += "?" + generator.choice(["url", "q", "u", "adurl", "ds_dest_url", "urllink"]) + "=" + generator.choice([
+                "https://pypi.org/project/Unalix?utm_source=x",
+                "https%3A%2F%2Fexample.com%2F%3Fgclid%3D1",
+                "www.example.com%2Fpath",
+                "https://www.google.com/url?q=https://example.com/?fbclid=1"
+            ])
+        elif roll < 0.9:
+            url += "?" + generate_query(generator, names)
+
+        if generator.random() < 0.3:
+            url += "#" + generate_query(generator, names)
+
+        urls.append(url)
+
+    return urls
@@ -26,14 +26,20 @@
 
     If something goes wrong, please open a issue at GitHub.
 """
-from .core.url_cleaner import clear_url
-from .core.url_unshort import unshort_url, aunshort_url
-from .core.cookie_policies import (
-    COOKIE_REJECT_ALL,
-    COOKIE_ALLOW_ALL,
-    COOKIE_STRICT_ALLOW
+import importlib as __importlib
+import sys as __sys
+
+from .core.url_cleaner import (
+    clear_url,
+    clear_urls,
+    clear_url_bytes,
+    clear_urls_bytes,
+    needs_cleaning,
+    set_clear_url_cache,
+    Cleaner
 )
-from .core.ssl_context import SSL_CONTEXT_VERIFIED, SSL_CONTEXT_UNVERIFIED
+from .core.text_cleaner import clean_text, clean_text_stream
+from .core.record_cleaner import clean_ndjson, clean_csv
 from .__version__ import __description__, __title__, __version__
 from .exceptions import (
     UnsupportedProtocolError,
@@ -48,8 +54,26 @@ __all__ = [
     "__title__",
     "__version__",
     "clear_url",
+    "clear_urls",
+    "clear_url_bytes",
+    "clear_urls_bytes",
+    "needs_cleaning",
+    "clean_text",
+    "clean_text_stream",
+    "clean_ndjson",
+    "clean_csv",
+    "set_clear_url_cache",
+    "Cleaner",
     "unshort_url",
     "aunshort_url",
+    "unshort_urls",
+    "aunshort_urls",
+    "ConnectionPool",
+    "AsyncConnectionPool",
+    "RedirectCache",
+    "CacheBackend",
+    "MemoryCacheBackend",
+    "SQLiteCacheBackend",
     "UnsupportedProtocolError",
     "ConnectError",
     "TooManyRedirectsError",
@@ -61,12 +85,56 @@ __all__ = [
     "SSL_CONTEXT_UNVERIFIED"
 ]
 
+# Names that are only imported (or created) on first access, so that processes which only
+# clean URLs don't pay for the HTTP client, cookie policies and SSL contexts.
+__lazy_attributes = {
+    "unshort_url": ".core.url_unshort",
+    "aunshort_url": ".core.url_unshort",
+    "unshort_urls": ".core.url_unshort",
+    "aunshort_urls": ".core.url_unshort",
+    "ConnectionPool": ".core.connection_pool",
+    "AsyncConnectionPool": ".core.async_http",
+    "RedirectCache": ".core.redirect_cache",
+    "CacheBackend": ".core.cache_backends",
+    "MemoryCacheBackend": ".core.cache_backends",
+    "SQLiteCacheBackend": ".core.cache_backends",
+    "COOKIE_REJECT_ALL": ".core.cookie_policies",
+    "COOKIE_ALLOW_ALL": ".core.cookie_policies",
+    "COOKIE_STRICT_ALLOW": ".core.cookie_policies",
+    "SSL_CONTEXT_VERIFIED": ".core.ssl_context",
+    "SSL_CONTEXT_UNVERIFIED": ".core.ssl_context"
+}
+
 __locals = locals()
 
 for __name in __all__:
-    if not __name.startswith("__"):
+    if not __name.startswith("__") and __name not in __lazy_attributes:
         try:
             setattr(__locals[__name], "__module__", "unalix")
         except AttributeError:
             pass
 
+
+# https://www.python.org/dev/peps/pep-0562
+def __getattr__(name):
+
+    if name not in __lazy_attributes:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module = __importlib.import_module(__lazy_attributes[name], __name__)
+    value = getattr(module, name)
+
+    try:
+        setattr(value, "__module__", "unalix")
+    except AttributeError:
+        pass
+
+    globals()[name] = value
+
+    return value
+
+
+if __sys.version_info < (3, 7):
+    # Module-level __getattr__ is not supported before Python 3.7
+    for __name in __lazy_attributes:
+        __getattr__(__name)
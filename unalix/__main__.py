@@ -0,0 +1,590 @@
+"""
+    Command-line interface.
+
+    Usage:
+
+        $ unalix clean urls.txt > cleaned.txt
+        $ unalix clean --workers 0 --field link.href < records.ndjson
+        $ unalix clean --column url --column referrer export.csv
+        $ unalix unshort --concurrency 64 short-urls.txt
+        $ unalix unshort --cache /var/cache/unalix.sqlite short-urls.txt
+
+    Run "unalix <command> --help" for the available options.
+"""
+import argparse
+import collections
+import concurrent.futures
+import json
+import mmap
+import os
+import re
+import sys
+import typing
+
+from . import config
+from .__version__ import __title__, __version__
+from .core import record_cleaner, url_cleaner
+
+# Input is read (and sent to the workers) in blocks of about this many bytes, split at line boundaries
+BLOCK_SIZE = 1024 * 1024
+
+CLEANER_OPTIONS_HELP = {
+    "ignoreReferralMarketing": "do not remove referral marketing fields",
+    "ignoreRules": "do not remove tracking fields",
+    "ignoreExceptions": "ignore the exceptions of the providers",
+    "ignoreRawRules": "do not apply raw rules",
+    "ignoreRedirections": "do not extract redirect URLs",
+    "skipBlocked": "do not process blocked URLs",
+    "skipLocal": "do not process URLs pointing to local/private hosts",
+    "stripDuplicates": "remove duplicate query fields",
+    "stripEmpty": "remove empty query fields"
+}
+
+
+def option_flag(name: str) -> str:
+    """
+    Return the command-line flag of a clear_url() option (e.g. "--ignore-referral-marketing").
+    """
+
+    return "--" + re.sub(r"[A-Z]", lambda match: "-" + match.group().lower(), name)
+
+
+def record_boundary(data: bytes, quotechar: typing.Optional[bytes] = None) -> int:
+    """
+    Return the position right after the last line terminator of the given data that is not inside a quoted
+    (CSV) field, or 0 if there is none. The data must start at a record boundary.
+    """
+
+    end = data.rfind(b"\n") + 1
+
+    if quotechar is None:
+        return end
+
+    odd = data.count(quotechar, 0, end) % 2
+
+    while odd and end:
+        previous = data.rfind(b"\n", 0, end - 1) + 1
+        odd ^= data.count(quotechar, previous, end) % 2
+        end = previous
+
+    return end
+
+
+def read_blocks(file: typing.BinaryIO, block_size: int, quotechar: typing.Optional[bytes] = None) -> typing.Iterator[bytes]:
+    """
+    Read the given file in blocks that end at a record boundary (except for the last one). Records are lines,
+    unless a quote character is given, in which case quoted line terminators are part of the records (CSV).
+    """
+
+    rest = b""
+
+    while True:
+        data = file.read(block_size)
+
+        if not data:
+            break
+
+        data = rest + data
+        end = record_boundary(data, quotechar)
+
+        if end:
+            yield data[:end]
+            rest = data[end:]
+        else:
+            rest = data
+
+    if rest:
+        yield rest
+
+
+def map_blocks(path: str, block_size: int, quotechar: typing.Optional[bytes] = None) -> typing.Iterator[bytes]:
+    """
+    Same as read_blocks(), but memory-maps the file (falling back to reading it when that is not possible,
+    e.g. for pipes).
+    """
+
+    with open(path, "rb") as file:
+        try:
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files and non-regular files can't be mapped
+            yield from read_blocks(file, block_size, quotechar)
+            return
+
+        with mapping:
+            start = 0
+            size = len(mapping)
+
+            while start < size:
+                end = mapping.find(b"\n", min(start + block_size, size) - 1) + 1 or size
+                block = mapping[start:end]
+
+                if quotechar is not None:
+                    odd = block.count(quotechar) % 2
+
+                    # The block ends inside a quoted field, so take more lines until it is closed
+                    while odd and end < size:
+                        next_end = mapping.find(b"\n", end) + 1 or size
+                        extra = mapping[end:next_end]
+                        odd ^= extra.count(quotechar) % 2
+                        block += extra
+                        end = next_end
+
+                yield block
+
+                start = end
+
+
+def input_blocks(
+    paths: typing.List[str],
+    block_size: int,
+    quotechar: typing.Optional[bytes] = None
+) -> typing.Iterator[typing.Tuple[str, bytes, bool]]:
+    """
+    Yield (name, block, first) tuples for each of the given input files ("-" is the standard input),
+    where `first` tells whether the block is the first one of its file.
+    """
+
+    for path in paths or ["-"]:
+        if path == "-":
+            name, blocks = ("<stdin>", read_blocks(sys.stdin.buffer, block_size, quotechar))
+        else:
+            name, blocks = (path, map_blocks(path, block_size, quotechar))
+
+        first = True
+
+        for block in blocks:
+            yield (name, block, first)
+            first = False
+
+
+def split_lines(block: bytes) -> typing.List[str]:
+
+    # Invalid UTF-8 is carried through untouched
+    lines = block.decode("utf-8", "surrogateescape").split("\n")
+
+    if not lines[-1]:
+        lines.pop()
+
+    return [line[:-1] if line.endswith("\r") else line for line in lines]
+
+
+def join_lines(lines: typing.List[str]) -> bytes:
+
+    return ("\n".join(lines) + "\n").encode("utf-8", "surrogateescape")
+
+
+def clean_block(
+    options: typing.Dict[str, bool],
+    record_format: typing.Optional[tuple],
+    block: bytes,
+    first: bool
+) -> typing.Tuple[bytes, int, typing.List[typing.Tuple[int, str]]]:
+    """
+    Clean a block of input, returning (output, number_of_lines, errors).
+
+    `record_format` is None for plain URLs, ("ndjson", fields) for NDJSON records or ("csv", column_indexes,
+    delimiter, header) for CSV records, where `header` tells whether the first record of the file is a header
+    (only relevant when `first` is True).
+
+    Records that can't be cleaned are copied to the output as they are and reported in `errors`
+    as (line_index, message) tuples.
+    """
+
+    cleaner = url_cleaner.get_cleaner(**options)
+    errors = []
+
+    if record_format is not None and record_format[0] == "csv":
+        kind, columns, delimiter, header = record_format
+
+        text = block.decode("utf-8", "surrogateescape")
+
+        lines = text.split("\n")
+        lines = [line + "\n" for line in lines[:-1]] + ([lines[-1]] if lines[-1] else [])
+
+        csv_cleaner = record_cleaner.CSVRecordCleaner(cleaner, columns, delimiter)
+
+        results = []
+        line_index = 0
+
+        for record in record_cleaner.csv_records(lines):
+            if first and header and line_index == 0:
+                results.append(record)
+            else:
+                try:
+                    results.append(csv_cleaner.clean(record))
+                except ValueError as exception:
+                    results.append(record)
+                    errors.append((line_index, str(exception)))
+
+            line_index += record.count("\n")
+
+        return ("".join(results).encode("utf-8", "surrogateescape"), len(lines), errors)
+
+    lines = split_lines(block)
+
+    if record_format is None:
+        try:
+            results = list(cleaner.clear_urls(lines, chunk_size=len(lines)))
+        except ValueError:
+            # Find out which lines are broken
+            results = []
+
+            for index, line in enumerate(lines):
+                try:
+                    results.append(cleaner.clear(line))
+                except ValueError as exception:
+                    results.append(line)
+                    errors.append((index, str(exception)))
+    else:
+        json_cleaner = record_cleaner.JSONRecordCleaner(cleaner, record_format[1])
+        results = []
+
+        for index, line in enumerate(lines):
+            try:
+                results.append(json_cleaner.clean(line))
+            except ValueError as exception:
+                results.append(line)
+                errors.append((index, str(exception)))
+
+    return (join_lines(results), len(lines), errors)
+
+
+def clean_blocks(
+    tasks: typing.Iterable[typing.Tuple[str, tuple]],
+    options: typing.Dict[str, bool],
+    workers: int
+) -> typing.Iterator[typing.Tuple[str, typing.Tuple[bytes, int, typing.List[typing.Tuple[int, str]]]]]:
+    """
+    Run clean_block() for each (name, (record_format, block, first)) task, yielding (name, result) tuples
+    in the input order.
+
+    With more than one worker, blocks are cleaned by a process pool, with at most two blocks per worker in flight.
+    """
+
+    if workers == 0:
+        workers = os.cpu_count() or 1
+
+    if workers == 1:
+        for name, arguments in tasks:
+            yield (name, clean_block(options, *arguments))
+        return
+
+    # Load the rulesets (and write their snapshot) before the workers start
+    url_cleaner.get_cleaner(**options).ensure_built()
+
+    iterator = iter(tasks)
+    pending = collections.deque()
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        try:
+            while True:
+                while len(pending) < workers * 2:
+                    try:
+                        name, arguments = next(iterator)
+                    except StopIteration:
+                        break
+
+                    pending.append((name, executor.submit(clean_block, options, *arguments)))
+
+                if not pending:
+                    return
+
+                name, future = pending.popleft()
+
+                yield (name, future.result())
+        finally:
+            for name, future in pending:
+                future.cancel()
+
+
+def report(name: str, line_number: int, message: str) -> None:
+
+    print(f"{__title__.lower()}: {name}:{line_number}: {message}", file=sys.stderr)
+
+
+def run_clean(arguments: argparse.Namespace, options: typing.Dict[str, bool], output: typing.BinaryIO) -> int:
+
+    status = 0
+
+    def tasks() -> typing.Iterator[typing.Tuple[str, tuple]]:
+
+        nonlocal status
+
+        if arguments.field:
+            record_format = ("ndjson", arguments.field)
+        elif arguments.column:
+            record_format = ("csv", arguments.column, arguments.delimiter, not arguments.no_header)
+        else:
+            record_format = None
+
+        quotechar = b"\"" if arguments.column else None
+
+        skipping = False
+
+        for name, block, first in input_blocks(arguments.files, arguments.block_size, quotechar):
+            if first and arguments.column and not arguments.no_header:
+                # Resolve the column names with the header of each file
+                lines = block.decode("utf-8", "surrogateescape").split("\n")
+                header = next(record_cleaner.csv_records(line + "\n" for line in lines))
+
+                try:
+                    columns = record_cleaner.csv_column_indexes(header, arguments.column, arguments.delimiter, "\"")
+                except ValueError as exception:
+                    report(name, 1, str(exception))
+                    status = 1
+                    skipping = True
+                else:
+                    record_format = ("csv", columns, arguments.delimiter, True)
+                    skipping = False
+
+            if skipping:
+                continue
+
+            yield (name, (record_format, block, first))
+
+    name = None
+    line_number = 0
+
+    for block_name, (data, lines, errors) in clean_blocks(tasks(), options, arguments.workers):
+        if block_name != name:
+            name = block_name
+            line_number = 0
+
+        for index, message in errors:
+            report(name, line_number + index + 1, message)
+            status = 1
+
+        line_number += lines
+
+        output.write(data)
+
+    return status
+
+
+async def unshort_lines(
+    lines: typing.Iterable[typing.Tuple[str, int, str]],
+    options: typing.Dict[str, typing.Any],
+    concurrency: int,
+    per_host: typing.Optional[int],
+    output: typing.BinaryIO
+) -> int:
+    """
+    Unshort the given (name, line_number, url) lines with aunshort_urls(), at most `concurrency` at a time
+    (and `per_host` for each host), and write the results in the input order.
+
+    URLs that can't be unshortened are reported and written cleaned, but otherwise unchanged.
+    """
+
+    from .core.url_unshort import aunshort_urls
+
+    cleaner = url_cleaner.get_cleaner(**{name: value for name, value in options.items() if name in url_cleaner.CLEANER_OPTIONS})
+
+    # (name, line_number) of the URLs read but not written yet, in the input order
+    positions = collections.deque()
+
+    def urls() -> typing.Iterator[str]:
+
+        for name, line_number, url in lines:
+            positions.append((name, line_number))
+            yield url
+
+    status = 0
+
+    results = []
+
+    def flush() -> None:
+        output.write(join_lines(results))
+        results.clear()
+
+    async for url, result in aunshort_urls(urls(), concurrency=concurrency, per_host=per_host, ordered=True, **options):
+        name, line_number = positions.popleft()
+
+        if not url.strip():
+            result = url
+        elif isinstance(result, Exception):
+            report(name, line_number, str(result) or result.__class__.__name__)
+            status = 1
+
+            try:
+                result = cleaner.clear(url)
+            except ValueError:
+                result = url
+
+        results.append(result)
+
+        if len(results) >= 1024:
+            flush()
+
+    if results:
+        flush()
+
+    return status
+
+
+def run_unshort(arguments: argparse.Namespace, options: typing.Dict[str, bool], output: typing.BinaryIO) -> int:
+
+    import asyncio
+
+    def lines() -> typing.Iterator[typing.Tuple[str, int, str]]:
+
+        name = None
+        line_number = 0
+
+        for block_name, block, first in input_blocks(arguments.files, arguments.block_size):
+            if block_name != name:
+                name = block_name
+                line_number = 0
+
+            for line in split_lines(block):
+                line_number += 1
+                yield (name, line_number, line)
+
+    options = dict(options)
+
+    if arguments.method is not None:
+        options.update(method=arguments.method)
+
+    if arguments.timeout is not None:
+        options.update(timeout=arguments.timeout)
+
+    if arguments.max_redirects is not None:
+        options.update(max_redirects=arguments.max_redirects)
+
+    if arguments.max_retries is not None:
+        options.update(max_retries=arguments.max_retries)
+
+    if arguments.parse_documents:
+        options.update(parse_documents=True)
+
+    if arguments.insecure:
+        from .core.ssl_context import get_unverified_context
+        options.update(context=get_unverified_context())
+
+    backend = None
+
+    if arguments.cache is not None:
+        from .core.cache_backends import SQLiteCacheBackend
+        from .core.redirect_cache import RedirectCache
+
+        backend = SQLiteCacheBackend(arguments.cache)
+        options.update(cache=RedirectCache(backend=backend))
+
+    event_loop = asyncio.get_event_loop_policy().new_event_loop()
+
+    try:
+        return event_loop.run_until_complete(unshort_lines(lines(), options, arguments.concurrency, arguments.per_host, output))
+    finally:
+        event_loop.close()
+
+        if backend is not None:
+            backend.close()
+
+
+def get_parser() -> argparse.ArgumentParser:
+
+    parser = argparse.ArgumentParser(
+        prog=__title__.lower(),
+        description="Remove tracking fields from URLs and unshorten them. URLs are read one per line."
+    )
+
+    parser.add_argument("--version", action="version", version=f"{__title__} {__version__}")
+
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    subparsers.required = True
+
+    common = argparse.ArgumentParser(add_help=False)
+
+    common.add_argument("files", nargs="*", metavar="file", help="input files (defaults to the standard input; \"-\" also reads it)")
+    common.add_argument("-o", "--output", metavar="file", help="write the results to this file instead of the standard output")
+    common.add_argument("--block-size", type=int, default=BLOCK_SIZE, metavar="bytes", help=argparse.SUPPRESS)
+
+    for name in url_cleaner.CLEANER_OPTIONS:
+        common.add_argument(option_flag(name), dest=name, action="store_true", help=CLEANER_OPTIONS_HELP[name])
+
+    clean = subparsers.add_parser("clean", parents=[common], help="remove tracking fields from URLs")
+
+    clean.add_argument("-w", "--workers", type=int, default=1, metavar="n", help="number of processes to use (0 means one per CPU; defaults to 1)")
+    clean.add_argument("--field", action="append", metavar="path", help="read NDJSON records and clean the URL at this dotted field path (e.g. \"link.href\"); can be given several times")
+    clean.add_argument("--column", action="append", metavar="name", help="read CSV records and clean the URLs in this column (a zero-based index with --no-header); can be given several times")
+    clean.add_argument("--delimiter", default=",", metavar="character", help="CSV field delimiter (defaults to \",\")")
+    clean.add_argument("--no-header", action="store_true", help="CSV input has no header")
+
+    unshort = subparsers.add_parser("unshort", parents=[common], help="resolve shortened URLs (and remove tracking fields from them)")
+
+    unshort.add_argument("-c", "--concurrency", type=int, default=config.HTTP_MAX_CONCURRENCY, metavar="n", help=f"max number of URLs to resolve at the same time (defaults to {config.HTTP_MAX_CONCURRENCY})")
+    unshort.add_argument("--per-host", type=int, metavar="n", help=f"max number of URLs of the same host to resolve at the same time (defaults to {config.HTTP_MAX_CONCURRENCY_PER_HOST})")
+    unshort.add_argument("--method", help=f"HTTP method to use (defaults to {config.HTTP_METHOD})")
+    unshort.add_argument("--timeout", type=float, metavar="seconds", help=f"connection and read timeout (defaults to {config.HTTP_TIMEOUT})")
+    unshort.add_argument("--max-redirects", type=int, metavar="n", help=f"max number of redirects to follow (defaults to {config.HTTP_MAX_REDIRECTS})")
+    unshort.add_argument("--max-retries", type=int, metavar="n", help=f"max number of retries on connection errors (defaults to {config.HTTP_MAX_RETRIES})")
+    unshort.add_argument("--parse-documents", action="store_true", help="look for redirect URLs in the response body")
+    unshort.add_argument("--cache", metavar="file", help="keep redirects and results in this SQLite database, which other processes can share")
+    unshort.add_argument("--insecure", action="store_true", help="do not verify SSL certificates")
+
+    return parser
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+
+    parser = get_parser()
+    arguments = parser.parse_args(argv)
+
+    if arguments.block_size < 1:
+        parser.error("--block-size must be greater than 0")
+
+    if arguments.command == "clean" and arguments.workers < 0:
+        parser.error("--workers must not be negative")
+
+    if arguments.command == "clean":
+        if arguments.field and arguments.column:
+            parser.error("--field and --column can't be used together")
+
+        if arguments.field:
+            try:
+                record_cleaner.field_tree(arguments.field)
+            except ValueError as exception:
+                parser.error(f"--field: {exception}")
+
+        if arguments.column and arguments.no_header:
+            try:
+                arguments.column = [int(column) for column in arguments.column]
+            except ValueError:
+                parser.error("--column must be a zero-based index when used with --no-header")
+
+        if len(arguments.delimiter) != 1 or arguments.delimiter == "\"":
+            parser.error("--delimiter must be a single character other than '\"'")
+
+    if arguments.command == "unshort" and arguments.concurrency < 1:
+        parser.error("--concurrency must be greater than 0")
+
+    if arguments.command == "unshort" and arguments.per_host is not None and arguments.per_host < 1:
+        parser.error("--per-host must be greater than 0")
+
+    options = {name: True for name in url_cleaner.CLEANER_OPTIONS if getattr(arguments, name)}
+
+    if arguments.output is None:
+        output = sys.stdout.buffer
+    else:
+        output = open(arguments.output, "wb")
+
+    command = run_clean if arguments.command == "clean" else run_unshort
+
+    try:
+        try:
+            return command(arguments, options, output)
+        finally:
+            if output is sys.stdout.buffer:
+                output.flush()
+            else:
+                output.close()
+    except BrokenPipeError:
+        # The reader went away (e.g. "unalix clean urls.txt | head"); don't complain about it on exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
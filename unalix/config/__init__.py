@@ -3,7 +3,8 @@ from .paths import (
     PATH_RULESETS,
     PATH_COOKIES_ALLOW,
     PATH_BODY_REDIRECTS,
-    PATH_CA_BUNDLE
+    PATH_CA_BUNDLE,
+    PATH_CACHE
 )
 from .http import (
     HTTP_HEADERS,
@@ -13,9 +14,31 @@ from .http import (
     HTTP_STATUS_RETRY,
     HTTP_MAX_RETRIES,
     HTTP_STATUS_REDIRECT,
-    HTTP_METHOD
+    HTTP_METHOD,
+    HTTP_MAX_CONCURRENCY,
+    HTTP_MAX_CONCURRENCY_PER_HOST,
+    HTTP_POOL_MAX_CONNECTIONS,
+    HTTP_POOL_MAX_CONNECTIONS_PER_HOST,
+    HTTP_POOL_IDLE_TIMEOUT,
+    HTTP_MAX_HEADER_SIZE,
+    HTTP_MAX_HEADERS,
+    HTTP_CACHE_ENABLED,
+    HTTP_CACHE_MAX_ENTRIES,
+    HTTP_CACHE_TTL,
+    HTTP_CACHE_PERMANENT_TTL,
+    HTTP_CACHE_NEGATIVE_TTL,
+    HTTP_CACHE_COMPACT_INTERVAL,
+    HTTP_CACHE_PATH
+)
+from .rulesets import (
+    IGNORED_PROVIDERS,
+    CLEAR_URL_MAX_UNWRAPS,
+    CLEAR_URL_HOST_CACHE_SIZE,
+    CLEAR_URL_BACKEND,
+    CLEAR_URLS_CHUNK_SIZE,
+    CLEAN_TEXT_CACHE_SIZE,
+    CLEAN_TEXT_MAX_URL_LENGTH
 )
-from .rulesets import IGNORED_PROVIDERS
 
 __all__ = [
     "PATH_PACKAGE_DATA",
@@ -23,6 +46,7 @@ __all__ = [
     "PATH_COOKIES_ALLOW",
     "PATH_BODY_REDIRECTS",
     "PATH_CA_BUNDLE",
+    "PATH_CACHE",
     "HTTP_HEADERS",
     "HTTP_TIMEOUT",
     "HTTP_MAX_REDIRECTS",
@@ -31,7 +55,27 @@ __all__ = [
     "HTTP_STATUS_REDIRECT",
     "HTTP_MAX_RETRIES",
     "HTTP_METHOD",
-    "IGNORED_PROVIDERS"
+    "HTTP_MAX_CONCURRENCY",
+    "HTTP_MAX_CONCURRENCY_PER_HOST",
+    "HTTP_POOL_MAX_CONNECTIONS",
+    "HTTP_POOL_MAX_CONNECTIONS_PER_HOST",
+    "HTTP_POOL_IDLE_TIMEOUT",
+    "HTTP_MAX_HEADER_SIZE",
+    "HTTP_MAX_HEADERS",
+    "HTTP_CACHE_ENABLED",
+    "HTTP_CACHE_MAX_ENTRIES",
+    "HTTP_CACHE_TTL",
+    "HTTP_CACHE_PERMANENT_TTL",
+    "HTTP_CACHE_NEGATIVE_TTL",
+    "HTTP_CACHE_COMPACT_INTERVAL",
+    "HTTP_CACHE_PATH",
+    "IGNORED_PROVIDERS",
+    "CLEAR_URL_MAX_UNWRAPS",
+    "CLEAR_URL_HOST_CACHE_SIZE",
+    "CLEAR_URL_BACKEND",
+    "CLEAR_URLS_CHUNK_SIZE",
+    "CLEAN_TEXT_CACHE_SIZE",
+    "CLEAN_TEXT_MAX_URL_LENGTH"
 ]
 
 __locals = locals()
@@ -35,3 +35,31 @@ HTTP_STATUS_REDIRECT = (
     http.HTTPStatus.SEE_OTHER,
     http.HTTPStatus.TEMPORARY_REDIRECT
 )
+
+HTTP_MAX_CONCURRENCY = 16
+
+HTTP_MAX_CONCURRENCY_PER_HOST = 4
+
+HTTP_POOL_MAX_CONNECTIONS = 64
+
+HTTP_POOL_MAX_CONNECTIONS_PER_HOST = 8
+
+HTTP_POOL_IDLE_TIMEOUT = 30
+
+HTTP_MAX_HEADER_SIZE = 65536
+
+HTTP_MAX_HEADERS = 100
+
+HTTP_CACHE_ENABLED = False
+
+HTTP_CACHE_MAX_ENTRIES = 65536
+
+HTTP_CACHE_TTL = 3600
+
+HTTP_CACHE_PERMANENT_TTL = 30 * 24 * 3600
+
+HTTP_CACHE_NEGATIVE_TTL = 60
+
+HTTP_CACHE_COMPACT_INTERVAL = 300
+
+HTTP_CACHE_PATH = None
@@ -1,5 +1,6 @@
 import pathlib
 import os.path
+import tempfile
 
 
 PATH_PACKAGE_DATA = os.path.join(pathlib.Path(__file__).parent.parent, "package_data")
@@ -18,3 +19,24 @@ PATH_BODY_REDIRECTS = (
 )
 
 PATH_CA_BUNDLE = os.path.join(PATH_PACKAGE_DATA, "ca", "ca-bundle.crt")
+
+
+def get_cache_home() -> str:
+
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+
+    # Relative paths are invalid and must be ignored (https://specifications.freedesktop.org/basedir-spec/latest/)
+    if cache_home and os.path.isabs(cache_home):
+        return cache_home
+
+    home = os.path.expanduser("~")
+
+    # expanduser() returns the path unchanged when the home directory can't be determined
+    if os.path.isabs(home):
+        return os.path.join(home, ".cache")
+
+    return tempfile.gettempdir()
+
+
+# Directory where snapshots of the compiled rulesets are cached (None disables the cache)
+PATH_CACHE = os.path.join(get_cache_home(), "unalix")
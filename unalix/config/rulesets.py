@@ -4,3 +4,22 @@ IGNORED_PROVIDERS = (
     "ClearURLsTest2",
     "ClearURLsTestBlock2"
 )
+
+# How many nested redirections (e.g. a Google redirect to a Facebook redirect) are unwrapped for a single URL
+CLEAR_URL_MAX_UNWRAPS = 10
+
+# How many hosts each Cleaner remembers the matching providers for
+CLEAR_URL_HOST_CACHE_SIZE = 4096
+
+# How Cleaner objects run the rulesets: "interpreted" (a loop over the providers) or "generated" (Python code
+# generated for each set of options, see unalix.core.codegen)
+CLEAR_URL_BACKEND = "interpreted"
+
+# How many URLs unalix.clear_urls() takes from its input at a time
+CLEAR_URLS_CHUNK_SIZE = 1024
+
+# How many distinct URLs unalix.clean_text() remembers within a document
+CLEAN_TEXT_CACHE_SIZE = 65536
+
+# URLs longer than this are left untouched by unalix.clean_text_stream()
+CLEAN_TEXT_MAX_URL_LENGTH = 65536
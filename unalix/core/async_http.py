@@ -0,0 +1,633 @@
+import asyncio
+import collections
+import http.client
+import ssl
+import time
+import typing
+
+from .. import config
+from .. import types
+from .connection_pool import PoolInfo
+
+# Errors raised when the server closed a kept-alive connection before we used it again
+STALE_CONNECTION_ERRORS = (ConnectionError, EOFError, http.client.BadStatusLine)
+
+
+class HeadParser:
+    """
+    Incremental parser for the status line and headers of an HTTP/1.x response.
+
+    Data is given to feed() as it arrives, in pieces of any size. The head can't be longer than `max_size` bytes
+    or have more than `max_headers` headers, and the usual http.client exceptions are raised for invalid ones.
+    """
+
+    __slots__ = (
+        "max_size",
+        "max_headers",
+        "buffer",
+        "size",
+        "http_version",
+        "status_code",
+        "status_message",
+        "fields",
+        "complete",
+        "rest"
+    )
+
+
+    def __init__(self, max_size: typing.Optional[int] = None, max_headers: typing.Optional[int] = None):
+
+        self.max_size = max_size if max_size is not None else config.HTTP_MAX_HEADER_SIZE
+        self.max_headers = max_headers if max_headers is not None else config.HTTP_MAX_HEADERS
+
+        self.buffer = bytearray()
+        self.size = 0
+
+        self.http_version = None
+        self.status_code = None
+        self.status_message = None
+
+        # (name, value) pairs, in the order they were received
+        self.fields = []
+
+        self.complete = False
+
+        # Bytes received after the end of the head (the start of the body)
+        self.rest = b""
+
+
+    def feed(self, data: bytes) -> bool:
+        """
+        Parse the lines completed by the given data. Returns True once the empty line that ends the head
+        was found, after which the bytes that followed it are in self.rest.
+        """
+
+        buffer = self.buffer
+
+        # Only the new data can hold the end of a line
+        scan = len(buffer)
+        position = 0
+
+        buffer += data
+        self.size += len(data)
+
+        while True:
+            end = buffer.find(b"\n", scan)
+
+            if end == -1:
+                break
+
+            line = bytes(buffer[position:end]).rstrip(b"\r")
+            position = scan = end + 1
+
+            if self.parse_line(line):
+                self.rest = bytes(buffer[position:])
+                self.size -= len(self.rest)
+                self.complete = True
+
+                buffer.clear()
+
+                break
+
+        if self.size > self.max_size:
+            raise http.client.LineTooLong(f"response head longer than {self.max_size} bytes")
+
+        if not self.complete:
+            del buffer[:position]
+
+        return self.complete
+
+
+    def parse_line(self, line: bytes) -> bool:
+
+        if self.status_code is None:
+            # https://datatracker.ietf.org/doc/html/rfc7230#section-3.5
+            if not line:
+                return False
+
+            version, separator, rest = line.partition(b" ")
+            status, separator, reason = rest.partition(b" ")
+
+            if not version.startswith(b"HTTP/") or len(status) != 3 or not status.isdigit():
+                raise http.client.BadStatusLine(line.decode(encoding="latin-1"))
+
+            try:
+                self.http_version = float(version[5:])
+            except ValueError:
+                raise http.client.BadStatusLine(line.decode(encoding="latin-1")) from None
+
+            self.status_code = int(status)
+            self.status_message = reason.strip().decode(encoding="latin-1")
+
+            return False
+
+        if not line:
+            return True
+
+        # Obsolete line folding (https://datatracker.ietf.org/doc/html/rfc7230#section-3.2.4)
+        if line.startswith((b" ", b"\t")) and self.fields:
+            name, value = self.fields[-1]
+            self.fields[-1] = (name, f"{value} {line.strip().decode(encoding='latin-1')}")
+            return False
+
+        name, separator, value = line.partition(b":")
+
+        if not separator or not name or name != name.strip():
+            raise http.client.HTTPException(f"invalid header line: {line!r}")
+
+        if len(self.fields) >= self.max_headers:
+            raise http.client.HTTPException(f"got more than {self.max_headers} headers")
+
+        self.fields.append((name.decode(encoding="latin-1"), value.strip().decode(encoding="latin-1")))
+
+        return False
+
+
+    def headers(self) -> http.client.HTTPMessage:
+        """
+        Return the headers as a case-insensitive mapping.
+        """
+
+        message = http.client.HTTPMessage()
+
+        for name, value in self.fields:
+            message[name] = value
+
+        return message
+
+
+class AsyncConnection:
+    """
+    An HTTP/1.1 connection opened with asyncio.open_connection().
+    """
+
+    __slots__ = (
+        "key",
+        "reader",
+        "writer",
+        "released"
+    )
+
+
+    def __init__(self, key: tuple, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+
+        self.key = key
+        self.reader = reader
+        self.writer = writer
+        self.released = None
+
+
+    @classmethod
+    async def open(
+        cls,
+        scheme: str,
+        host: str,
+        port: int,
+        context: typing.Optional[ssl.SSLContext] = None,
+        ssl_handshake_timeout: typing.Optional[float] = None
+    ) -> "AsyncConnection":
+
+        options = {}
+
+        if scheme == "https":
+            options.update(ssl=context, ssl_handshake_timeout=ssl_handshake_timeout)
+
+        # The limit also bounds the length of each line of the response head
+        reader, writer = await asyncio.open_connection(
+            host=host,
+            port=port,
+            limit=config.HTTP_MAX_HEADER_SIZE,
+            **options
+        )
+
+        return cls((scheme, host, port, context if scheme == "https" else None), reader, writer)
+
+
+    def is_dropped(self) -> bool:
+        """
+        Whether an idle connection can't be reused, because it's closed or the server closed its side.
+        """
+
+        return (
+            self.reader.at_eof() or self.reader.exception() is not None or self.writer.transport.is_closing()
+        )
+
+
+    async def close(self) -> None:
+        """
+        Close the connection and wait until its socket is closed.
+        """
+
+        self.writer.close()
+
+        # StreamWriter.wait_closed() is new in Python 3.7
+        wait_closed = getattr(self.writer, "wait_closed", None)
+
+        if wait_closed is not None:
+            try:
+                await wait_closed()
+            except asyncio.CancelledError:
+                # An Exception subclass before Python 3.8
+                raise
+            except Exception:
+                pass
+
+
+    async def request(
+        self,
+        method: str,
+        target: str,
+        headers: typing.Dict[str, str],
+        max_fetch_size: int
+    ) -> typing.Tuple[types.Response, bool]:
+        """
+        Send a request and read its response, keeping at most `max_fetch_size` bytes of the body.
+
+        Returns (response, reusable), where `reusable` tells whether the body was read to its end and the
+        connection can be used for another request. response.body holds the body as bytes.
+        """
+
+        lines = [f"{method} {target} HTTP/1.1"]
+
+        for key, value in headers.items():
+            lines.append(f"{key}: {value}")
+
+        lines.extend(("", ""))
+
+        self.writer.write("\r\n".join(lines).encode(encoding="latin-1"))
+        await self.writer.drain()
+
+        while True:
+            head = await self.read_head()
+
+            # Interim responses (e.g. "100 Continue") are followed by the actual response
+            if not 100 <= head.status_code < 200 or head.status_code == 101:
+                break
+
+        response_headers = head.headers()
+
+        connection = [token.strip().lower() for token in ",".join(response_headers.get_all("Connection", ())).split(",")]
+
+        will_close = "close" in connection or (head.http_version < 1.1 and "keep-alive" not in connection)
+
+        if method == "HEAD" or head.status_code < 200 or head.status_code in (204, 304):
+            body, complete = b"", True
+        elif "chunked" in response_headers.get("Transfer-Encoding", "").lower():
+            body, complete = await self.read_chunked(max_fetch_size)
+        elif response_headers.get("Content-Length", "").strip().isdigit():
+            length = int(response_headers["Content-Length"])
+
+            complete = length <= max_fetch_size
+            body = await self.reader.readexactly(min(length, max_fetch_size))
+        else:
+            # The body ends when the server closes the connection
+            body, complete = await self.read_until_eof(max_fetch_size), False
+
+        response = types.Response(
+            http_version=head.http_version,
+            status_code=head.status_code,
+            status_message=head.status_message,
+            headers=response_headers,
+            body=body
+        )
+
+        return (response, complete and not will_close)
+
+
+    async def read_head(self) -> HeadParser:
+
+        parser = HeadParser()
+
+        while True:
+            # Reading line by line never consumes bytes of the body
+            line = await self.reader.readuntil(b"\n")
+
+            if parser.feed(line):
+                return parser
+
+
+    async def read_chunked(self, max_fetch_size: int) -> typing.Tuple[bytes, bool]:
+
+        reader = self.reader
+        body = bytearray()
+
+        while True:
+            line = await reader.readuntil(b"\n")
+
+            try:
+                size = int(line.split(b";", 1)[0].strip(), 16)
+            except ValueError:
+                raise http.client.IncompleteRead(bytes(body)) from None
+
+            if size == 0:
+                break
+
+            if len(body) + size > max_fetch_size:
+                body += await reader.readexactly(max_fetch_size - len(body))
+                return (bytes(body), False)
+
+            body += await reader.readexactly(size)
+
+            # CRLF after the chunk data
+            await reader.readuntil(b"\n")
+
+        # Trailer fields, which end with an empty line
+        trailer = HeadParser()
+        trailer.status_code = 0
+
+        while not trailer.feed(await reader.readuntil(b"\n")):
+            pass
+
+        return (bytes(body), True)
+
+
+    async def read_until_eof(self, max_fetch_size: int) -> bytes:
+
+        body = bytearray()
+
+        while len(body) < max_fetch_size:
+            data = await self.reader.read(max_fetch_size - len(body))
+
+            if not data:
+                break
+
+            body += data
+
+        return bytes(body)
+
+
+class AsyncConnectionPool:
+    """
+    A pool of HTTP/1.1 keep-alive connections for asyncio, keyed by (scheme, host, port, SSL context).
+    It works like unalix.ConnectionPool, but it must only be used from one event loop.
+
+    Idle connections are closed when the pool is closed; use it as an async context manager so that
+    no socket outlives it.
+
+    Usage example:
+
+        >>> import asyncio
+        >>>
+        >>> import unalix
+        >>>
+        >>> async def main():
+        ...     async with unalix.AsyncConnectionPool(max_connections_per_host=2) as pool:
+        ...         return await unalix.aunshort_url("https://bitly.is/Pricing-Pop-Up", pool=pool)
+        ...
+        >>> asyncio.get_event_loop().run_until_complete(main())
+        'https://bitly.com/pages/pricing'
+    """
+
+    __slots__ = (
+        "max_connections",
+        "max_connections_per_host",
+        "idle_timeout",
+        "idle",
+        "counts",
+        "total",
+        "created",
+        "reused",
+        "waiters"
+    )
+
+
+    def __init__(
+        self,
+        max_connections: typing.Optional[int] = None,
+        max_connections_per_host: typing.Optional[int] = None,
+        idle_timeout: typing.Optional[float] = None
+    ):
+
+        self.max_connections = (
+            max_connections if max_connections is not None else config.HTTP_POOL_MAX_CONNECTIONS
+        )
+        self.max_connections_per_host = (
+            max_connections_per_host if max_connections_per_host is not None else config.HTTP_POOL_MAX_CONNECTIONS_PER_HOST
+        )
+        self.idle_timeout = (
+            idle_timeout if idle_timeout is not None else config.HTTP_POOL_IDLE_TIMEOUT
+        )
+
+        # key -> deque of idle connections, the most recently released connection last
+        self.idle = {}
+
+        # key -> number of open connections (idle or in use)
+        self.counts = collections.Counter()
+
+        self.total = 0
+        self.created = 0
+        self.reused = 0
+
+        # Futures of the acquire() calls waiting for a free slot
+        self.waiters = collections.deque()
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+
+    def pool_info(self) -> PoolInfo:
+
+        return PoolInfo(
+            self.total, sum(len(connections) for connections in self.idle.values()),
+            self.created, self.reused, self.max_connections, self.max_connections_per_host
+        )
+
+
+    async def acquire(
+        self,
+        scheme: str,
+        host: str,
+        port: int,
+        timeout: typing.Optional[float] = None,
+        context: typing.Optional[ssl.SSLContext] = None,
+        ssl_handshake_timeout: typing.Optional[float] = None,
+        reuse: typing.Optional[bool] = True
+    ) -> typing.Tuple[AsyncConnection, bool]:
+        """
+        Return (connection, reused), like unalix.ConnectionPool.acquire(). Waiting for a free slot and
+        opening the connection take at most `timeout` seconds, after which asyncio.TimeoutError is raised.
+
+        The connection must be given back with release() once it's no longer used.
+        """
+
+        key = (scheme, host, port, context if scheme == "https" else None)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        dropped = []
+
+        try:
+            while True:
+                connection = self.pop_idle(key, dropped) if reuse else None
+
+                if connection is not None:
+                    self.reused += 1
+                    return (connection, True)
+
+                if not self.has_room(key) and not (reuse is False and self.evict(key, dropped)):
+                    # Make room by closing an idle connection of another key
+                    self.evict(None, dropped, exclude=key)
+
+                if self.has_room(key):
+                    self.counts[key] += 1
+                    self.total += 1
+                    self.created += 1
+                    break
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+
+                if remaining is not None and remaining <= 0:
+                    raise asyncio.TimeoutError(f"Timed out waiting for a connection to {host}:{port}")
+
+                waiter = asyncio.get_event_loop().create_future()
+                self.waiters.append(waiter)
+
+                try:
+                    await asyncio.wait_for(waiter, remaining)
+                finally:
+                    if waiter in self.waiters:
+                        self.waiters.remove(waiter)
+        finally:
+            for old_connection in dropped:
+                await old_connection.close()
+
+        try:
+            connection = await asyncio.wait_for(
+                AsyncConnection.open(scheme, host, port, context=context, ssl_handshake_timeout=ssl_handshake_timeout),
+                None if deadline is None else max(deadline - time.monotonic(), 0)
+            )
+        except BaseException:
+            self.forget(key)
+            raise
+
+        return (connection, False)
+
+
+    async def release(self, connection: AsyncConnection, reusable: typing.Optional[bool] = False) -> None:
+        """
+        Give back a connection obtained from acquire(). It's kept for later requests if `reusable` is True,
+        and closed otherwise.
+        """
+
+        if reusable and self.idle_timeout != 0 and not connection.is_dropped():
+            connection.released = time.monotonic()
+            self.idle.setdefault(connection.key, collections.deque()).append(connection)
+            self.notify()
+            return
+
+        self.forget(connection.key)
+
+        await connection.close()
+
+
+    async def aclose(self) -> None:
+        """
+        Close all idle connections and wait until their sockets are closed. Connections in use are closed
+        when they are released.
+        """
+
+        dropped = []
+
+        for key in list(self.idle):
+            self.evict(key, dropped, everything=True)
+
+        for connection in dropped:
+            await connection.close()
+
+
+    def notify(self) -> None:
+
+        while self.waiters:
+            waiter = self.waiters.popleft()
+
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+
+    def has_room(self, key: tuple) -> bool:
+
+        return (
+            (self.max_connections is None or self.total < self.max_connections) and
+            (self.max_connections_per_host is None or self.counts[key] < self.max_connections_per_host)
+        )
+
+
+    def forget(self, key: tuple) -> None:
+
+        self.counts[key] -= 1
+
+        if not self.counts[key]:
+            del self.counts[key]
+
+        self.total -= 1
+        self.notify()
+
+
+    def pop_idle(self, key: tuple, dropped: list) -> typing.Optional[AsyncConnection]:
+
+        connections = self.idle.get(key)
+
+        now = time.monotonic()
+
+        while connections:
+            connection = connections.pop()
+
+            if (self.idle_timeout is not None and now - connection.released > self.idle_timeout) or connection.is_dropped():
+                self.forget(key)
+                dropped.append(connection)
+                continue
+
+            if not connections:
+                del self.idle[key]
+
+            return connection
+
+        self.idle.pop(key, None)
+
+        return None
+
+
+    def evict(
+        self,
+        key: typing.Optional[tuple],
+        dropped: list,
+        exclude: typing.Optional[tuple] = None,
+        everything: typing.Optional[bool] = False
+    ) -> bool:
+        """
+        Close the least recently released idle connection of `key` (or of any key other than `exclude`),
+        or all of them if `everything` is True. Returns whether a connection was closed.
+        """
+
+        if key is None:
+            candidates = [
+                (connections[0].released, other_key) for other_key, connections in self.idle.items()
+                if other_key != exclude and connections
+            ]
+
+            if not candidates:
+                return False
+
+            released, key = min(candidates, key=lambda candidate: candidate[0])
+
+        connections = self.idle.get(key)
+
+        if not connections:
+            return False
+
+        while connections:
+            self.forget(key)
+            dropped.append(connections.popleft())
+
+            if not everything:
+                break
+
+        if not connections:
+            del self.idle[key]
+
+        return True
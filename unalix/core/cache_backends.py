@@ -0,0 +1,420 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import typing
+import weakref
+
+from .. import config
+from .. import types
+
+# SQLite limits the number of variables of a statement (999 before SQLite 3.32)
+SQLITE_MAX_VARIABLES = 900
+
+
+class CacheBackend:
+    """
+    Storage of unalix.RedirectCache entries. Keys are strings, and values are lists or tuples of strings, numbers,
+    None or lists of these (anything JSON can hold). Each entry has an expiration time (a time.time() timestamp),
+    after which it's never returned again.
+
+    Subclasses implement get_many(), put_many(), items(), compact() and clear(); the other methods are built on them.
+
+    Expired entries are deleted by a background thread every `compact_interval` seconds (defaults to
+    unalix.config.HTTP_CACHE_COMPACT_INTERVAL, pass 0 to only delete them when compact() is called).
+    """
+
+    # Whether writes can wait for other threads or processes, in which case unalix.aunshort_url() runs them in
+    # the default executor of the event loop instead of blocking it
+    blocking = False
+
+    def __init__(self, compact_interval: typing.Optional[float] = None):
+
+        self.compact_interval = (
+            compact_interval if compact_interval is not None else config.HTTP_CACHE_COMPACT_INTERVAL
+        )
+
+        self.stopped = threading.Event()
+        self.compactor = None
+
+        if self.compact_interval:
+            # The thread only holds a weak reference, so that it ends once the backend is no longer used
+            self.compactor = threading.Thread(
+                target=compact_periodically,
+                args=(weakref.ref(self), self.stopped, self.compact_interval),
+                name="unalix-cache-compactor",
+                daemon=True
+            )
+            self.compactor.start()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def get(self, key: str, default: typing.Any = None) -> typing.Any:
+
+        return self.get_many((key,)).get(key, default)
+
+
+    def put(self, key: str, value: typing.Sequence[typing.Any], expires: float) -> None:
+
+        self.put_many(((key, value, expires),))
+
+
+    def get_many(self, keys: typing.Iterable[str]) -> typing.Dict[str, typing.Any]:
+        """
+        Return a {key: value} dictionary of the given keys that have an entry that didn't expire.
+        """
+
+        raise NotImplementedError
+
+
+    def put_many(self, entries: typing.Iterable[typing.Tuple[str, typing.Sequence[typing.Any], float]]) -> None:
+        """
+        Store the given (key, value, expires) entries, replacing the existing ones.
+        """
+
+        raise NotImplementedError
+
+
+    def items(self) -> typing.Iterator[typing.Tuple[str, typing.Any, float]]:
+        """
+        Iterate over the (key, value, expires) entries that didn't expire.
+        """
+
+        raise NotImplementedError
+
+
+    def compact(self, now: typing.Optional[float] = None) -> int:
+        """
+        Delete the expired entries and return how many were deleted.
+        """
+
+        raise NotImplementedError
+
+
+    def clear(self) -> None:
+
+        raise NotImplementedError
+
+
+    def close(self) -> None:
+        """
+        Stop the background compaction.
+        """
+
+        self.stopped.set()
+
+
+    def save_snapshot(self, path: str) -> int:
+        """
+        Write the entries that didn't expire to the given file (one JSON array per line), and return how many
+        were written. The file is replaced at once, so that readers never see a partial snapshot.
+        """
+
+        directory = os.path.dirname(os.path.abspath(path))
+        count = 0
+
+        with tempfile.NamedTemporaryFile(mode="w", dir=directory, suffix=".tmp", delete=False, encoding="utf-8") as file:
+            for entry in self.items():
+                file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+                count += 1
+
+        os.replace(file.name, path)
+
+        return count
+
+
+    def load_snapshot(self, path: str) -> int:
+        """
+        Store the entries of a file written by save_snapshot() (from any backend) that didn't expire yet,
+        and return how many were stored. A missing file is the same as an empty one.
+        """
+
+        try:
+            file = open(path, encoding="utf-8")
+        except FileNotFoundError:
+            return 0
+
+        now = time.time()
+        entries = []
+
+        with file:
+            for line in file:
+                key, value, expires = json.loads(line)
+
+                if expires > now:
+                    entries.append((key, value, expires))
+
+        self.put_many(entries)
+
+        return len(entries)
+
+
+def compact_periodically(reference: weakref.ref, stopped: threading.Event, interval: float) -> None:
+
+    while not stopped.wait(interval):
+        backend = reference()
+
+        if backend is None:
+            return
+
+        try:
+            backend.compact()
+        except Exception:
+            # e.g. a locked or removed database; the next run tries again
+            pass
+
+        del backend
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Keeps the entries in an unalix.types.LRUCache of this process, which holds at most `max_entries` entries
+    (defaults to unalix.config.HTTP_CACHE_MAX_ENTRIES).
+    """
+
+    def __init__(self, max_entries: typing.Optional[int] = None, compact_interval: typing.Optional[float] = None):
+
+        self.entries = types.LRUCache(
+            max_entries=max_entries if max_entries is not None else config.HTTP_CACHE_MAX_ENTRIES
+        )
+
+        super().__init__(compact_interval=compact_interval)
+
+
+    def get_many(self, keys: typing.Iterable[str]) -> typing.Dict[str, typing.Any]:
+
+        now = time.time()
+        results = {}
+
+        for key in keys:
+            entry = self.entries.get(key)
+
+            if entry is not None and entry[1] > now:
+                results[key] = entry[0]
+
+        return results
+
+
+    def put_many(self, entries: typing.Iterable[typing.Tuple[str, typing.Sequence[typing.Any], float]]) -> None:
+
+        for key, value, expires in entries:
+            self.entries.put(key, (tuple(value), expires))
+
+
+    def items(self) -> typing.Iterator[typing.Tuple[str, typing.Any, float]]:
+
+        now = time.time()
+
+        for key, (value, expires) in self.entries.items():
+            if expires > now:
+                yield (key, value, expires)
+
+
+    def compact(self, now: typing.Optional[float] = None) -> int:
+
+        now = time.time() if now is None else now
+
+        # Checked under the lock of the cache, so that entries replaced in the meantime are kept
+        return self.entries.evict(lambda entry: entry[1] <= now)
+
+
+    def clear(self) -> None:
+
+        self.entries.clear()
+
+
+class LocalConnection:
+    """
+    Holds the SQLite connection of one thread.
+    """
+
+    __slots__ = (
+        "connection",
+        "__weakref__"
+    )
+
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+
+def close_connection(connections: typing.Set[sqlite3.Connection], lock: threading.Lock, connection: sqlite3.Connection) -> None:
+
+    with lock:
+        # Already closed by SQLiteCacheBackend.close()
+        if connection not in connections:
+            return
+
+        connections.discard(connection)
+
+    connection.close()
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Keeps the entries in an SQLite database, which any number of threads and processes can share.
+
+    The database uses write-ahead logging, so readers don't wait for writers. Each thread uses its own
+    connection, which is closed when the thread exits (or by close()), and writers wait up to `timeout`
+    seconds for each other.
+
+    Usage example:
+
+        >>> import unalix
+        >>>
+        >>> backend = unalix.SQLiteCacheBackend("/var/cache/unalix.sqlite")
+        >>> cache = unalix.RedirectCache(backend=backend)
+        >>>
+        >>> unalix.unshort_url("https://bitly.is/Pricing-Pop-Up", cache=cache)
+        'https://bitly.com/pages/pricing'
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        path: str,
+        timeout: typing.Optional[float] = None,
+        compact_interval: typing.Optional[float] = None
+    ):
+
+        self.path = path
+        self.timeout = timeout if timeout is not None else config.HTTP_TIMEOUT
+
+        # The connections of threads that are still running
+        self.local = threading.local()
+        self.connections = set()
+        self.lock = threading.Lock()
+
+        connection = self.connect()
+
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL) WITHOUT ROWID"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires)")
+
+        super().__init__(compact_interval=compact_interval)
+
+
+    def connect(self) -> sqlite3.Connection:
+
+        local_connection = getattr(self.local, "connection", None)
+
+        if local_connection is not None:
+            return local_connection.connection
+
+        connection = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+
+        # Changing the journal mode needs a lock, which is already held when other processes are using the database
+        if connection.execute("PRAGMA journal_mode").fetchone()[0].lower() != "wal":
+            connection.execute("PRAGMA journal_mode=WAL")
+
+        # A crash can lose the last writes, but never corrupts the database
+        connection.execute("PRAGMA synchronous=NORMAL")
+
+        local_connection = LocalConnection(connection)
+
+        with self.lock:
+            self.connections.add(connection)
+
+        # Thread-local values are dropped when their thread exits
+        weakref.finalize(local_connection, close_connection, self.connections, self.lock, connection)
+
+        self.local.connection = local_connection
+
+        return connection
+
+
+    def get_many(self, keys: typing.Iterable[str]) -> typing.Dict[str, typing.Any]:
+
+        keys = list(keys)
+        connection = self.connect()
+        now = time.time()
+
+        results = {}
+
+        for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+            chunk = keys[start:start + SQLITE_MAX_VARIABLES]
+
+            rows = connection.execute(
+                f"SELECT key, value FROM entries WHERE expires > ? AND key IN ({', '.join('?' * len(chunk))})",
+                (now, *chunk)
+            )
+
+            for key, value in rows:
+                results[key] = tuple(json.loads(value))
+
+        return results
+
+
+    def put_many(self, entries: typing.Iterable[typing.Tuple[str, typing.Sequence[typing.Any], float]]) -> None:
+
+        rows = [
+            (key, json.dumps(value, separators=(",", ":")), expires) for key, value, expires in entries
+        ]
+
+        if not rows:
+            return
+
+        connection = self.connect()
+
+        # One transaction (and one disk sync) for all entries
+        with connection:
+            connection.executemany("INSERT OR REPLACE INTO entries (key, value, expires) VALUES (?, ?, ?)", rows)
+
+
+    def items(self) -> typing.Iterator[typing.Tuple[str, typing.Any, float]]:
+
+        rows = self.connect().execute(
+            "SELECT key, value, expires FROM entries WHERE expires > ?", (time.time(),)
+        ).fetchall()
+
+        for key, value, expires in rows:
+            yield (key, tuple(json.loads(value)), expires)
+
+
+    def compact(self, now: typing.Optional[float] = None) -> int:
+
+        connection = self.connect()
+
+        with connection:
+            cursor = connection.execute("DELETE FROM entries WHERE expires <= ?", (time.time() if now is None else now,))
+
+        return cursor.rowcount
+
+
+    def clear(self) -> None:
+
+        connection = self.connect()
+
+        with connection:
+            connection.execute("DELETE FROM entries")
+
+
+    def close(self) -> None:
+        """
+        Stop the background compaction and close the connections of all threads.
+        """
+
+        super().close()
+
+        if self.compactor is not None:
+            self.compactor.join()
+
+        with self.lock:
+            for connection in self.connections:
+                connection.close()
+
+            self.connections.clear()
+
+        self.local = threading.local()
@@ -0,0 +1,330 @@
+import hashlib
+import importlib.util
+import os
+import tempfile
+import typing
+
+from .. import config
+from .. import types
+from .. import utils
+
+from . import coreutils
+
+# Bump this whenever the generated code changes in a way the source of this module doesn't show
+CODEGEN_VERSION = 1
+
+
+class Writer:
+    """
+    Collects indented lines of generated code.
+    """
+
+
+    def __init__(self):
+        self.lines = []
+
+
+    def __call__(self, level: typing.Optional[int] = 0, line: typing.Optional[str] = "") -> None:
+        self.lines.append("    " * level + line if line else "")
+
+
+    def source(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def literal_test(literals: typing.Iterable[str], name: str) -> typing.Optional[str]:
+    """
+    Return the expression that checks whether `name` contains one of the given literals, or None if
+    that is always the case (one of them is empty).
+    """
+
+    literals = tuple(literals)
+
+    if not literals or "" in literals:
+        return None
+
+    return " or ".join(f"{literal!r} in {name}" for literal in literals)
+
+
+def write_query_filter(write: Writer, index: int, query_filters: typing.Sequence[typing.Callable[[str], str]]) -> None:
+    """
+    Write filter_<index>(query), the same as types.apply_query_filters(query_filters, query) with its loop unrolled.
+    """
+
+    arguments = []
+
+    for number, query_filter in enumerate(query_filters):
+        if isinstance(query_filter, types.FieldNames):
+            arguments.append(f"filter_{number}=providers[{index}][4][{number}]")
+            arguments.append(f"names_{number}=providers[{index}][4][{number}].names")
+        else:
+            arguments.append(f"sub_{number}=providers[{index}][4][{number}].pattern.compiled.sub")
+
+    write(1, f"def filter_{index}(query, {', '.join(arguments)}):")
+
+    write(2, "if \"%\" in query:")
+
+    for number, query_filter in enumerate(query_filters):
+        if isinstance(query_filter, types.FieldNames):
+            write(3, f"query = filter_{number}(query)")
+            continue
+
+        test = literal_test(query_filter.literals, "query")
+
+        if test is None:
+            write(3, f"query = sub_{number}(r\"\\g<1>\", query)")
+        else:
+            write(3, f"if {test}:")
+            write(4, f"query = sub_{number}(r\"\\g<1>\", query)")
+
+    write(3, "return query")
+
+    # Names present in the query are only collected again after a filter changed it
+    collected = False
+
+    for number, query_filter in enumerate(query_filters):
+        if isinstance(query_filter, types.FieldNames):
+            if collected:
+                write(2, "if present is None:")
+                write(3, "present = {field.partition(\"=\")[0] for field in query.split(\"&\")}")
+            else:
+                write(2, "present = {field.partition(\"=\")[0] for field in query.split(\"&\")}")
+                collected = True
+
+            # Without "%", a name only matches a whole field name followed by "=" (see types.FieldNames.find())
+            test = f"not present.isdisjoint(names_{number})"
+            statement = (
+                f"result = \"&\".join([\"\" if \"=\" in field and field.partition(\"=\")[0] in names_{number} else field "
+                "for field in query.split(\"&\")])"
+            )
+        else:
+            test = literal_test(query_filter.literals, "query")
+            statement = f"result = sub_{number}(r\"\\g<1>\", query)"
+
+        level = 2
+
+        if test is not None:
+            write(2, f"if {test}:")
+            level = 3
+
+        write(level, statement)
+        write(level, "if result != query:")
+        write(level + 1, "query = result")
+        write(level + 1, "present = None")
+
+    write(2, "return query")
+    write()
+
+
+def write_provider(write: Writer, index: int, provider: tuple) -> None:
+    """
+    Write provider_<index>(raw_url, url, visited), which does what Cleaner.apply() does for a single provider
+    and returns (url, None), or (None, redirect_url) when a redirection matched.
+    """
+
+    position, urlPattern, exceptions, redirections, query_filters, rawRules = provider
+
+    if query_filters:
+        write_query_filter(write, index, query_filters)
+
+    arguments = []
+
+    for number in range(len(exceptions)):
+        arguments.append(f"exception_{number}=providers[{index}][2][{number}].compiled.match")
+
+    for number in range(len(redirections)):
+        arguments.append(f"redirection_{number}=providers[{index}][3][{number}]")
+
+    if query_filters:
+        arguments.append(f"query_filter=filter_{index}")
+
+    for number in range(len(rawRules)):
+        arguments.append(f"raw_rule_{number}=providers[{index}][5][{number}].compiled.sub")
+
+    write(1, f"def provider_{index}(raw_url, url, visited{''.join(', ' + argument for argument in arguments)}):")
+
+    if exceptions or redirections:
+        # The first ruleset sees the URL exactly as given, the following ones see it serialized
+        write(2, "current_url = raw_url" if position == 0 else "current_url = url.geturl()")
+
+    # https://docs.clearurls.xyz/latest/specs/rules/#exceptions
+    for number, exception in enumerate(exceptions):
+        test = literal_test((exception.literal,), "current_url")
+        match = f"exception_{number}(current_url)"
+
+        write(2, f"if {match if test is None else f'({test}) and {match}'}:")
+        write(3, "return (url, None)")
+
+    # https://docs.clearurls.xyz/latest/specs/rules/#redirections
+    if redirections:
+        write(2, "if visited is not None:")
+
+        for number in range(len(redirections)):
+            write(3, f"redirect_url = redirection_target(redirection_{number}, current_url)")
+            write(3, "if redirect_url is not None and redirect_url not in visited:")
+            write(4, "return (None, redirect_url)")
+
+    # https://docs.clearurls.xyz/latest/specs/rules/#rules
+    # https://docs.clearurls.xyz/latest/specs/rules/#referralmarketing
+    if query_filters:
+        write(2, "query = url.query")
+        write(2, "if query:")
+        write(3, "url.query = query_filter(query)")
+        write(2, "fragment = url.fragment")
+        write(2, "if fragment:")
+        write(3, "url.fragment = query_filter(fragment)")
+
+    # https://docs.clearurls.xyz/latest/specs/rules/#rawrules
+    if rawRules:
+        write(2, "path = url.path")
+        write(2, "if path:")
+        write(3, "new_path = path")
+
+        for number, rawRule in enumerate(rawRules):
+            test = literal_test((rawRule.literal,), "new_path")
+            level = 3
+
+            if test is not None:
+                write(3, f"if {test}:")
+                level = 4
+
+            write(level, f"new_path = raw_rule_{number}(\"\", new_path)")
+
+        write(3, "if new_path != path:")
+        write(4, "url.path = new_path")
+        write(4, "url = MutableURL(url.geturl())")
+
+    write(2, "return (url, None)")
+    write()
+
+
+def generate_source(providers: typing.Sequence[tuple], stripEmpty: bool, stripDuplicates: bool) -> str:
+    """
+    Generate the source of a module whose make(providers, ...) function returns a replacement for
+    Cleaner.apply(), specialized for the given providers (as built by Cleaner.build()).
+
+    Each provider becomes a function in which the bound methods of its regexes are local variables,
+    and the rule categories it doesn't have produce no code at all. The returned apply() runs the
+    functions of the providers it is given, in order.
+    """
+
+    write = Writer()
+
+    write(0, "# Generated by unalix.core.codegen, do not edit")
+    write()
+    write(0, "def make(providers, redirection_target, MutableURL, filter_query):")
+    write()
+
+    for index, provider in enumerate(providers):
+        write_provider(write, index, provider)
+
+    write(1, "functions = {")
+
+    for index, provider in enumerate(providers):
+        write(2, f"{provider[0]}: provider_{index},")
+
+    write(1, "}")
+    write()
+    write(1, "def apply(raw_url, url, providers, visited, functions=functions, filter_query=filter_query):")
+    write(2, "for provider in providers:")
+    write(3, "url, redirect_url = functions[provider[0]](raw_url, url, visited)")
+    write(3, "if redirect_url is not None:")
+    write(4, "return (None, redirect_url)")
+
+    for name in ("query", "fragment"):
+        write(2, f"if url.{name}:")
+        write(3, f"url.{name} = filter_query(query=url.{name}, stripEmpty={stripEmpty!r}, stripDuplicates={stripDuplicates!r})")
+
+    write(2, "return (url.geturl(), None)")
+    write()
+    write(1, "return apply")
+
+    return write.source()
+
+
+def source_key(options_key: typing.FrozenSet[str]) -> str:
+    """
+    Return a key identifying the code generated for a cleaner with the given options_key that uses
+    the shared rulesets.
+
+    The key is "<generation>-<options>": the first part only depends on the rulesets and the code that
+    builds the providers, so modules of other options are kept while those of older generations are deleted.
+    """
+
+    digest = hashlib.sha256()
+
+    digest.update(coreutils.rulesets_snapshot_key(config.PATH_RULESETS, ignored_providers=config.IGNORED_PROVIDERS).encode())
+    digest.update(str(CODEGEN_VERSION).encode())
+
+    # Cleaner.build() decides what goes into the providers
+    for name in (__file__, os.path.join(os.path.dirname(__file__), "url_cleaner.py")):
+        with open(file=name, mode="rb") as file:
+            digest.update(file.read())
+
+    options = hashlib.sha256(repr(sorted(options_key)).encode())
+
+    return f"{digest.hexdigest()[:32]}-{options.hexdigest()[:16]}"
+
+
+def load_module(name: str, path: str) -> typing.Any:
+
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+
+    # The bytecode is cached as well, in the __pycache__ directory next to the file
+    spec.loader.exec_module(module)
+
+    return module
+
+
+def make_apply(
+    providers: typing.Sequence[tuple],
+    stripEmpty: bool,
+    stripDuplicates: bool,
+    redirection_target: typing.Callable[[types.Pattern, str], typing.Optional[str]],
+    key: typing.Optional[str] = None
+) -> typing.Callable[..., typing.Tuple[typing.Optional[str], typing.Optional[str]]]:
+    """
+    Return the generated replacement of Cleaner.apply() for the given providers.
+
+    If a key is given (see source_key()), the generated module is stored in unalix.config.PATH_CACHE next to
+    the ruleset snapshots and reused by later runs with the same key.
+    """
+
+    arguments = (providers, redirection_target, types.MutableURL, utils.filter_query)
+
+    directory = config.PATH_CACHE
+
+    if key is not None and directory is not None:
+        prefix = f"providers-{coreutils.interpreter_tag()}-"
+        path = os.path.join(directory, f"{prefix}{key}.py")
+
+        try:
+            if not os.path.exists(path):
+                source = generate_source(providers, stripEmpty, stripDuplicates)
+
+                os.makedirs(directory, exist_ok=True)
+
+                # Write to a temporary file first, so that concurrent readers never see a partial module
+                with tempfile.NamedTemporaryFile(mode="w", dir=directory, suffix=".tmp", delete=False) as file:
+                    file.write(source)
+
+                os.replace(file.name, path)
+
+                generation = prefix + key.partition("-")[0]
+
+                coreutils.remove_stale_files(directory, prefix=prefix, current=generation)
+                coreutils.remove_stale_files(os.path.join(directory, "__pycache__"), prefix=prefix, current=generation)
+            else:
+                coreutils.mark_used(path)
+
+            return load_module(f"unalix_providers_{key.replace('-', '_')}", path).make(*arguments)
+        except Exception:
+            # Unwritable directory, or unreadable or corrupted module
+            pass
+
+    namespace = {}
+
+    exec(compile(generate_source(providers, stripEmpty, stripDuplicates), "<unalix generated providers>", "exec"), namespace)
+
+    return namespace["make"](*arguments)
@@ -0,0 +1,337 @@
+import collections
+import http.client
+import select
+import selectors
+import ssl
+import threading
+import time
+import typing
+
+from .. import config
+
+PoolInfo = collections.namedtuple(
+    "PoolInfo",
+    ("connections", "idle", "created", "reused", "maxconnections", "maxperhost")
+)
+
+# Methods that can be sent again when a reused connection turns out to be closed by the server
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "TRACE", "PUT", "DELETE"))
+
+# Errors raised by http.client when the server closed a kept-alive connection before we used it again
+STALE_CONNECTION_ERRORS = (ConnectionError, http.client.BadStatusLine)
+
+
+def is_dropped(connection: http.client.HTTPConnection) -> bool:
+    """
+    Whether an idle connection can't be reused, either because it's closed or because the server
+    closed its side (an idle socket is only readable after EOF or unexpected data).
+    """
+
+    sock = connection.sock
+
+    if sock is None:
+        return True
+
+    # select.select() only accepts file descriptors below FD_SETSIZE (usually 1024)
+    try:
+        if hasattr(select, "poll"):
+            poller = select.poll()
+            poller.register(sock, select.POLLIN)
+
+            return bool(poller.poll(0))
+
+        with selectors.DefaultSelector() as selector:
+            selector.register(sock, selectors.EVENT_READ)
+
+            return bool(selector.select(0))
+    except (OSError, ValueError):
+        return True
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of HTTP/1.1 keep-alive connections, keyed by (scheme, host, port, SSL context).
+
+    At most `max_connections` connections are open at once, and at most `max_connections_per_host` of them
+    go to the same key. When the limits are reached, acquire() closes idle connections of other keys
+    or waits for a connection to be released. Idle connections are closed after `idle_timeout` seconds.
+    Pass None for no limit.
+
+    Usage example:
+
+        >>> import unalix
+        >>>
+        >>> with unalix.ConnectionPool(max_connections=4) as pool:
+        ...     unalix.unshort_url("https://bitly.is/Pricing-Pop-Up", pool=pool)
+        ...
+        'https://bitly.com/pages/pricing'
+    """
+
+    __slots__ = (
+        "max_connections",
+        "max_connections_per_host",
+        "idle_timeout",
+        "idle",
+        "keys",
+        "counts",
+        "total",
+        "created",
+        "reused",
+        "condition"
+    )
+
+
+    def __init__(
+        self,
+        max_connections: typing.Optional[int] = None,
+        max_connections_per_host: typing.Optional[int] = None,
+        idle_timeout: typing.Optional[float] = None
+    ):
+
+        self.max_connections = (
+            max_connections if max_connections is not None else config.HTTP_POOL_MAX_CONNECTIONS
+        )
+        self.max_connections_per_host = (
+            max_connections_per_host if max_connections_per_host is not None else config.HTTP_POOL_MAX_CONNECTIONS_PER_HOST
+        )
+        self.idle_timeout = (
+            idle_timeout if idle_timeout is not None else config.HTTP_POOL_IDLE_TIMEOUT
+        )
+
+        # key -> deque of (connection, release time), the most recently released connection last
+        self.idle = {}
+
+        # connection -> key, for connections that are open (idle or in use)
+        self.keys = {}
+
+        # key -> number of open connections
+        self.counts = collections.Counter()
+
+        self.total = 0
+        self.created = 0
+        self.reused = 0
+
+        self.condition = threading.Condition(threading.Lock())
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def pool_info(self) -> PoolInfo:
+
+        with self.condition:
+            return PoolInfo(
+                self.total, sum(len(connections) for connections in self.idle.values()),
+                self.created, self.reused, self.max_connections, self.max_connections_per_host
+            )
+
+
+    def acquire(
+        self,
+        scheme: str,
+        host: str,
+        port: int,
+        timeout: typing.Optional[float] = None,
+        context: typing.Optional[ssl.SSLContext] = None,
+        reuse: typing.Optional[bool] = True
+    ) -> typing.Tuple[http.client.HTTPConnection, bool]:
+        """
+        Return (connection, reused) for the given key. `reused` tells whether the connection was kept alive
+        from an earlier request, in which case the server may have closed it in the meantime.
+
+        Pass reuse=False to always get a new connection (e.g. after a reused one turned out to be stale).
+        Waits at most `timeout` seconds for a free slot before raising TimeoutError.
+
+        The connection must be given back with release() once it's no longer used.
+        """
+
+        key = (scheme, host, port, context if scheme == "https" else None)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        dropped = []
+
+        with self.condition:
+            while True:
+                connection = self.pop_idle(key, dropped) if reuse else None
+
+                if connection is not None:
+                    self.reused += 1
+                    break
+
+                if not self.has_room(key) and not (reuse is False and self.evict(key, dropped)):
+                    # Make room by closing an idle connection of another key
+                    self.evict(None, dropped, exclude=key)
+
+                if self.has_room(key):
+                    self.counts[key] += 1
+                    self.total += 1
+                    self.created += 1
+                    break
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+
+                if remaining is not None and remaining <= 0:
+                    for connection in dropped:
+                        connection.close()
+
+                    raise TimeoutError(f"Timed out waiting for a connection to {host}:{port}")
+
+                self.condition.wait(remaining)
+
+        for old_connection in dropped:
+            old_connection.close()
+
+        if connection is not None:
+            connection.timeout = timeout
+
+            if connection.sock is not None:
+                connection.sock.settimeout(timeout)
+
+            return (connection, True)
+
+        try:
+            if scheme == "https":
+                connection = http.client.HTTPSConnection(host=host, port=port, timeout=timeout, context=context)
+            else:
+                connection = http.client.HTTPConnection(host=host, port=port, timeout=timeout)
+        except BaseException:
+            with self.condition:
+                self.forget(key)
+            raise
+
+        with self.condition:
+            self.keys[connection] = key
+
+        return (connection, False)
+
+
+    def release(self, connection: http.client.HTTPConnection, reusable: typing.Optional[bool] = True) -> None:
+        """
+        Give back a connection obtained from acquire(). It's kept for later requests if `reusable` is True
+        (its last response was read to the end and the server didn't ask to close it), and closed otherwise.
+        """
+
+        with self.condition:
+            # Connections that don't belong to this pool are just closed
+            key = self.keys.get(connection)
+
+            if key is not None:
+                if reusable and connection.sock is not None and self.idle_timeout != 0:
+                    self.idle.setdefault(key, collections.deque()).append((connection, time.monotonic()))
+                    self.condition.notify()
+                    return
+
+                del self.keys[connection]
+                self.forget(key)
+
+        connection.close()
+
+
+    def close(self) -> None:
+        """
+        Close all idle connections. Connections in use are closed when they are released.
+        """
+
+        dropped = []
+
+        with self.condition:
+            for key in list(self.idle):
+                self.evict(key, dropped, everything=True)
+
+        for connection in dropped:
+            connection.close()
+
+
+    # The methods below must be called with the lock held
+
+    def has_room(self, key: tuple) -> bool:
+
+        return (
+            (self.max_connections is None or self.total < self.max_connections) and
+            (self.max_connections_per_host is None or self.counts[key] < self.max_connections_per_host)
+        )
+
+
+    def forget(self, key: tuple) -> None:
+
+        self.counts[key] -= 1
+
+        if not self.counts[key]:
+            del self.counts[key]
+
+        self.total -= 1
+        self.condition.notify()
+
+
+    def pop_idle(self, key: tuple, dropped: list) -> typing.Optional[http.client.HTTPConnection]:
+
+        connections = self.idle.get(key)
+
+        now = time.monotonic()
+
+        while connections:
+            connection, released = connections.pop()
+
+            if (self.idle_timeout is not None and now - released > self.idle_timeout) or is_dropped(connection):
+                del self.keys[connection]
+                self.forget(key)
+                dropped.append(connection)
+                continue
+
+            if not connections:
+                del self.idle[key]
+
+            return connection
+
+        self.idle.pop(key, None)
+
+        return None
+
+
+    def evict(
+        self,
+        key: typing.Optional[tuple],
+        dropped: list,
+        exclude: typing.Optional[tuple] = None,
+        everything: typing.Optional[bool] = False
+    ) -> bool:
+        """
+        Close the least recently released idle connection of `key` (or of any key other than `exclude`),
+        or all of them if `everything` is True. Returns whether a connection was closed.
+        """
+
+        if key is None:
+            candidates = [
+                (connections[0][1], other_key) for other_key, connections in self.idle.items()
+                if other_key != exclude and connections
+            ]
+
+            if not candidates:
+                return False
+
+            released, key = min(candidates, key=lambda candidate: candidate[0])
+
+        connections = self.idle.get(key)
+
+        if not connections:
+            return False
+
+        while connections:
+            connection, released = connections.popleft()
+
+            del self.keys[connection]
+            self.forget(key)
+            dropped.append(connection)
+
+            if not everything:
+                break
+
+        if not connections:
+            del self.idle[key]
+
+        return True
@@ -1,4 +1,5 @@
 import http.cookiejar
+import sys
 
 from .. import config
 from . import coreutils
@@ -6,7 +7,11 @@ from . import coreutils
 
 # Custom policies for cookies
 
-ALLOWED_DOMAINS = coreutils.domains_from_files(config.PATH_COOKIES_ALLOW)
+@coreutils.once
+def get_allowed_domains():
+
+    return coreutils.domains_from_files(config.PATH_COOKIES_ALLOW)
+
 
 # reject all cookies
 COOKIE_REJECT_ALL = http.cookiejar.DefaultCookiePolicy()
@@ -19,5 +24,18 @@ COOKIE_ALLOW_ALL.set_ok = lambda cookie, request: True
 # only allow cookies for domains that are known to not work without them
 COOKIE_STRICT_ALLOW = http.cookiejar.DefaultCookiePolicy()
 COOKIE_STRICT_ALLOW.set_ok = lambda cookie, request: (
-    True if cookie.domain in ALLOWED_DOMAINS else False
+    get_allowed_domains().match(cookie.domain)
 )
+
+
+def __getattr__(name):
+
+    if name == "ALLOWED_DOMAINS":
+        return get_allowed_domains()
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if sys.version_info < (3, 7):
+    # Module-level __getattr__ is not supported before Python 3.7
+    ALLOWED_DOMAINS = get_allowed_domains()
@@ -1,13 +1,614 @@
+import functools
+import hashlib
 import json
-import re
+import os
+import pickle
+import tempfile
 import typing
-import ssl
 import sys
+import threading
+import time
+
+try:
+    # Python 3.11 and later
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
 
 from .. import types
+from .. import __version__
+
+# Bump this whenever the layout of the objects stored in snapshots changes
+SNAPSHOT_VERSION = 3
+
+# Cached files of other keys are deleted once they were not used for this many seconds
+STALE_FILE_AGE = 7 * 24 * 3600
+
+
+def once(function: typing.Callable[[], typing.Any]) -> typing.Callable[[], typing.Any]:
+    """
+    Wrap a function without arguments so that it only runs on its first call, even when
+    called from several threads at once. Later calls return the same object.
+
+    wrapper.loaded() tells whether the function already ran, and the cached object can be
+    discarded with wrapper.reset().
+    """
+
+    lock = threading.Lock()
+    results = []
+
+    @functools.wraps(function)
+    def wrapper():
+
+        if not results:
+            with lock:
+                if not results:
+                    results.append(function())
+
+        return results[0]
+
+    def reset():
+
+        with lock:
+            results.clear()
+
+    wrapper.loaded = lambda: bool(results)
+    wrapper.reset = reset
+
+    return wrapper
+
+
+def _parse_pattern(pattern: str) -> typing.Optional[typing.Any]:
+    """
+    Parse a regex pattern into a sequence of (opcode, argument) pairs.
+
+    Returns None for patterns that we can't reason about, like case-insensitive ones.
+    """
+
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return None
+
+    state = getattr(parsed, "state", None) or getattr(parsed, "pattern", None)
+
+    if state is not None and state.flags & sre_constants.SRE_FLAG_IGNORECASE:
+        return None
+
+    return parsed
+
+
+def _ends_with_dot(items: typing.Any) -> bool:
+    """
+    Check whether every string matched by the given sequence ends with a literal dot.
+    """
+
+    if not items:
+        return False
+
+    opcode, argument = items[-1]
+
+    if opcode is sre_constants.LITERAL:
+        return argument == ord(".")
+
+    if opcode is sre_constants.SUBPATTERN:
+        return _ends_with_dot(argument[-1])
+
+    if opcode in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+        minimum, maximum, subpattern = argument
+        return minimum >= 1 and _ends_with_dot(subpattern)
+
+    if opcode is sre_constants.BRANCH:
+        return all(_ends_with_dot(branch) for branch in argument[1])
+
+    return False
+
+
+def _starts_with_dot(items: typing.Any) -> bool:
+    """
+    Check whether every string matched by the given sequence starts with a literal dot.
+    """
+
+    if not items:
+        return False
+
+    opcode, argument = items[0]
+
+    if opcode is sre_constants.LITERAL:
+        return argument == ord(".")
+
+    if opcode is sre_constants.SUBPATTERN:
+        return _starts_with_dot(argument[-1])
+
+    if opcode in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+        minimum, maximum, subpattern = argument
+        return minimum >= 1 and _starts_with_dot(subpattern)
+
+    if opcode is sre_constants.BRANCH:
+        return all(_starts_with_dot(branch) for branch in argument[1])
+
+    return False
+
+
+def host_label_from_pattern(pattern: str) -> typing.Optional[str]:
+    """
+    Extract a host label that must be present in any "scheme://host" string matched by
+    the given urlPattern.
+
+    The label is only returned when the pattern guarantees it is delimited by dots (or by the
+    start of the host), so that it can be looked up from host.split("."). Returns None when
+    no such label can be proven.
+    """
+
+    parsed = _parse_pattern(pattern)
+
+    if parsed is None:
+        return None
+
+    items = list(parsed)
+    index = 0
+
+    if items and items[0] == (sre_constants.AT, sre_constants.AT_BEGINNING):
+        index += 1
+
+    # Scheme part ("https?://")
+    seen = ""
+
+    while not seen.endswith("://"):
+        if index >= len(items):
+            return None
+
+        opcode, argument = items[index]
+
+        if opcode is sre_constants.LITERAL:
+            seen += chr(argument)
+        elif opcode is sre_constants.MAX_REPEAT and all(item[0] is sre_constants.LITERAL for item in argument[2]):
+            seen = ""
+        else:
+            return None
+
+        index += 1
+
+    # Subdomain part ("(?:[a-z0-9-]+\\.)*?")
+    while index < len(items) and items[index][0] is not sre_constants.LITERAL:
+        opcode, argument = items[index]
+
+        if opcode in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            if not _ends_with_dot(argument[2]):
+                return None
+        elif not _ends_with_dot([items[index]]):
+            return None
+
+        index += 1
+
+    # Host label
+    label = ""
+
+    while index < len(items):
+        opcode, argument = items[index]
+
+        if opcode is not sre_constants.LITERAL:
+            return label if label and _starts_with_dot(items[index:]) else None
+
+        if argument == ord("."):
+            return label or None
+
+        label += chr(argument)
+        index += 1
+
+    return None
+
+
+def field_name_from_pattern(pattern: str) -> typing.Optional[typing.Tuple[str, bool]]:
+    """
+    Return (name, prefixed) if the given rule matches a single literal field name, optionally
+    preceded by "(?:%3F)?" (prefixed is True in that case). Returns None for any other rule.
+    """
+
+    parsed = _parse_pattern(pattern)
+
+    if parsed is None:
+        return None
+
+    items = list(parsed)
+    prefixed = False
+
+    if items and items[0][0] is sre_constants.MAX_REPEAT:
+        minimum, maximum, subpattern = items[0][1]
+
+        if (minimum, maximum) != (0, 1) or list(subpattern) != [(sre_constants.LITERAL, ord(character)) for character in "%3F"]:
+            return None
+
+        items = items[1:]
+        prefixed = True
+
+    if not items or not all(opcode is sre_constants.LITERAL for opcode, argument in items):
+        return None
+
+    name = "".join(chr(argument) for opcode, argument in items)
+
+    if "%" in name or "=" in name or "&" in name:
+        return None
+
+    return (name, prefixed)
+
+
+def _literal_tokens(items: typing.Any) -> typing.List[typing.Optional[str]]:
+    """
+    Flatten a parsed pattern into the characters it always matches in sequence, with None
+    standing for anything else (a class, an optional part, an alternation, etc.).
+    """
+
+    tokens = []
+
+    for opcode, argument in items:
+        if opcode is sre_constants.LITERAL:
+            tokens.append(chr(argument))
+        elif opcode is sre_constants.SUBPATTERN:
+            group, add_flags, del_flags, subpattern = argument
+
+            if add_flags & sre_constants.SRE_FLAG_IGNORECASE:
+                tokens.append(None)
+            else:
+                tokens.extend(_literal_tokens(subpattern))
+        elif opcode in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and argument[0] >= 1:
+            # At least one copy of the repeated part is there, but we don't know what surrounds it
+            tokens.append(None)
+            tokens.extend(_literal_tokens(argument[2]))
+            tokens.append(None)
+        else:
+            tokens.append(None)
+
+    return tokens
+
+
+def required_literal(pattern: str) -> str:
+    """
+    Return the longest string that is part of every match of the given regex, or an empty
+    string if there is none that we can prove.
+
+    A regex can be skipped for a text that doesn't contain its required literal, which is much
+    cheaper to check than running the regex itself.
+    """
+
+    parsed = _parse_pattern(pattern)
+
+    if parsed is None:
+        return ""
+
+    literal = ""
+    current = ""
+
+    for token in _literal_tokens(parsed) + [None]:
+        if token is None:
+            if len(current) > len(literal):
+                literal = current
+            current = ""
+        else:
+            current += token
+
+    return literal
+
+
+def query_filters_from_patterns(patterns: types.Patterns) -> typing.List[typing.Callable[[str], str]]:
+    """
+    Build the list of callables that strip the fields matched by the given rules from a query.
+
+    Runs of rules that are literal field names are merged into a single types.FieldNames, the
+    remaining rules keep using their compiled regex.
+    """
+
+    filters = []
+
+    names, prefixed_names = [], []
+
+    for pattern in patterns.iter():
+        field_name = field_name_from_pattern(pattern)
+
+        if field_name is not None:
+            name, prefixed = field_name
+            (prefixed_names if prefixed else names).append(name)
+            continue
+
+        if names or prefixed_names:
+            filters.append(types.FieldNames(names, prefixed_names))
+            names, prefixed_names = [], []
+
+        filters.append(types.FieldPattern(pattern))
+
+    if names or prefixed_names:
+        filters.append(types.FieldNames(names, prefixed_names))
+
+    return filters
+
+
+def _never_matches(items: typing.Any, characters: str) -> bool:
+    """
+    Check whether no string matched by the given sequence can contain any of the given characters.
+    """
+
+    for opcode, argument in items:
+        if opcode is sre_constants.LITERAL:
+            if chr(argument) in characters:
+                return False
+        elif opcode is sre_constants.IN:
+            for set_opcode, set_argument in argument:
+                if set_opcode is sre_constants.LITERAL:
+                    if chr(set_argument) in characters:
+                        return False
+                elif set_opcode is sre_constants.RANGE:
+                    minimum, maximum = set_argument
+                    if any(minimum <= ord(character) <= maximum for character in characters):
+                        return False
+                elif set_opcode is sre_constants.CATEGORY:
+                    # Digits, word characters and whitespace (characters is expected to hold punctuation only)
+                    if set_argument not in (sre_constants.CATEGORY_DIGIT, sre_constants.CATEGORY_WORD, sre_constants.CATEGORY_SPACE):
+                        return False
+                else:
+                    return False
+        elif opcode is sre_constants.SUBPATTERN:
+            group, add_flags, del_flags, subpattern = argument
+
+            # Capturing groups could clash with the groups of other rules once merged
+            if group is not None or add_flags or del_flags or not _never_matches(subpattern, characters):
+                return False
+        elif opcode in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            if not _never_matches(argument[2], characters):
+                return False
+        elif opcode is sre_constants.BRANCH:
+            if not all(_never_matches(branch, characters) for branch in argument[1]):
+                return False
+        elif opcode is not sre_constants.AT:
+            return False
+
+    return True
+
+
+def rule_stays_in_field(pattern: str) -> bool:
+    """
+    Check whether the field names matched by the given rule (optionally preceded by "(?:%3F)?") can
+    never contain "%" or "&", so that no match of the rule spans an encoded "&" or "#" (where rules
+    cut query fields) or more than one field.
+
+    Rules for which this holds (and literal field names) give the same results in any order, and
+    once applied, they don't match again after other rules ran. Returns False when it can't be proven.
+    """
+
+    parsed = _parse_pattern(pattern)
+
+    if parsed is None:
+        return False
+
+    state = getattr(parsed, "state", None) or getattr(parsed, "pattern", None)
+
+    # Flags like re.MULTILINE would also change the meaning of the other rules once merged
+    if state is None or state.flags & ~sre_constants.SRE_FLAG_UNICODE:
+        return False
+
+    items = list(parsed)
+
+    if items and items[0][0] is sre_constants.MAX_REPEAT:
+        minimum, maximum, subpattern = items[0][1]
+
+        if (minimum, maximum) == (0, 1) and list(subpattern) == [(sre_constants.LITERAL, ord(character)) for character in "%3F"]:
+            items = items[1:]
+
+    return _never_matches(items, "%&")
 
 
-def rulesets_from_files(iterable_of_paths: typing.Iterable, ignored_providers: typing.Optional[typing.Iterable] = None) -> types.Rulesets:
+def matches_everything(pattern: str) -> bool:
+    """
+    Check whether the given urlPattern matches the start of any string (e.g. ".*").
+    """
+
+    parsed = _parse_pattern(pattern)
+
+    if parsed is None:
+        return False
+
+    for opcode, argument in parsed:
+        if opcode is sre_constants.AT and argument is sre_constants.AT_BEGINNING:
+            continue
+
+        if opcode in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and argument[0] == 0:
+            continue
+
+        return False
+
+    return True
+
+
+def merge_query_filters(query_filters: typing.Iterable[typing.Callable[[str], str]]) -> typing.List[typing.Callable[[str], str]]:
+    """
+    Merge query filters that give the same results in any order.
+
+    Consecutive filters for which rule_stays_in_field() holds become a single types.FieldNames holding
+    all of their literal names, followed by a single types.FieldPattern whose regex is the alternation
+    of the other rules. The other filters are kept as they are, in the same place.
+    """
+
+    merged = []
+    names, prefixed_names, patterns = set(), set(), []
+
+    def flush():
+
+        if names or prefixed_names:
+            merged.append(types.FieldNames(names - prefixed_names, prefixed_names))
+
+        if len(patterns) == 1:
+            merged.append(patterns[0])
+        elif patterns:
+            pattern = types.RulePattern("(?:" + "|".join(query_filter.pattern for query_filter in patterns) + ")")
+            pattern.literal = required_literal(pattern.source)
+
+            # The merged regex runs if any of the rules could match (literals containing other ones are redundant)
+            literals = []
+
+            for literal in sorted({literal for query_filter in patterns for literal in query_filter.literals}, key=len):
+                if not any(other in literal for other in literals):
+                    literals.append(literal)
+
+            merged.append(types.FieldPattern(pattern, literals))
+
+        names.clear()
+        prefixed_names.clear()
+        patterns.clear()
+
+    for query_filter in query_filters:
+        if isinstance(query_filter, types.FieldNames):
+            names.update(query_filter.names)
+            prefixed_names.update(query_filter.prefixed_names)
+        elif rule_stays_in_field(query_filter.pattern):
+            if all(query_filter.pattern != other.pattern for other in patterns):
+                patterns.append(query_filter)
+        else:
+            flush()
+            merged.append(query_filter)
+
+    flush()
+
+    return merged
+
+
+def rulesets_statistics(rulesets: types.Rulesets) -> typing.Dict[str, int]:
+    """
+    Count what the given rulesets are made of:
+
+        "patterns": patterns in all lists of all rulesets
+        "pattern_objects": distinct pattern objects (identical patterns are shared after optimize_rulesets())
+        "query_filters": types.FieldNames and types.FieldPattern objects run by the rulesets
+        "regexes": distinct pattern objects that are compiled when cleaning URLs (urlPatterns, exceptions,
+            redirections, raw rules and the patterns of query filters)
+    """
+
+    patterns = 0
+    pattern_objects = set()
+    query_filters = 0
+    regexes = set()
+
+    for ruleset in rulesets.iter():
+        regexes.add(id(ruleset.urlPattern))
+
+        for name in ("rules", "rawRules", "referralMarketing", "exceptions", "redirections"):
+            for pattern in ruleset[name].iter():
+                patterns += 1
+                pattern_objects.add(id(pattern))
+
+                if name not in ("rules", "referralMarketing"):
+                    regexes.add(id(pattern))
+
+        for query_filter in ruleset.rulesFilters + ruleset.referralMarketingFilters:
+            query_filters += 1
+
+            if isinstance(query_filter, types.FieldPattern):
+                regexes.add(id(query_filter.pattern))
+
+    return dict(
+        patterns=patterns,
+        pattern_objects=len(pattern_objects),
+        query_filters=query_filters,
+        regexes=len(regexes)
+    )
+
+
+def optimize_rulesets(rulesets: types.Rulesets) -> typing.Dict[str, typing.Tuple[int, int]]:
+    """
+    Rewrite the given rulesets so that they do the same work with fewer patterns:
+
+        - Identical patterns (and query filters) are shared by all rulesets, so each regex is compiled once.
+        - Rules that an earlier provider always applies are dropped. That provider must match all URLs
+          and have no exceptions (the "globalRules" provider of the ClearURLs data has exceptions, so its
+          rules still run again in other providers).
+        - The query filters of each ruleset are merged with merge_query_filters().
+
+    The "rules" and "referralMarketing" lists are only deduplicated, the other changes are made to the
+    query filters. Returns the statistics (see rulesets_statistics()) before and after the changes.
+    """
+
+    before = rulesets_statistics(rulesets)
+
+    interned = {}
+
+    def intern(item, key):
+
+        return interned.setdefault(key, item)
+
+    # Names and rules (for each category) removed by the providers that run on all URLs
+    covered = dict(
+        rulesFilters=(set(), set(), set()),
+        referralMarketingFilters=(set(), set(), set())
+    )
+
+    for ruleset in rulesets.iter():
+        ruleset.urlPattern = intern(ruleset.urlPattern, (type(ruleset.urlPattern), str(ruleset.urlPattern)))
+
+        for name in ("rules", "rawRules", "referralMarketing", "exceptions", "redirections"):
+            patterns = types.Patterns([intern(pattern, (type(pattern), str(pattern))) for pattern in ruleset[name].iter()])
+            patterns.freeze()
+
+            ruleset[name] = patterns
+
+        always_runs = (
+            not ruleset.completeProvider and not len(ruleset.exceptions) and matches_everything(ruleset.urlPattern)
+        )
+
+        for name, (covered_names, covered_prefixed_names, covered_patterns) in covered.items():
+            query_filters = []
+
+            for query_filter in ruleset[name]:
+                if isinstance(query_filter, types.FieldNames):
+                    # A prefixed name also matches "%3FNAME", so only prefixed names cover it
+                    query_filter = types.FieldNames(
+                        query_filter.names - query_filter.prefixed_names - covered_names,
+                        query_filter.prefixed_names - covered_prefixed_names
+                    )
+
+                    if not query_filter:
+                        continue
+                elif query_filter.pattern in covered_patterns:
+                    continue
+                else:
+                    pattern = query_filter.pattern
+                    query_filter = types.FieldPattern(intern(pattern, (type(pattern), str(pattern))), query_filter.literals)
+
+                query_filters.append(query_filter)
+
+            if always_runs:
+                for query_filter in query_filters:
+                    if isinstance(query_filter, types.FieldNames):
+                        covered_names.update(query_filter.names)
+                        covered_prefixed_names.update(query_filter.prefixed_names)
+                    elif rule_stays_in_field(query_filter.pattern):
+                        covered_patterns.add(query_filter.pattern)
+
+            query_filters = merge_query_filters(query_filters)
+
+            for index, query_filter in enumerate(query_filters):
+                if isinstance(query_filter, types.FieldNames):
+                    key = (types.FieldNames, query_filter.names, query_filter.prefixed_names)
+                else:
+                    key = (types.FieldPattern, str(query_filter.pattern), query_filter.literals)
+
+                query_filters[index] = intern(query_filter, key)
+
+            ruleset[name] = tuple(query_filters)
+
+    after = rulesets_statistics(rulesets)
+
+    return {name: (before[name], after[name]) for name in before}
+
+
+def rulesets_from_files(
+    iterable_of_paths: typing.Iterable,
+    ignored_providers: typing.Optional[typing.Iterable] = None,
+    optimize: typing.Optional[bool] = True
+) -> types.Rulesets:
+    """
+    Load the rulesets from the given ClearURLs data files. Unless optimize is False, they are rewritten
+    with optimize_rulesets(), which gives the same results with fewer patterns.
+    """
 
     iterable_of_dicts = []
 
@@ -28,7 +629,6 @@ def rulesets_from_files(iterable_of_paths: typing.Iterable, ignored_providers: t
 
             # https://docs.clearurls.xyz/latest/specs/rules/#urlpattern
             urlPattern = types.Pattern(ruleset["providers"][providerName]["urlPattern"])
-            urlPattern.compiled = re.compile(urlPattern)
 
             # https://docs.clearurls.xyz/latest/specs/rules/#completeprovider
             completeProvider = ruleset["providers"][providerName].get("completeProvider", False)
@@ -37,35 +637,27 @@ def rulesets_from_files(iterable_of_paths: typing.Iterable, ignored_providers: t
             rules = types.Patterns()
 
             for rule in ruleset["providers"][providerName].get("rules", []):
-                pattern = types.Pattern(rule)
-                pattern.compiled = re.compile(rf"(%(?:26|23)|&|^){rule}(?:(?:=|%3[Dd])[^&]*)")
-
-                rules.append(pattern)
+                rules.append(types.RulePattern(rule))
 
             # https://docs.clearurls.xyz/latest/specs/rules/#rawrules
             rawRules = types.Patterns()
 
             for rawRule in ruleset["providers"][providerName].get("rawRules", []):
-                pattern = types.Pattern(rawRule)
-                pattern.compiled = re.compile(rawRule)
-
-                rawRules.append(pattern)
+                rawRules.append(types.Pattern(rawRule))
 
             # https://docs.clearurls.xyz/latest/specs/rules/#referralmarketing
             referralMarketing = types.Patterns()
 
             for referral in ruleset["providers"][providerName].get("referralMarketing", []):
-                pattern = types.Pattern(referral)
-                pattern.compiled = re.compile(rf"(%(?:26|23)|&|^){referral}(?:(?:=|%3[Dd])[^&]*)")
-
-                referralMarketing.append(pattern)
+                referralMarketing.append(types.RulePattern(referral))
 
             # https://docs.clearurls.xyz/latest/specs/rules/#exceptions
             exceptions = types.Patterns()
 
             for exception in ruleset["providers"][providerName].get("exceptions", []):
                 pattern = types.Pattern(exception)
-                pattern.compiled = re.compile(exception)
+                # Exceptions also start with the scheme and host, so most of them only apply to some hosts
+                pattern.host_label = host_label_from_pattern(exception)
 
                 exceptions.append(pattern)
 
@@ -73,32 +665,176 @@ def rulesets_from_files(iterable_of_paths: typing.Iterable, ignored_providers: t
             redirections = types.Patterns()
 
             for redirection in ruleset["providers"][providerName].get("redirections", []):
-                pattern = types.Pattern(redirection)
-                pattern.compiled = re.compile(f"{redirection}.*")
-
-                redirections.append(pattern)
+                redirections.append(types.RedirectionPattern(redirection))
 
             # https://docs.clearurls.xyz/latest/specs/rules/#forceredirection
             # This field is ignored by Unalix, we are leaving it here just as reference
             forceRedirection = ruleset["providers"][providerName].get("forceRedirection", False)
 
-            rulesets.add_ruleset(
-                types.Ruleset(
-                    providerName=providerName,
-                    urlPattern=urlPattern,
-                    completeProvider=completeProvider,
-                    rules=rules,
-                    rawRules=rawRules,
-                    referralMarketing=referralMarketing,
-                    exceptions=exceptions,
-                    redirections=redirections,
-                    forceRedirection=forceRedirection
-                )
+            parsed_ruleset = types.Ruleset(
+                providerName=providerName,
+                urlPattern=urlPattern,
+                completeProvider=completeProvider,
+                rules=rules,
+                rawRules=rawRules,
+                referralMarketing=referralMarketing,
+                exceptions=exceptions,
+                redirections=redirections,
+                forceRedirection=forceRedirection
             )
 
+            # Regexes are only run on texts that contain their required literal
+            for patterns in (rules, rawRules, referralMarketing, exceptions, redirections):
+                for pattern in patterns.iter():
+                    pattern.literal = required_literal(getattr(pattern, "source", pattern))
+
+            parsed_ruleset.rulesFilters = tuple(query_filters_from_patterns(rules))
+            parsed_ruleset.referralMarketingFilters = tuple(query_filters_from_patterns(referralMarketing))
+
+            # Rulesets are not modified after loading them
+            for patterns in (rules, rawRules, referralMarketing, exceptions, redirections):
+                patterns.freeze()
+
+            rulesets.add_ruleset(parsed_ruleset, host_label=host_label_from_pattern(urlPattern))
+
+    if optimize:
+        optimize_rulesets(rulesets)
+
+    return rulesets
+
+
+def rulesets_snapshot_key(iterable_of_paths: typing.Iterable, ignored_providers: typing.Optional[typing.Iterable] = None) -> str:
+    """
+    Return a key identifying the snapshot of the given ruleset files.
+
+    The key changes whenever the content of the files, the ignored providers, the Python version,
+    the regex engine or the code that builds the snapshot changes.
+    """
+
+    digest = hashlib.sha256()
+
+    for path in iterable_of_paths:
+        with open(file=path, mode="rb") as file:
+            digest.update(file.read())
+
+    digest.update(repr(sorted(ignored_providers or ())).encode())
+    digest.update(f"{sys.version}|{sre_constants.MAGIC}|{__version__.__version__}|{SNAPSHOT_VERSION}".encode())
+
+    # Source of the modules that define the objects stored in the snapshot
+    types_directory = os.path.dirname(types.__file__)
+
+    for name in sorted(os.listdir(types_directory)) + [__file__]:
+        if not name.endswith(".py"):
+            continue
+
+        with open(file=os.path.join(types_directory, name), mode="rb") as file:
+            digest.update(file.read())
+
+    return digest.hexdigest()
+
+
+def rulesets_from_snapshot(
+    iterable_of_paths: typing.Iterable,
+    ignored_providers: typing.Optional[typing.Iterable] = None,
+    directory: typing.Optional[str] = None
+) -> types.Rulesets:
+    """
+    Same as rulesets_from_files(), but reuses a snapshot stored in the given directory.
+
+    Snapshots are pickled types.Rulesets objects, including the host index and query filters.
+    Regexes are stored as strings and compiled on first use. A new snapshot is written whenever
+    rulesets_snapshot_key() changes. Pass directory=None to disable snapshots.
+    """
+
+    iterable_of_paths = tuple(iterable_of_paths)
+
+    if directory is None:
+        return rulesets_from_files(iterable_of_paths, ignored_providers=ignored_providers)
+
+    key = rulesets_snapshot_key(iterable_of_paths, ignored_providers=ignored_providers)
+    prefix = f"rulesets-{interpreter_tag()}-"
+    path = os.path.join(directory, f"{prefix}{key}.pickle")
+
+    try:
+        with open(file=path, mode="rb") as file:
+            rulesets = pickle.load(file)
+    except Exception:
+        # Missing, unreadable or corrupted snapshot
+        pass
+    else:
+        if isinstance(rulesets, types.Rulesets):
+            mark_used(path)
+            return rulesets
+
+    rulesets = rulesets_from_files(iterable_of_paths, ignored_providers=ignored_providers)
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temporary file first, so that concurrent readers never see a partial snapshot
+        with tempfile.NamedTemporaryFile(mode="wb", dir=directory, suffix=".tmp", delete=False) as file:
+            pickle.dump(rulesets, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(file.name, path)
+    except OSError:
+        pass
+    else:
+        remove_stale_files(directory, prefix=prefix, current=os.path.basename(path))
+
     return rulesets
 
 
+def interpreter_tag() -> str:
+    """
+    Return a tag identifying this interpreter (e.g. "cpython-311"), so that interpreters sharing the cache
+    directory don't delete each other's files.
+    """
+
+    return sys.implementation.cache_tag or f"{sys.implementation.name}-{sys.version_info[0]}{sys.version_info[1]}"
+
+
+def mark_used(path: str) -> None:
+    """
+    Update the access time of a cached file, which remove_stale_files() goes by. The modification time is kept,
+    because the bytecode cached for generated modules is only valid for it.
+    """
+
+    try:
+        os.utime(path, (time.time(), os.stat(path).st_mtime))
+    except OSError:
+        pass
+
+
+def remove_stale_files(directory: str, prefix: str, current: str, max_age: typing.Optional[float] = None) -> None:
+    """
+    Delete the files in the given directory whose names start with `prefix` but not with `current`, and that
+    were not used for `max_age` seconds (defaults to STALE_FILE_AGE). Files of other keys that are still in
+    use (e.g. by another configuration) are kept.
+    """
+
+    max_age = max_age if max_age is not None else STALE_FILE_AGE
+
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+
+    now = time.time()
+
+    for name in names:
+        if name.startswith(prefix) and not name.startswith(current):
+            path = os.path.join(directory, name)
+
+            try:
+                stat = os.stat(path)
+
+                if now - max(stat.st_atime, stat.st_mtime) > max_age:
+                    os.remove(path)
+            except OSError:
+                # Removed by another process, or a directory
+                pass
+
+
 def domains_from_files(iterable_of_paths: typing.Iterable) -> types.Domains:
 
     domains = types.Domains()
@@ -135,17 +871,15 @@ def body_redirects_from_files(iterable_of_paths: typing.Iterable) -> types.BodyR
                 urlPattern = None
             else:
                 urlPattern = types.Pattern(ruleset["urlPattern"])
-                urlPattern.compiled = re.compile(urlPattern)
 
             domains = types.Domains(ruleset["domains"])
 
             rules = types.Patterns()
 
             for rule in ruleset["rules"]:
-                pattern = types.Pattern(rule)
-                pattern.compiled = re.compile(rule)
+                rules.append(types.Pattern(rule))
 
-                rules.append(pattern)
+            rules.freeze()
 
             body_redirects.add_ruleset(
                 types.BodyRedirect(
@@ -164,11 +898,14 @@ def body_redirects_from_files(iterable_of_paths: typing.Iterable) -> types.BodyR
 def create_ssl_context(
     unverified: typing.Optional[bool] = False,
     cert_file: typing.Optional[str] = None
-) -> ssl.SSLContext:
+) -> "ssl.SSLContext":
     """
     This function creates the default SSL context for HTTPS connections.
     """
 
+    # Imported here, so that importing unalix doesn't load OpenSSL
+    import ssl
+
     # https://bootstrap.pypa.io/get-pip.py
     python_version = sys.version_info[0:2]
 
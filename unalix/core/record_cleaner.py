@@ -0,0 +1,457 @@
+import json
+import json.decoder
+import json.scanner
+import typing
+
+from . import url_cleaner
+
+# C-accelerated helpers from the json module (the pure Python versions are used when those are not available)
+scan_string = json.decoder.scanstring
+scan_value = json.scanner.make_scanner(json.JSONDecoder())
+
+JSON_WHITESPACE = json.decoder.WHITESPACE
+LINE_TERMINATORS = "\r\n"
+
+
+def skip_whitespace(record: str, position: int) -> int:
+
+    return JSON_WHITESPACE.match(record, position).end()
+
+
+def field_tree(fields: typing.Iterable[str]) -> typing.Dict[str, typing.Any]:
+    """
+    Turn dotted field paths (e.g. ["url", "link.href"]) into a tree of nested dicts
+    ({"url": None, "link": {"href": None}}), where None marks the fields to clean.
+
+    Raises ValueError if a field is also the prefix of another one (e.g. ["link", "link.href"]).
+    """
+
+    tree = {}
+
+    for field in fields:
+        node = tree
+        keys = field.split(".")
+
+        for key in keys[:-1]:
+            if key not in node:
+                node[key] = {}
+            elif node[key] is None:
+                raise ValueError(f"field {field!r} is inside another field to clean")
+
+            node = node[key]
+
+        if node.get(keys[-1], None) is not None:
+            raise ValueError(f"field {field!r} contains other fields to clean")
+
+        node[keys[-1]] = None
+
+    if not tree:
+        raise ValueError("no fields to clean")
+
+    return tree
+
+
+class JSONRecordCleaner:
+    """
+    Cleans the URLs at the given field paths of JSON records (one object per record).
+
+    Records are scanned rather than decoded. Only the fields on the way to the ones being cleaned are looked at,
+    values that were cleaned are spliced into the original text, and everything else is emitted byte for byte
+    as it was (no re-serialization). Scanning stops as soon as every top-level field of interest was seen.
+    """
+
+
+    def __init__(self, cleaner: url_cleaner.Cleaner, fields: typing.Iterable[str]):
+        self.cleaner = cleaner
+        self.tree = field_tree(fields)
+
+
+    def clean(self, record: str) -> str:
+        """
+        Return the record with its URLs cleaned (or the record itself if nothing changed).
+        Raises json.JSONDecodeError on malformed records.
+        """
+
+        start = skip_whitespace(record, 0)
+
+        if start == len(record):
+            return record
+
+        if record[start] != "{":
+            # Not an object, so there is nothing to clean (but it should be valid JSON)
+            try:
+                scan_value(record, start)
+            except StopIteration as exception:
+                raise json.JSONDecodeError("Expecting value", record, exception.value) from None
+
+            return record
+
+        changes = []
+
+        self.clean_object(record, start, self.tree, changes, True)
+
+        if not changes:
+            return record
+
+        parts = []
+        position = 0
+
+        for start, end, value in changes:
+            parts.append(record[position:start])
+            parts.append(value)
+            position = end
+
+        parts.append(record[position:])
+
+        return "".join(parts)
+
+
+    def clean_object(
+        self,
+        record: str,
+        position: int,
+        tree: typing.Dict[str, typing.Any],
+        changes: typing.List[typing.Tuple[int, int, str]],
+        top_level: bool
+    ) -> int:
+        """
+        Scan the object starting at `position`, collecting (start, end, replacement) tuples in `changes`.
+        Return the position right after the object (or -1 if scanning stopped early at the top level).
+        """
+
+        position = skip_whitespace(record, position + 1)
+
+        if record.startswith("}", position):
+            return position + 1
+
+        remaining = len(tree)
+
+        while True:
+            if not record.startswith("\"", position):
+                raise json.JSONDecodeError("Expecting property name enclosed in double quotes", record, position)
+
+            key, position = scan_string(record, position + 1)
+            position = skip_whitespace(record, position)
+
+            if not record.startswith(":", position):
+                raise json.JSONDecodeError("Expecting ':' delimiter", record, position)
+
+            position = skip_whitespace(record, position + 1)
+
+            if key in tree:
+                node = tree[key]
+                remaining -= 1
+
+                if node is None and record.startswith("\"", position):
+                    value, end = scan_string(record, position + 1)
+                    result = self.cleaner.clear(value)
+
+                    if result != value:
+                        changes.append((position, end, json.dumps(result, ensure_ascii=False)))
+
+                    position = end
+                elif node is not None and record.startswith("{", position):
+                    position = self.clean_object(record, position, node, changes, False)
+                else:
+                    position = self.skip_value(record, position)
+
+                if top_level and not remaining:
+                    return -1
+            else:
+                position = self.skip_value(record, position)
+
+            position = skip_whitespace(record, position)
+
+            if record.startswith(",", position):
+                position = skip_whitespace(record, position + 1)
+            elif record.startswith("}", position):
+                return position + 1
+            else:
+                raise json.JSONDecodeError("Expecting ',' delimiter", record, position)
+
+
+    def skip_value(self, record: str, position: int) -> int:
+
+        if record.startswith("\"", position):
+            return scan_string(record, position + 1)[1]
+
+        try:
+            return scan_value(record, position)[1]
+        except StopIteration as exception:
+            raise json.JSONDecodeError("Expecting value", record, exception.value) from None
+
+
+def split_csv_record(
+    record: str,
+    delimiter: str,
+    quotechar: str,
+    limit: typing.Optional[int] = None
+) -> typing.Iterator[typing.Tuple[int, int, str]]:
+    """
+    Yield (start, end, value) for the first `limit` fields of the given record (without its line terminator).
+    """
+
+    position = 0
+    index = 0
+
+    while limit is None or index < limit:
+        if record.startswith(quotechar, position):
+            search = position + 1
+
+            while True:
+                end = record.find(quotechar, search)
+
+                if end == -1:
+                    raise ValueError(f"unterminated quoted field at position {position}")
+
+                if record.startswith(quotechar, end + 1):
+                    search = end + 2
+                    continue
+
+                break
+
+            value = record[position + 1:end].replace(quotechar * 2, quotechar)
+
+            end = record.find(delimiter, end + 1)
+
+            if end == -1:
+                end = len(record)
+        else:
+            end = record.find(delimiter, position)
+
+            if end == -1:
+                end = len(record)
+
+            value = record[position:end]
+
+        yield (position, end, value)
+
+        if end == len(record):
+            return
+
+        position = end + 1
+        index += 1
+
+
+class CSVRecordCleaner:
+    """
+    Cleans the URLs in the given columns (zero-based indexes) of CSV records.
+
+    Records use the RFC 4180 quoting rules (fields may be enclosed in `quotechar`, which is escaped by doubling it).
+    Only the fields up to the last column of interest are looked at, and the other fields are emitted byte for byte
+    as they were.
+    """
+
+
+    def __init__(
+        self,
+        cleaner: url_cleaner.Cleaner,
+        columns: typing.Iterable[int],
+        delimiter: typing.Optional[str] = ",",
+        quotechar: typing.Optional[str] = "\""
+    ):
+        self.cleaner = cleaner
+        self.columns = frozenset(columns)
+        self.delimiter = delimiter
+        self.quotechar = quotechar
+
+        if not self.columns:
+            raise ValueError("no columns to clean")
+
+        if len(delimiter) != 1 or len(quotechar) != 1 or delimiter == quotechar:
+            raise ValueError("delimiter and quotechar must be two different characters")
+
+
+    def quote(self, value: str, quoted: bool) -> str:
+
+        quotechar = self.quotechar
+
+        if quoted or any(character in value for character in (self.delimiter, quotechar, "\r", "\n")):
+            return quotechar + value.replace(quotechar, quotechar * 2) + quotechar
+
+        return value
+
+
+    def clean(self, record: str) -> str:
+        """
+        Return the record with its URLs cleaned (or the record itself if nothing changed).
+        The record may end with its line terminator, which is kept.
+        """
+
+        body = record.rstrip(LINE_TERMINATORS)
+
+        columns = self.columns
+        parts = []
+        position = 0
+
+        for index, (start, end, value) in enumerate(split_csv_record(body, self.delimiter, self.quotechar, max(columns) + 1)):
+            if index not in columns:
+                continue
+
+            result = self.cleaner.clear(value)
+
+            if result == value:
+                continue
+
+            parts.append(body[position:start])
+            parts.append(self.quote(result, body.startswith(self.quotechar, start)))
+
+            position = end
+
+        if not parts:
+            return record
+
+        parts.append(record[position:])
+
+        return "".join(parts)
+
+
+def csv_column_indexes(
+    header: str,
+    columns: typing.Iterable[typing.Union[str, int]],
+    delimiter: str,
+    quotechar: str
+) -> typing.List[int]:
+    """
+    Resolve column names to indexes using the given header record. Indexes are kept as they are.
+    """
+
+    names = [value for start, end, value in split_csv_record(header.rstrip(LINE_TERMINATORS), delimiter, quotechar)]
+    indexes = []
+
+    for column in columns:
+        if isinstance(column, int):
+            indexes.append(column)
+        elif column in names:
+            indexes.append(names.index(column))
+        else:
+            raise ValueError(f"column {column!r} not found in the header")
+
+    return indexes
+
+
+def csv_records(lines: typing.Iterable[str], quotechar: typing.Optional[str] = "\"") -> typing.Iterator[str]:
+    """
+    Join lines (with their line terminators) into CSV records, as quoted fields may span several lines.
+    """
+
+    pending = []
+    quotes = 0
+
+    for line in lines:
+        quotes += line.count(quotechar)
+
+        if quotes % 2:
+            pending.append(line)
+            continue
+
+        if pending:
+            pending.append(line)
+            line = "".join(pending)
+            pending.clear()
+
+        quotes = 0
+
+        yield line
+
+    if pending:
+        yield "".join(pending)
+
+
+def clean_ndjson(lines: typing.Iterable[str], fields: typing.Iterable[str], **kwargs: typing.Any) -> typing.Iterator[str]:
+    """
+    Clean the URLs at the given field paths of newline-delimited JSON records, yielding the records in the same order.
+
+    Records are processed one at a time, so any iterable of lines works (e.g. a file object) and memory usage
+    does not depend on the size of the input. Untouched parts of the records (including their line terminators)
+    are emitted as they were.
+
+    Parameters:
+
+        lines (Iterable[str]):
+            JSON records, one per item. Blank lines and records that are not objects are yielded unchanged.
+
+        fields (Iterable[str]):
+            Dotted paths of the fields to clean (e.g. ["url", "link.href"]). Fields that are missing or are
+            not strings are left alone.
+
+        **kwargs (optional):
+            Optional keyword arguments that unalix.clear_url() takes.
+
+    Usage example:
+
+        >>> import unalix
+        >>>
+        >>> records = ['{"id": 1, "link": {"href": "https://deezer.com/track/891177062?utm_source=deezer"}}']
+        >>>
+        >>> list(unalix.clean_ndjson(records, fields=["link.href"]))
+        ['{"id": 1, "link": {"href": "https://deezer.com/track/891177062"}}']
+    """
+
+    record_cleaner = JSONRecordCleaner(url_cleaner.get_cleaner(**kwargs), fields)
+
+    for line in lines:
+        yield record_cleaner.clean(line)
+
+
+def clean_csv(
+    lines: typing.Iterable[str],
+    columns: typing.Iterable[typing.Union[str, int]],
+    header: typing.Optional[bool] = True,
+    delimiter: typing.Optional[str] = ",",
+    quotechar: typing.Optional[str] = "\"",
+    **kwargs: typing.Any
+) -> typing.Iterator[str]:
+    """
+    Clean the URLs in the given columns of CSV records, yielding the records in the same order.
+
+    Records are processed one at a time, and untouched fields (including quoting and line terminators) are emitted
+    as they were. Files should be opened with newline="", like for the csv module.
+
+    Parameters:
+
+        lines (Iterable[str]):
+            Lines of CSV text. Quoted fields may span several lines.
+
+        columns (Iterable[str | int]):
+            Names (looked up in the header) or zero-based indexes of the columns to clean.
+
+        header (bool | optional):
+            Whether the first record is a header. It is yielded unchanged. Defaults to True.
+
+        delimiter (str | optional):
+            Field delimiter. Defaults to ",".
+
+        quotechar (str | optional):
+            Quote character. Defaults to '"'.
+
+        **kwargs (optional):
+            Optional keyword arguments that unalix.clear_url() takes.
+
+    Usage example:
+
+        >>> import unalix
+        >>>
+        >>> with open("export.csv", newline="") as source, open("cleaned.csv", "w", newline="") as destination:
+        ...     destination.writelines(unalix.clean_csv(source, columns=["url"]))
+    """
+
+    columns = list(columns)
+    records = csv_records(lines, quotechar)
+
+    if header:
+        try:
+            record = next(records)
+        except StopIteration:
+            return
+
+        columns = csv_column_indexes(record, columns, delimiter, quotechar)
+
+        yield record
+    elif not all(isinstance(column, int) for column in columns):
+        raise ValueError("column names require a header")
+
+    record_cleaner = CSVRecordCleaner(url_cleaner.get_cleaner(**kwargs), columns, delimiter, quotechar)
+
+    for record in records:
+        yield record_cleaner.clean(record)
@@ -0,0 +1,427 @@
+import email.utils
+import hashlib
+import http
+import time
+import typing
+
+from . import cache_backends
+from . import cookie_policies
+from . import ssl_context
+from .. import config
+from .. import exceptions
+
+# Redirects that are permanent unless the response says otherwise
+PERMANENT_REDIRECTS = (
+    http.HTTPStatus.MOVED_PERMANENTLY,
+    http.HTTPStatus.PERMANENT_REDIRECT
+)
+
+
+def parse_cache_control(value: str) -> typing.Dict[str, typing.Optional[str]]:
+
+    directives = {}
+
+    for directive in value.split(","):
+        name, separator, argument = directive.strip().partition("=")
+
+        if name:
+            directives[name.strip().lower()] = argument.strip().strip("\"") if separator else None
+
+    return directives
+
+
+def get_ttl(
+    status: int,
+    headers: typing.Any,
+    now: typing.Optional[float] = None
+) -> typing.Optional[float]:
+    """
+    Return for how many seconds a response with the given status and headers can be reused, or None if it must not be stored.
+
+    Explicit freshness (Cache-Control max-age, then Expires) wins. Otherwise 301 and 308 redirects are kept for
+    unalix.config.HTTP_CACHE_PERMANENT_TTL seconds, and other responses for unalix.config.HTTP_CACHE_TTL seconds.
+    """
+
+    directives = parse_cache_control(", ".join(headers.get_all("Cache-Control", ())))
+
+    if "no-store" in directives or "no-cache" in directives:
+        return None
+
+    max_age = directives.get("max-age")
+
+    if max_age is not None:
+        return int(max_age) if max_age.isdigit() and int(max_age) > 0 else None
+
+    expires = headers.get("Expires")
+
+    if expires is not None:
+        try:
+            expires = email.utils.parsedate_to_datetime(expires).timestamp()
+        except (TypeError, ValueError, IndexError, OverflowError):
+            # Invalid dates (e.g. "0") mean the response is already expired
+            return None
+
+        # Expires is relative to the clock of the server
+        date = headers.get("Date")
+
+        try:
+            date = email.utils.parsedate_to_datetime(date).timestamp()
+        except (TypeError, ValueError, IndexError, OverflowError):
+            date = time.time() if now is None else now
+
+        ttl = expires - date
+
+        return ttl if ttl > 0 else None
+
+    if status in PERMANENT_REDIRECTS:
+        return config.HTTP_CACHE_PERMANENT_TTL
+
+    return config.HTTP_CACHE_TTL
+
+
+class RedirectCache:
+    """
+    Cache of the redirects followed by unalix.unshort_url() and unalix.aunshort_url(), and of their results.
+
+    Every hop is stored on its own (keyed by the HTTP method and the requested URL) with the redirect URL exactly as
+    the server sent it, so any chain that goes through a cached hop skips ahead to the end of the cached part, whatever
+    cleaning options it uses. Final results are stored as well, for the options that produced them.
+
+    Errors (unalix.ConnectError and unalix.TooManyRedirectsError) and client error responses (4xx) are stored for at
+    most unalix.config.HTTP_CACHE_NEGATIVE_TTL seconds. Server errors (5xx) and responses with a status that is retried
+    are never stored.
+
+    Entries are only shared by calls with the same custom headers, cookie policy and SSL context (see request_settings()).
+    Calls with a custom cookie jar, a custom cookie policy, or an SSL context other than unalix.SSL_CONTEXT_VERIFIED and
+    unalix.SSL_CONTEXT_UNVERIFIED, don't use the cache.
+
+    Entries are kept in `backend`, an unalix.CacheBackend that defaults to an unalix.MemoryCacheBackend with
+    unalix.config.HTTP_CACHE_MAX_ENTRIES entries. Use an unalix.SQLiteCacheBackend to share the cache between processes.
+
+    Usage example:
+
+        >>> import unalix
+        >>>
+        >>> cache = unalix.RedirectCache()
+        >>>
+        >>> unalix.unshort_url("https://bitly.is/Pricing-Pop-Up", cache=cache)
+        'https://bitly.com/pages/pricing'
+        >>> # Answered from the cache
+        >>> unalix.unshort_url("https://bitly.is/Pricing-Pop-Up", cache=cache)
+        'https://bitly.com/pages/pricing'
+    """
+
+    __slots__ = (
+        "backend",
+    )
+
+
+    def __init__(self, backend: typing.Optional[cache_backends.CacheBackend] = None):
+
+        self.backend = (
+            backend if backend is not None else cache_backends.MemoryCacheBackend(max_entries=config.HTTP_CACHE_MAX_ENTRIES)
+        )
+
+
+    def get(self, key: str) -> typing.Optional[tuple]:
+        """
+        Return the entry stored under the given key, or None if there is none or it expired.
+        """
+
+        return self.backend.get(key)
+
+
+    def get_many(self, keys: typing.Iterable[str]) -> typing.Dict[str, tuple]:
+
+        return self.backend.get_many(keys)
+
+
+    def put(self, key: str, value: tuple, ttl: float) -> None:
+
+        self.backend.put(key, tuple(value), time.time() + ttl)
+
+
+    def put_many(self, entries: typing.Iterable[typing.Tuple[str, tuple, float]]) -> None:
+        """
+        Store the given (key, value, expires) entries, where `expires` is a time.time() timestamp.
+        """
+
+        self.backend.put_many(entries)
+
+
+    def clear(self) -> None:
+
+        self.backend.clear()
+
+
+    def close(self) -> None:
+
+        self.backend.close()
+
+
+def request_settings(
+    headers: typing.Optional[typing.Dict[str, str]],
+    context: typing.Any,
+    cookies: typing.Any,
+    cookies_policy: typing.Any
+) -> typing.Optional[str]:
+    """
+    Return the part of the cache keys that depends on the given unshort_url() arguments, or None if the
+    responses can't be cached for them.
+    """
+
+    # Responses may depend on the cookies of a custom jar
+    if cookies is not None:
+        return None
+
+    # Other contexts can't be told apart across processes
+    if context is None or context is ssl_context.get_verified_context():
+        settings = "verified"
+    elif ssl_context.get_unverified_context.loaded() and context is ssl_context.get_unverified_context():
+        settings = "unverified"
+    else:
+        return None
+
+    # Cookies sent along the chain depend on the policy, and other policies can't be told apart across processes
+    if cookies_policy is None or cookies_policy is cookie_policies.COOKIE_STRICT_ALLOW:
+        pass
+    elif cookies_policy is cookie_policies.COOKIE_REJECT_ALL:
+        settings += ":cookies-reject"
+    elif cookies_policy is cookie_policies.COOKIE_ALLOW_ALL:
+        settings += ":cookies-allow"
+    else:
+        return None
+
+    if headers:
+        digest = hashlib.sha256(repr(sorted(headers.items())).encode()).hexdigest()
+        settings += f":{digest[:32]}"
+
+    return settings
+
+
+class Resolution:
+    """
+    The use of a RedirectCache by one unshort_url() or aunshort_url() call.
+
+    The result and the first hop are looked up together, and entries are written at once by flush().
+    """
+
+    __slots__ = (
+        "cache",
+        "method",
+        "parse_documents",
+        "max_redirects",
+        "status_retry",
+        "settings",
+        "url",
+        "result_key",
+        "expires",
+        "failed",
+        "fetched",
+        "pending"
+    )
+
+
+    def __init__(
+        self,
+        cache: RedirectCache,
+        method: str,
+        parse_documents: bool,
+        max_redirects: int,
+        status_retry: typing.Collection[int],
+        options_key: typing.FrozenSet[str],
+        url: str,
+        settings: str
+    ):
+        self.cache = cache
+        self.method = method
+        self.parse_documents = parse_documents
+        self.max_redirects = max_redirects
+        self.status_retry = status_retry
+        self.settings = settings
+        self.url = url
+        self.result_key = f"result {method} {settings} {int(parse_documents)} {','.join(sorted(options_key))} {url}"
+
+        # The result can't be kept longer than the hops that led to it
+        self.expires = None
+
+        # Whether a cached error was raised, which must not be stored again
+        self.failed = False
+
+        # Entries read along with the result, and entries not written yet (key -> (value, expires))
+        self.fetched = {}
+        self.pending = {}
+
+
+    def hop_key(self, url: str) -> str:
+        return f"hop {self.method} {self.settings} {url}"
+
+
+    def get(self, key: str) -> typing.Optional[tuple]:
+
+        if key in self.pending:
+            value, expires = self.pending[key]
+            return value if expires > time.time() else None
+
+        if key in self.fetched:
+            return self.fetched.pop(key)
+
+        return self.cache.get(key)
+
+
+    def put(self, key: str, value: tuple, expires: float) -> None:
+
+        self.pending[key] = (value, expires)
+
+
+    def flush(self) -> None:
+        """
+        Write the pending entries to the cache.
+        """
+
+        if not self.pending:
+            return
+
+        entries = [(key, value, expires) for key, (value, expires) in self.pending.items()]
+        self.pending.clear()
+
+        self.cache.put_many(entries)
+
+
+    def result(self) -> typing.Optional[str]:
+        """
+        Return the cached result, or None. Raises the cached exception for URLs that failed recently.
+        """
+
+        hop_key = self.hop_key(self.url)
+
+        self.fetched = self.cache.get_many((self.result_key, hop_key))
+
+        entry = self.fetched.pop(self.result_key, None)
+
+        if entry is None:
+            return None
+
+        kind, value, redirects = entry
+
+        # Chains longer than max_redirects raise unalix.TooManyRedirectsError, so whether a result (or this error)
+        # applies depends on the number of redirects
+        if kind == "error":
+            if redirects is not None and self.max_redirects > redirects:
+                return None
+
+            self.failed = True
+            raise get_exception(value, self.url)
+
+        if redirects > self.max_redirects:
+            return None
+
+        return value
+
+
+    def lookup(self, url: str) -> typing.Optional[typing.Tuple[str, typing.Optional[str]]]:
+        """
+        Return ("redirect", location) if the URL is known to redirect somewhere, ("final", None) if it's known
+        to be the end of the chain, or None. Raises the cached exception for URLs that failed recently.
+        """
+
+        entry = self.get(self.hop_key(url))
+
+        if entry is None:
+            return None
+
+        kind, value, expires = entry
+
+        if kind == "error":
+            self.failed = True
+            raise get_exception(value, url)
+
+        # Redirects found in response bodies only count when they are looked for, and
+        # responses without them are only final when they were looked for
+        if kind == "document" and not self.parse_documents:
+            return None
+
+        if kind == "final" and self.parse_documents and not value:
+            return None
+
+        self.limit(expires)
+
+        return ("final", None) if kind == "final" else ("redirect", value)
+
+
+    def limit(self, expires: float) -> None:
+
+        if self.expires is None or expires < self.expires:
+            self.expires = expires
+
+
+    def store_redirect(self, url: str, location: str, status: int, headers: typing.Any, document: typing.Optional[bool] = False) -> None:
+
+        ttl = get_ttl(status, headers)
+
+        if ttl is None:
+            # The result depends on this hop, so it can't be stored either
+            self.limit(0)
+            return
+
+        expires = time.time() + ttl
+
+        self.put(self.hop_key(url), ("document" if document else "redirect", location, expires), expires)
+        self.limit(expires)
+
+
+    def store_final(self, url: str, status: int, headers: typing.Any, redirects: int) -> None:
+
+        # Server errors and statuses that are retried are not final
+        if status >= 500 or status in self.status_retry:
+            return
+
+        ttl = get_ttl(status, headers)
+
+        if ttl is None:
+            return
+
+        # Client errors may go away soon (e.g. a page that is not published yet)
+        if status >= 400:
+            ttl = min(ttl, config.HTTP_CACHE_NEGATIVE_TTL)
+
+        expires = time.time() + ttl
+
+        self.put(self.hop_key(url), ("final", self.parse_documents, expires), expires)
+        self.limit(expires)
+
+        self.store_result(url, redirects)
+
+
+    def store_result(self, url: str, redirects: int) -> None:
+
+        if self.expires is None or self.expires <= time.time():
+            return
+
+        self.put(self.result_key, ("result", str(url), redirects), self.expires)
+
+
+    def store_error(self, exception: exceptions.ConnectError) -> None:
+
+        if self.failed:
+            return
+
+        value = (exception.__class__.__name__, exception.message)
+        expires = time.time() + config.HTTP_CACHE_NEGATIVE_TTL
+
+        if not isinstance(exception, exceptions.TooManyRedirectsError):
+            self.put(self.hop_key(exception.url), ("error", value, expires), expires)
+
+        # For unalix.TooManyRedirectsError, the max number of redirects that were allowed
+        redirects = self.max_redirects if isinstance(exception, exceptions.TooManyRedirectsError) else None
+
+        self.put(self.result_key, ("error", value, redirects), expires)
+
+
+def get_exception(value: typing.Sequence[str], url: str) -> exceptions.ConnectError:
+
+    name, message = value
+
+    exception_class = getattr(exceptions, name, exceptions.ConnectError)
+
+    return exception_class(message=message, url=url)
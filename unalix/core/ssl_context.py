@@ -1,14 +1,44 @@
+import ssl
+import sys
+
 from .. import config
 from . import coreutils
 
 
 # Default SSL context for HTTPS connections.
-SSL_CONTEXT_VERIFIED = coreutils.create_ssl_context(
-    cert_file=config.PATH_CA_BUNDLE
-)
+@coreutils.once
+def get_verified_context() -> ssl.SSLContext:
+
+    return coreutils.create_ssl_context(
+        cert_file=config.PATH_CA_BUNDLE
+    )
+
+
+@coreutils.once
+def get_unverified_context() -> ssl.SSLContext:
+
+    return coreutils.create_ssl_context(
+        unverified=True,
+        cert_file=config.PATH_CA_BUNDLE
+    )
+
+
+LAZY_ATTRIBUTES = {
+    "SSL_CONTEXT_VERIFIED": get_verified_context,
+    "SSL_CONTEXT_UNVERIFIED": get_unverified_context
+}
+
+
+# Contexts are only created on first access (https://www.python.org/dev/peps/pep-0562)
+def __getattr__(name):
+
+    if name in LAZY_ATTRIBUTES:
+        return LAZY_ATTRIBUTES[name]()
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-SSL_CONTEXT_UNVERIFIED = coreutils.create_ssl_context(
-    unverified=True,
-    cert_file=config.PATH_CA_BUNDLE
-)
 
+if sys.version_info < (3, 7):
+    # Module-level __getattr__ is not supported before Python 3.7
+    SSL_CONTEXT_VERIFIED = get_verified_context()
+    SSL_CONTEXT_UNVERIFIED = get_unverified_context()
@@ -0,0 +1,207 @@
+import re
+import typing
+
+from .. import types
+from .. import config
+
+from . import url_cleaner
+
+# http(s) URLs end at whitespace, quotes and angle brackets (e.g. in HTML attributes and tags)
+URL_PATTERN = re.compile(r"(?i:https?)://[^\s<>\"'`]+")
+URL_END = re.compile(r"[\s<>\"'`]")
+
+# Characters that usually belong to the surrounding text rather than to a URL ending with them
+TRAILING_PUNCTUATION = ".,;:!?"
+CLOSING_BRACKETS = {")": "(", "]": "[", "}": "{"}
+
+URL_PREFIXES = ("http://", "https://")
+
+
+def trim_url(url: str) -> str:
+    """
+    Remove trailing punctuation and unbalanced closing brackets from a URL found in text.
+    """
+
+    end = len(url)
+    counts = {}
+
+    while end:
+        character = url[end - 1]
+
+        if character in TRAILING_PUNCTUATION:
+            end -= 1
+            continue
+
+        opening = CLOSING_BRACKETS.get(character)
+
+        if opening is None:
+            break
+
+        if character not in counts:
+            counts[character] = [url.count(opening, 0, end), url.count(character, 0, end)]
+
+        opened, closed = counts[character]
+
+        if closed <= opened:
+            break
+
+        counts[character][1] -= 1
+        end -= 1
+
+    return url[:end]
+
+
+def partial_prefix_length(text: str) -> int:
+    """
+    Return the length of the longest suffix of the text that could be the start of a URL (a URL prefix
+    like "http://" or "https://", or a part of it).
+    """
+
+    tail = text[-len("https://"):].lower()
+
+    for start in range(len(tail)):
+        suffix = tail[start:]
+        if any(prefix.startswith(suffix) for prefix in URL_PREFIXES):
+            return len(suffix)
+
+    return 0
+
+
+class TextCleaner:
+    """
+    Finds http(s) URLs in text and replaces them with their cleaned versions.
+
+    URLs repeated within a document are only cleaned once (up to unalix.config.CLEAN_TEXT_CACHE_SIZE
+    distinct URLs are remembered).
+    """
+
+
+    def __init__(self, cleaner: url_cleaner.Cleaner):
+        self.cleaner = cleaner
+        self.seen = types.LRUCache(max_entries=config.CLEAN_TEXT_CACHE_SIZE)
+
+
+    def clean_url(self, url: str) -> str:
+
+        result = self.seen.get(url)
+
+        if result is None:
+            result = self.cleaner.clear(url)
+            self.seen.put(url, result)
+
+        return result
+
+
+    def clean(self, text: str, final: typing.Optional[bool] = True) -> typing.Tuple[str, str]:
+        """
+        Clean the URLs in the given text, returning (cleaned_text, rest).
+
+        Unless `final` is True, a URL that reaches the end of the text might continue in the text that follows,
+        so it is left out of the result and returned as `rest` (along with a partial "http://" prefix, if any).
+        """
+
+        parts = []
+        position = 0
+
+        for match in URL_PATTERN.finditer(text):
+            start, end = match.span()
+
+            if not final and end == len(text):
+                break
+
+            url = trim_url(match.group())
+
+            parts.append(text[position:start])
+            parts.append(self.clean_url(url) if url.find("://") + 3 < len(url) else url)
+
+            position = start + len(url)
+        else:
+            start = len(text) if final else len(text) - partial_prefix_length(text)
+
+        start = max(start, position)
+
+        parts.append(text[position:start])
+
+        return ("".join(parts), text[start:])
+
+
+def clean_text(text: str, **kwargs: typing.Any) -> str:
+    """
+    Find every http(s) URL in the given text, clean it and return the text with the cleaned URLs in place.
+    Everything else in the text is left untouched.
+
+    Parameters:
+
+        text (str):
+            Any text (e.g. a chat message, an email or an HTML document).
+
+        **kwargs (optional):
+            Optional keyword arguments that unalix.clear_url() takes.
+
+    Usage example:
+
+        >>> import unalix
+        >>>
+        >>> unalix.clean_text("Listen to this: https://deezer.com/track/891177062?utm_source=deezer.")
+        'Listen to this: https://deezer.com/track/891177062.'
+    """
+
+    text_cleaner = TextCleaner(url_cleaner.get_cleaner(**kwargs))
+
+    result, rest = text_cleaner.clean(text, final=True)
+
+    return result
+
+
+def clean_text_stream(chunks: typing.Iterable[str], **kwargs: typing.Any) -> typing.Iterator[str]:
+    """
+    Same as unalix.clean_text(), but for text that comes in chunks (e.g. read from a file or a socket).
+
+    URLs split across chunks are handled. The output comes in chunks as well (not necessarily
+    the same ones), and joining them gives the same text that clean_text() would return for the
+    whole input. URLs longer than unalix.config.CLEAN_TEXT_MAX_URL_LENGTH are left untouched.
+
+    Usage example:
+
+        >>> import unalix
+        >>>
+        >>> with open("messages.txt") as file:
+        ...     for chunk in unalix.clean_text_stream(iter(lambda: file.read(65536), "")):
+        ...         print(chunk, end="")
+    """
+
+    text_cleaner = TextCleaner(url_cleaner.get_cleaner(**kwargs))
+
+    rest = ""
+    skipping = False
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+
+        if skipping:
+            # Rest of a URL that was too long to be cleaned
+            match = URL_END.search(chunk)
+
+            if match is None:
+                yield chunk
+                continue
+
+            yield chunk[:match.start()]
+
+            chunk = chunk[match.start():]
+            skipping = False
+
+        result, rest = text_cleaner.clean(rest + chunk, final=False)
+
+        if len(rest) > config.CLEAN_TEXT_MAX_URL_LENGTH:
+            result += rest
+            rest = ""
+            skipping = True
+
+        if result:
+            yield result
+
+    if rest:
+        result, rest = text_cleaner.clean(rest, final=True)
+        yield result
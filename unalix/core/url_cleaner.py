@@ -1,3 +1,9 @@
+import collections
+import concurrent.futures
+import itertools
+import os
+import re
+import sys
 import typing
 import urllib.parse
 
@@ -5,14 +11,911 @@ from .. import types
 from .. import config
 from .. import utils
 
+from . import codegen
 from . import coreutils
 
-# Build rulesets object
-rulesets = coreutils.rulesets_from_files(
-    config.PATH_RULESETS,
-    ignored_providers=config.IGNORED_PROVIDERS
+# URLs given as bytes are only checked without decoding them when they are printable ASCII and have
+# this simple form, where the serialized URL is known to be the URL itself (see Cleaner.clear_bytes())
+UNSAFE_BYTES = re.compile(rb"[^\x21-\x7e]")
+SIMPLE_URL_BYTES = re.compile(rb"(https?)://([^/?#:@\[\]]+)(/[^?#;]*)?(?:\?([^#]+))?(?:#(.+))?")
+
+# Rulesets are loaded on the first call to clear_url()
+@coreutils.once
+def get_rulesets() -> types.Rulesets:
+
+    return coreutils.rulesets_from_snapshot(
+        config.PATH_RULESETS,
+        ignored_providers=config.IGNORED_PROVIDERS,
+        directory=config.PATH_CACHE
+    )
+
+
+def __getattr__(name):
+
+    if name == "rulesets":
+        return get_rulesets()
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if sys.version_info < (3, 7):
+    # Module-level __getattr__ is not supported before Python 3.7
+    rulesets = get_rulesets()
+
+
+def extract_redirection(pattern: typing.Pattern, url: str) -> typing.Optional[str]:
+    """
+    Return the same string as pattern.sub(r"\\g<1>", url) for a redirection pattern (which ends with ".*"),
+    or None if the pattern does not match.
+
+    The target is taken from the first match instead of running the substitution over the whole URL.
+    """
+
+    match = pattern.search(url)
+
+    if match is None:
+        return None
+
+    end = match.end()
+
+    # ".*" stops at line breaks, so more matches may follow
+    if end != len(url):
+        return pattern.sub(r"\g<1>", url)
+
+    result = url[:match.start()] + match.expand(r"\g<1>")
+
+    # An empty match right at the end is replaced as well
+    if end > match.start():
+        empty_match = pattern.match(url, end)
+
+        if empty_match is not None:
+            result += empty_match.expand(r"\g<1>")
+
+    return result
+
+
+def redirection_target(redirection: types.Pattern, url: str) -> typing.Optional[str]:
+    """
+    Return the URL the given redirection rule extracts from `url`, or None if it doesn't apply.
+    """
+
+    if redirection.literal not in url:
+        return None
+
+    result = extract_redirection(redirection.compiled, url)
+
+    # Skip empty URLs
+    if not result:
+        return None
+
+    if result == url:
+        return None
+
+    redirect_url = types.URL(utils.requote_uri(urllib.parse.unquote(result)))
+
+    # Workaround for URLs without scheme (see https://github.com/ClearURLs/Addon/issues/71)
+    return redirect_url.prepend_scheme_if_needed().geturl()
+
+
+class Cleaner:
+    """
+    A reusable URL cleaner bound to a fixed set of options.
+
+    The keyword arguments are the same ones unalix.clear_url() takes. On first use, the rulesets are
+    specialized for these options: providers and rules that the options disable are dropped, so
+    cleaning a URL only goes through the work that can actually change it.
+
+    With backend="generated" (defaults to unalix.config.CLEAR_URL_BACKEND), the providers are then turned
+    into Python code specialized for them (see unalix.core.codegen), which gives the same results.
+
+    Usage example:
+
+        >>> import unalix
+        >>>
+        >>> cleaner = unalix.Cleaner(ignoreReferralMarketing=True, stripEmpty=True)
+        >>>
+        >>> cleaner.clear("https://deezer.com/track/891177062?utm_source=deezer&empty=")
+        'https://deezer.com/track/891177062'
+    """
+
+
+    def __init__(
+        self,
+        ignoreReferralMarketing: typing.Optional[bool] = False,
+        ignoreRules: typing.Optional[bool] = False,
+        ignoreExceptions: typing.Optional[bool] = False,
+        ignoreRawRules: typing.Optional[bool] = False,
+        ignoreRedirections: typing.Optional[bool] = False,
+        skipBlocked: typing.Optional[bool] = False,
+        skipLocal: typing.Optional[bool] = False,
+        stripDuplicates: typing.Optional[bool] = False,
+        stripEmpty: typing.Optional[bool] = False,
+        rulesets: typing.Optional[types.Rulesets] = None,
+        cache: typing.Optional[types.LRUCache] = None,
+        max_unwraps: typing.Optional[int] = None,
+        backend: typing.Optional[str] = None
+    ):
+        self.ignoreReferralMarketing = bool(ignoreReferralMarketing)
+        self.ignoreRules = bool(ignoreRules)
+        self.ignoreExceptions = bool(ignoreExceptions)
+        self.ignoreRawRules = bool(ignoreRawRules)
+        self.ignoreRedirections = bool(ignoreRedirections)
+        self.skipBlocked = bool(skipBlocked)
+        self.skipLocal = bool(skipLocal)
+        self.stripDuplicates = bool(stripDuplicates)
+        self.stripEmpty = bool(stripEmpty)
+
+        self.rulesets = rulesets
+        self.cache = cache
+        self.max_unwraps = max_unwraps if max_unwraps is not None else config.CLEAR_URL_MAX_UNWRAPS
+        self.backend = backend if backend is not None else config.CLEAR_URL_BACKEND
+
+        if self.backend not in ("interpreted", "generated"):
+            raise ValueError(f"unknown backend {self.backend!r}")
+
+        self.options_key = frozenset(name for name, value in self.options().items() if value)
+
+        # Built on first use and again after the rulesets are reloaded (see build())
+        self.providers = None
+        self.host_index = None
+        self.built_from = None
+
+        # Runs the providers on a URL, either apply() or its generated replacement (see build())
+        self.apply_providers = None
+
+        # (scheme, hostname) -> result of match_providers()
+        self.matched_providers = {}
+
+
+    def options(self) -> typing.Dict[str, bool]:
+
+        return dict(
+            ignoreReferralMarketing=self.ignoreReferralMarketing,
+            ignoreRules=self.ignoreRules,
+            ignoreExceptions=self.ignoreExceptions,
+            ignoreRawRules=self.ignoreRawRules,
+            ignoreRedirections=self.ignoreRedirections,
+            skipBlocked=self.skipBlocked,
+            skipLocal=self.skipLocal,
+            stripDuplicates=self.stripDuplicates,
+            stripEmpty=self.stripEmpty
+        )
+
+
+    def cache_key(self, url: str) -> tuple:
+        """
+        Return the key the result for the given URL is cached under.
+
+        Keys hold everything results depend on (the options, max_unwraps and the custom rulesets, or None for the
+        shared ones), so a cache can be shared by cleaners with different settings.
+        """
+
+        return (self.options_key, self.max_unwraps, self.rulesets, url)
+
+
+    def __repr__(self) -> str:
+
+        options = ", ".join(f"{key}={value!r}" for key, value in self.options().items() if value)
+
+        return f"unalix.Cleaner({options})"
+
+
+    def build(self) -> None:
+        """
+        Specialize the rulesets for the options of this cleaner.
+
+        Each provider becomes a tuple of (position, urlPattern, exceptions, redirections, query_filters, rawRules)
+        holding only what the options enable. Providers left with nothing that could change a URL are dropped.
+        """
+
+        rulesets = self.rulesets
+
+        if rulesets is None:
+            rulesets = get_rulesets()
+
+        # Results cached for the previous rulesets are no longer valid
+        if self.providers is not None and self.cache is not None:
+            self.cache.clear()
+
+        providers = []
+        new_positions = {}
+
+        for position, ruleset in enumerate(rulesets.iter()):
+            if self.skipBlocked and ruleset.completeProvider:
+                continue
+
+            query_filters = []
+
+            if not self.ignoreRules:
+                query_filters.extend(ruleset.rulesFilters)
+            if not self.ignoreReferralMarketing:
+                query_filters.extend(ruleset.referralMarketingFilters)
+
+            redirections = [] if self.ignoreRedirections else list(ruleset.redirections.iter())
+            rawRules = [] if self.ignoreRawRules else list(ruleset.rawRules.iter())
+
+            # Exceptions only prevent the other rules of the same provider from running
+            if not (redirections or query_filters or rawRules):
+                continue
+
+            exceptions = [] if self.ignoreExceptions else list(ruleset.exceptions.iter())
+
+            new_positions[position] = len(providers)
+
+            providers.append(
+                (position, ruleset.urlPattern, tuple(exceptions), tuple(redirections), tuple(query_filters), tuple(rawRules))
+            )
+
+        # The host index of the rulesets refers to their original positions
+        host_index = types.HostIndex()
+
+        for label, positions in rulesets.host_index.labels.items():
+            positions = [new_positions[position] for position in positions if position in new_positions]
+            if positions:
+                host_index.labels[label] = positions
+
+        host_index.fallback.extend(
+            new_positions[position] for position in rulesets.host_index.fallback if position in new_positions
+        )
+
+        if self.backend == "generated":
+            # Code generated for the shared rulesets is cached on disk
+            self.apply_providers = codegen.make_apply(
+                providers,
+                self.stripEmpty,
+                self.stripDuplicates,
+                redirection_target,
+                key=codegen.source_key(self.options_key) if self.rulesets is None else None
+            )
+        else:
+            self.apply_providers = self.apply
+
+        self.matched_providers = {}
+        self.host_index = host_index
+        self.providers = providers
+        self.built_from = rulesets
+
+
+    def ensure_built(self) -> None:
+        """
+        Build the providers on first use, and rebuild them if the shared rulesets were reloaded since.
+        """
+
+        if self.providers is None or (self.rulesets is None and get_rulesets() is not self.built_from):
+            self.build()
+
+
+    def match_providers(self, scheme: str, netloc: str) -> typing.List[tuple]:
+        """
+        Return the providers whose urlPattern matches the given scheme and hostname, without the exceptions
+        that can't match URLs on that host.
+
+        Results are remembered for the last unalix.config.CLEAR_URL_HOST_CACHE_SIZE hosts.
+        """
+
+        self.ensure_built()
+
+        key = (scheme, netloc)
+        matched_providers = self.matched_providers
+
+        try:
+            return matched_providers[key]
+        except KeyError:
+            pass
+
+        providers = self.providers
+        origin = f"{scheme}://{netloc}"
+        labels = set(netloc.split("."))
+
+        result = []
+
+        # Only providers whose urlPattern might match the hostname are considered
+        for index in self.host_index.lookup(netloc):
+            provider = providers[index]
+
+            # https://docs.clearurls.xyz/latest/specs/rules/#urlpattern
+            if not provider[1].compiled.match(origin):
+                continue
+
+            exceptions = provider[2]
+
+            if exceptions:
+                kept = tuple(
+                    exception for exception in exceptions
+                    if exception.host_label is None or exception.host_label in labels
+                )
+
+                if len(kept) != len(exceptions):
+                    provider = provider[:2] + (kept,) + provider[3:]
+
+            result.append(provider)
+
+        if len(matched_providers) >= config.CLEAR_URL_HOST_CACHE_SIZE:
+            matched_providers.clear()
+
+        matched_providers[key] = result
+
+        return result
+
+
+    def clear(self, url: typing.Union[str, urllib.parse.ParseResult]) -> str:
+        """
+        Clean the given URL. See unalix.clear_url() for details.
+        """
+
+        self.ensure_built()
+
+        if isinstance(url, types.URL_TYPES):
+            url = url.geturl()
+
+        cache = self.cache
+
+        if cache is not None:
+            key = self.cache_key(url)
+            result = cache.get(key)
+
+            if result is not None:
+                return result
+
+        result, unwraps = self.unwrap(url)
+
+        if cache is not None:
+            cache.put(key, result)
+
+        return result
+
+
+    def unwrap(
+        self,
+        url: typing.Union[str, urllib.parse.ParseResult],
+        parsed_url: typing.Optional[types.MutableURL] = None,
+        providers: typing.Optional[typing.List[tuple]] = None
+    ) -> typing.Tuple[str, int]:
+        """
+        Clean the given URL and return it along with the number of redirections that were unwrapped on the way.
+
+        Redirections are followed in a loop, at most `max_unwraps` times. A redirection that leads back to a URL
+        already seen in the chain, or that would go past that limit, is ignored as if it had not matched.
+        """
+
+        self.ensure_built()
+
+        if isinstance(url, types.URL_TYPES):
+            url = url.geturl()
+
+        visited = {url}
+        unwraps = 0
+
+        while True:
+            if parsed_url is None:
+                parsed_url = types.MutableURL(url)
+
+                if self.skipLocal and parsed_url.islocal():
+                    return (types.URL(url), unwraps)
+
+                providers = self.match_providers(parsed_url.scheme, parsed_url.netloc)
+
+            result, redirect_url = self.apply_providers(
+                url, parsed_url, providers, visited if unwraps < self.max_unwraps else None
+            )
+
+            if redirect_url is None:
+                return (result, unwraps)
+
+            unwraps += 1
+            visited.add(redirect_url)
+
+            url, parsed_url = redirect_url, None
+
+
+    def needs_cleaning(self, url: typing.Union[str, urllib.parse.ParseResult]) -> bool:
+        """
+        Check whether clear() would change the given URL, i.e. clear(url) != url.
+
+        This stops at the first rule that fires, without building the cleaned URL. Only in the few cases where
+        firing a rule doesn't settle the answer (redirections, raw rules, URLs that aren't in their serialized
+        form) is the URL actually cleaned and compared.
+        """
+
+        self.ensure_built()
+
+        if isinstance(url, types.URL_TYPES):
+            url = url.geturl()
+
+        parsed_url = types.MutableURL(url)
+
+        if self.skipLocal and parsed_url.islocal():
+            return False
+
+        # From here on, every provider sees the URL as given (no rule fired yet)
+        if parsed_url.geturl() != url:
+            return self.clear(url) != url
+
+        query, fragment, path = parsed_url.query, parsed_url.fragment, parsed_url.path
+
+        # Fields that utils.filter_query() would rewrite or drop
+        unfiltered = (
+            (query and utils.filter_query(query, stripEmpty=self.stripEmpty, stripDuplicates=self.stripDuplicates) != query) or
+            (fragment and utils.filter_query(fragment, stripEmpty=self.stripEmpty, stripDuplicates=self.stripDuplicates) != fragment)
+        )
+
+        providers = self.match_providers(parsed_url.scheme, parsed_url.netloc)
+
+        # Without redirections, the cleaned URL always has its fields in the form utils.filter_query() gives them
+        if unfiltered and (self.max_unwraps < 1 or not any(provider[3] for provider in providers)):
+            return True
+
+        for index, (
+            position, urlPattern, exceptions,
+            redirections, query_filters, rawRules
+        ) in enumerate(providers):
+
+            exception_matched = None
+
+            for exception in exceptions:
+                if exception.literal in url and exception.compiled.match(url):
+                    exception_matched = True
+                    break
+
+            if exception_matched:
+                continue
+
+            if self.max_unwraps >= 1:
+                for redirection in redirections:
+                    redirect_url = redirection_target(redirection, url)
+
+                    if redirect_url is not None and redirect_url != url:
+                        return self.clear(url) != url
+
+            if query_filters and (
+                (query and types.query_filters_match(query_filters, query)) or
+                (fragment and types.query_filters_match(query_filters, fragment))
+            ):
+                # Removing fields either makes the URL shorter or (for fields that utils.filter_query() rewrites)
+                # gives a query that differs from the original one, unless a later provider redirects elsewhere
+                if self.max_unwraps >= 1 and any(provider[3] for provider in providers[index + 1:]):
+                    return self.clear(url) != url
+
+                return True
+
+            if path:
+                for rawRule in rawRules:
+                    if rawRule.literal in path and any(match.end() > match.start() for match in rawRule.compiled.finditer(path)):
+                        return self.clear(url) != url
+
+        return bool(unfiltered)
+
+
+    def clear_bytes(self, url: typing.Union[bytes, bytearray, memoryview]) -> typing.Union[bytes, bytearray, memoryview]:
+        """
+        Same as clear(), for a UTF-8 encoded URL. Returns the given object itself when the URL doesn't change,
+        otherwise the cleaned URL as bytes.
+
+        Simple printable ASCII URLs (the vast majority) are checked with the bytes version of the rule regexes,
+        without decoding or copying them. Only URLs that some rule might change, or that don't have a simple
+        form, are decoded and cleaned with clear().
+        """
+
+        if self.bytes_unchanged(url):
+            return url
+
+        text = str(url, "utf-8", "surrogateescape")
+        result = self.clear(text)
+
+        if result == text:
+            return url
+
+        return result.encode("utf-8", "surrogateescape")
+
+
+    def bytes_unchanged(self, url: typing.Union[bytes, bytearray, memoryview]) -> bool:
+        """
+        Check whether the given URL is known to be left unchanged by clear(), without decoding it.
+        False means that it might change.
+        """
+
+        if UNSAFE_BYTES.search(url) is not None:
+            return False
+
+        match = SIMPLE_URL_BYTES.fullmatch(url)
+
+        if match is None:
+            return False
+
+        self.ensure_built()
+
+        scheme, netloc, path, query, fragment = match.groups()
+
+        netloc = netloc.decode("ascii")
+
+        # "in" looks for single items in memoryviews, so the literal gates are skipped for them
+        gated = not isinstance(url, memoryview)
+
+        if self.skipLocal and types.urls.is_local_host(netloc):
+            return True
+
+        if query and not utils.is_filtered_query(query, stripEmpty=self.stripEmpty, stripDuplicates=self.stripDuplicates):
+            return False
+
+        if fragment and not utils.is_filtered_query(fragment, stripEmpty=self.stripEmpty, stripDuplicates=self.stripDuplicates):
+            return False
+
+        # The serialized URL is the URL itself, so every provider sees the same one until a rule fires
+        for (
+            position, urlPattern, exceptions,
+            redirections, query_filters, rawRules
+        ) in self.match_providers(scheme.decode("ascii"), netloc):
+
+            exception_matched = None
+
+            for exception in exceptions:
+                if gated and exception.literal_bytes not in url:
+                    continue
+
+                compiled = exception.compiled_bytes
+
+                if compiled is None:
+                    return False
+
+                if compiled.match(url):
+                    exception_matched = True
+                    break
+
+            if exception_matched:
+                continue
+
+            if self.max_unwraps >= 1:
+                for redirection in redirections:
+                    if gated and redirection.literal_bytes not in url:
+                        continue
+
+                    compiled = redirection.compiled_bytes
+
+                    if compiled is None or compiled.search(url):
+                        return False
+
+            if query_filters and (
+                (query and types.query_filters_match_bytes(query_filters, query)) or
+                (fragment and types.query_filters_match_bytes(query_filters, fragment))
+            ):
+                return False
+
+            if path:
+                for rawRule in rawRules:
+                    if rawRule.literal_bytes not in path:
+                        continue
+
+                    compiled = rawRule.compiled_bytes
+
+                    if compiled is None or any(match.end() > match.start() for match in compiled.finditer(path)):
+                        return False
+
+        return True
+
+
+    def clear_urls_bytes(
+        self,
+        urls: typing.Iterable[typing.Union[bytes, bytearray, memoryview]]
+    ) -> typing.Iterator[typing.Union[bytes, bytearray, memoryview]]:
+        """
+        Clean the given UTF-8 encoded URLs with clear_bytes(), yielding the results in the same order.
+        """
+
+        for url in urls:
+            yield self.clear_bytes(url)
+
+
+    def clear_urls(
+        self,
+        urls: typing.Iterable[typing.Union[str, urllib.parse.ParseResult]],
+        chunk_size: typing.Optional[int] = None,
+        workers: typing.Optional[int] = None
+    ) -> typing.Iterator[str]:
+        """
+        Clean the given URLs, yielding the results in the same order.
+
+        URLs are taken from the iterable in chunks of `chunk_size` (defaults to unalix.config.CLEAR_URLS_CHUNK_SIZE),
+        so only one chunk is held in memory at a time. Within a chunk, URLs are grouped by scheme and hostname
+        and the matching providers are looked up once for each group.
+
+        If `workers` is greater than 1, chunks are cleaned by that many processes (0 means one per CPU).
+        See clear_urls_in_processes().
+        """
+
+        if chunk_size is None:
+            chunk_size = config.CLEAR_URLS_CHUNK_SIZE
+
+        if workers is not None and workers != 1:
+            yield from self.clear_urls_in_processes(urls, chunk_size=chunk_size, workers=workers)
+            return
+
+        iterator = iter(urls)
+
+        while True:
+            chunk = list(itertools.islice(iterator, chunk_size))
+
+            if not chunk:
+                return
+
+            self.ensure_built()
+
+            cache = self.cache
+            groups = {}
+
+            for index, url in enumerate(chunk):
+                if isinstance(url, types.URL_TYPES):
+                    url = chunk[index] = url.geturl()
+
+                if cache is not None:
+                    result = cache.get(self.cache_key(url))
+
+                    if result is not None:
+                        chunk[index] = result
+                        continue
+
+                parsed_url = types.MutableURL(url)
+
+                groups.setdefault((parsed_url.scheme, parsed_url.netloc), []).append((index, url, parsed_url))
+
+            for (scheme, netloc), members in groups.items():
+                if self.skipLocal and members[0][2].islocal():
+                    results = [types.URL(url) for index, url, parsed_url in members]
+                else:
+                    providers = self.match_providers(scheme, netloc)
+                    results = [self.unwrap(url, parsed_url, providers)[0] for index, url, parsed_url in members]
+
+                for (index, url, parsed_url), result in zip(members, results):
+                    chunk[index] = result
+
+                    if cache is not None:
+                        cache.put(self.cache_key(url), result)
+
+            yield from chunk
+
+
+    def clear_urls_in_processes(
+        self,
+        urls: typing.Iterable[typing.Union[str, urllib.parse.ParseResult]],
+        chunk_size: int,
+        workers: int
+    ) -> typing.Iterator[str]:
+        """
+        Clean the given URLs with a pool of `workers` processes, yielding the results in the same order.
+
+        The rulesets are loaded before the pool starts. Forked workers inherit them, and the other ones load
+        the on-disk snapshot that was written on the way. Each task is a whole chunk of URLs, and at most two
+        chunks per worker are in flight at a time.
+        """
+
+        if workers == 0:
+            workers = os.cpu_count() or 1
+
+        if self.providers is None:
+            self.build()
+
+        # Everything the results depend on, besides custom rulesets
+        settings = (
+            {name: value for name, value in self.options().items() if value},
+            self.max_unwraps,
+            self.backend
+        )
+
+        if self.rulesets is None:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        elif sys.version_info >= (3, 7):
+            # Custom rulesets are sent to each worker once
+            executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=install_cleaner,
+                initargs=(settings, self.rulesets)
+            )
+        else:
+            yield from self.clear_urls(urls, chunk_size=chunk_size)
+            return
+
+        iterator = iter(urls)
+        pending = collections.deque()
+
+        with executor:
+            try:
+                while True:
+                    while len(pending) < workers * 2:
+                        chunk = [
+                            url.geturl() if isinstance(url, types.URL_TYPES) else url
+                            for url in itertools.islice(iterator, chunk_size)
+                        ]
+
+                        if not chunk:
+                            break
+
+                        pending.append(executor.submit(clear_chunk, settings, chunk))
+
+                    if not pending:
+                        return
+
+                    yield from pending.popleft().result()
+            finally:
+                # Don't wait for chunks nobody is going to read
+                for future in pending:
+                    future.cancel()
+
+
+    def apply(
+        self,
+        raw_url: str,
+        url: types.MutableURL,
+        providers: typing.List[tuple],
+        visited: typing.Optional[typing.Set[str]] = None
+    ) -> typing.Tuple[typing.Optional[str], typing.Optional[str]]:
+        """
+        Run the given providers (as returned by match_providers()) on a URL that was parsed from `raw_url`.
+
+        Returns (cleaned_url, None), or (None, redirect_url) when a redirection matched. Redirections to URLs
+        in `visited` are ignored, and so are all redirections when `visited` is None.
+        """
+
+        # The URL is modified in place by every provider
+        for (
+            position, urlPattern, exceptions,
+            redirections, query_filters, rawRules
+        ) in providers:
+
+            # The first ruleset sees the URL exactly as given, the following ones see it serialized
+            current_url = raw_url if position == 0 else url.geturl()
+
+            exception_matched = None
+
+            # https://docs.clearurls.xyz/latest/specs/rules/#exceptions
+            for exception in exceptions:
+                if exception.literal in current_url and exception.compiled.match(current_url):
+                    exception_matched = True
+                    break
+
+            if exception_matched:
+                continue
+
+            # https://docs.clearurls.xyz/latest/specs/rules/#redirections
+            for redirection in redirections if visited is not None else ():
+                redirect_url = redirection_target(redirection, current_url)
+
+                # Redirection loops
+                if redirect_url is None or redirect_url in visited:
+                    continue
+
+                return (None, redirect_url)
+
+            if query_filters:
+                # https://docs.clearurls.xyz/latest/specs/rules/#rules
+                # https://docs.clearurls.xyz/latest/specs/rules/#referralmarketing
+                query = url.query
+
+                if query:
+                    url.query = types.apply_query_filters(query_filters, query)
+
+                # The fragment might contains tracking fields as well
+                fragment = url.fragment
+
+                if fragment:
+                    url.fragment = types.apply_query_filters(query_filters, fragment)
+
+            path = url.path
+
+            if path and rawRules:
+                # https://docs.clearurls.xyz/latest/specs/rules/#rawrules
+                for rawRule in rawRules:
+                    if rawRule.literal in path:
+                        path = rawRule.compiled.sub("", path)
+
+                if path != url.path:
+                    url.path = path
+                    # A rewritten path might split differently (e.g. ";params"), so parse it again
+                    url = types.MutableURL(url.geturl())
+
+        if url.query:
+            url.query = utils.filter_query(
+                query=url.query,
+                stripEmpty=self.stripEmpty,
+                stripDuplicates=self.stripDuplicates
+            )
+
+        if url.fragment:
+            url.fragment = utils.filter_query(
+                query=url.fragment,
+                stripEmpty=self.stripEmpty,
+                stripDuplicates=self.stripDuplicates
+            )
+
+        return (url.geturl(), None)
+
+
+    __call__ = clear
+
+
+CLEANER_OPTIONS = (
+    "ignoreReferralMarketing",
+    "ignoreRules",
+    "ignoreExceptions",
+    "ignoreRawRules",
+    "ignoreRedirections",
+    "skipBlocked",
+    "skipLocal",
+    "stripDuplicates",
+    "stripEmpty"
 )
 
+# Cleaners used by clear_url(), one for each combination of options
+cleaners = {}
+
+# Cache shared by these cleaners (see set_clear_url_cache())
+clear_url_cache = None
+
+def get_cleaner(**kwargs) -> Cleaner:
+    """
+    Return a shared Cleaner for the given options (the keyword arguments unalix.clear_url() takes).
+    """
+
+    unknown = set(kwargs) - set(CLEANER_OPTIONS)
+
+    if unknown:
+        raise TypeError(f"unexpected keyword argument {sorted(unknown)[0]!r}")
+
+    key = frozenset(name for name, value in kwargs.items() if value)
+
+    try:
+        return cleaners[key]
+    except KeyError:
+        pass
+
+    cleaner = Cleaner(cache=clear_url_cache, **kwargs)
+
+    return cleaners.setdefault(key, cleaner)
+
+
+def set_clear_url_cache(cache: typing.Optional[types.LRUCache]) -> None:
+    """
+    Memoize the results of unalix.clear_url(), unalix.clear_urls() and unalix.unshort_url() redirect cleaning
+    in the given cache. Pass None to disable it (the default).
+
+    Results are cached per URL and per set of options. The cache is cleared when the rulesets are reloaded
+    (see reload_rulesets()).
+
+    Usage example:
+
+        >>> import unalix
+        >>>
+        >>> cache = unalix.types.LRUCache(max_entries=100000, max_bytes=64 * 1024 * 1024)
+        >>> unalix.set_clear_url_cache(cache)
+        >>>
+        >>> unalix.clear_url("https://deezer.com/track/891177062?utm_source=deezer")
+        'https://deezer.com/track/891177062'
+        >>> cache.cache_info().misses
+        1
+    """
+
+    global clear_url_cache
+
+    clear_url_cache = cache
+
+    for cleaner in list(cleaners.values()) + list(worker_cleaners.values()):
+        cleaner.cache = cache
+
+
+def reload_rulesets() -> types.Rulesets:
+    """
+    Load the rulesets again (e.g. after the files in unalix.config.PATH_RULESETS were updated).
+
+    Cleaners that use the shared rulesets rebuild themselves and clear their caches on their next use.
+    """
+
+    get_rulesets.reset()
+
+    if sys.version_info < (3, 7):
+        global rulesets
+        rulesets = get_rulesets()
+
+    return get_rulesets()
+
+
 def clear_url(
     url: typing.Union[str, urllib.parse.ParseResult],
     ignoreReferralMarketing: typing.Optional[bool] = False,
@@ -107,103 +1010,162 @@ def clear_url(
             'https://natura.com.br/p/2458'
     """
 
-    for ruleset in rulesets.iter():
+    return get_cleaner(
+        ignoreReferralMarketing=ignoreReferralMarketing,
+        ignoreRules=ignoreRules,
+        ignoreExceptions=ignoreExceptions,
+        ignoreRawRules=ignoreRawRules,
+        ignoreRedirections=ignoreRedirections,
+        skipBlocked=skipBlocked,
+        skipLocal=skipLocal,
+        stripDuplicates=stripDuplicates,
+        stripEmpty=stripEmpty
+    ).clear(url)
 
-        if isinstance(url, types.URL_TYPES):
-            url = types.URL(url.geturl())
-        else:
-            url = types.URL(url)
 
-        if skipLocal and url.islocal():
-            return url
+def needs_cleaning(url: typing.Union[str, urllib.parse.ParseResult], **kwargs: typing.Any) -> bool:
+    """
+    Check whether unalix.clear_url() would change the given URL. This always agrees with
+    clear_url(url, **kwargs) != url, but is cheaper to compute.
 
-        if skipBlocked and ruleset.completeProvider:
-            continue
-
-        # https://docs.clearurls.xyz/latest/specs/rules/#urlpattern
-        if ruleset.urlPattern.compiled.match(f"{url.scheme}://{url.netloc}"):
-            if not ignoreExceptions:
-                exception_matched = None
-                # https://docs.clearurls.xyz/latest/specs/rules/#exceptions
-                for exception in ruleset.exceptions.iter():
-                    if exception.compiled.match(url):
-                        exception_matched = True
-                        break
-                if exception_matched:
-                    continue
+    Parameters:
 
-            if not ignoreRedirections:
-                # https://docs.clearurls.xyz/latest/specs/rules/#redirections
-                for redirection in ruleset.redirections:
-                    result = redirection.compiled.sub(r"\g<1>", url)
+        url (str):
+            A string representing an HTTP URL.
 
-                    # Skip empty URLs
-                    if not result:
-                        continue
+        **kwargs (optional):
+            Optional keyword arguments that unalix.clear_url() takes.
 
-                    if result == url:
-                        continue
+    Usage example:
 
-                    url = types.URL(utils.requote_uri(urllib.parse.unquote(result)))
-
-                    # Workaround for URLs without scheme (see https://github.com/ClearURLs/Addon/issues/71)
-                    url = url.prepend_scheme_if_needed()
-
-                    return clear_url(
-                        url=url,
-                        ignoreReferralMarketing=ignoreReferralMarketing,
-                        ignoreRules=ignoreRules,
-                        ignoreExceptions=ignoreExceptions,
-                        ignoreRawRules=ignoreRawRules,
-                        ignoreRedirections=ignoreRedirections,
-                        skipBlocked=skipBlocked,
-                        skipLocal=skipLocal,
-                        stripDuplicates=stripDuplicates,
-                        stripEmpty=stripEmpty
-                    )
-
-            if url.query:
-                if not ignoreRules:
-                    # https://docs.clearurls.xyz/latest/specs/rules/#rules
-                    for rule in ruleset.rules:
-                        url.query = rule.compiled.sub(r"\g<1>", url.query)
-                if not ignoreReferralMarketing:
-                    # https://docs.clearurls.xyz/latest/specs/rules/#referralmarketing
-                    for referral in ruleset.referralMarketing:
-                        url.query = referral.compiled.sub(r"\g<1>", url.query)
-
-            # The fragment might contains tracking fields as well
-            if url.fragment:
-                if not ignoreRules:
-                    for rule in ruleset.rules:
-                        url.fragment = rule.compiled.sub(r"\g<1>", url.fragment)
-                if not ignoreReferralMarketing:
-                    for referral in ruleset.referralMarketing:
-                        url.fragment = referral.compiled.sub(r"\g<1>", url.fragment)
-
-            if url.path:
-                if not ignoreRawRules:
-                    # https://docs.clearurls.xyz/latest/specs/rules/#rawrules
-                    for rawRule in ruleset.rawRules:
-                        url.path = rawRule.compiled.sub("", url.path)
-
-        url = url.geturl()
-
-    url = types.URL(url)
-
-    if url.query:
-        url.query = utils.filter_query(
-            query=url.query,
-            stripEmpty=stripEmpty,
-            stripDuplicates=stripDuplicates
-        )
-    
-    if url.fragment:
-        url.fragment = utils.filter_query(
-            query=url.fragment,
-            stripEmpty=stripEmpty,
-            stripDuplicates=stripDuplicates
-        )
-    
-    return url.geturl()
+        >>> import unalix
+        >>>
+        >>> unalix.needs_cleaning("https://deezer.com/track/891177062?utm_source=deezer")
+        True
+        >>> unalix.needs_cleaning("https://deezer.com/track/891177062")
+        False
+    """
+
+    return get_cleaner(**kwargs).needs_cleaning(url)
+
+
+def clear_url_bytes(url: typing.Union[bytes, bytearray, memoryview], **kwargs: typing.Any) -> typing.Union[bytes, bytearray, memoryview]:
+    """
+    Same as unalix.clear_url(), for a UTF-8 encoded URL (e.g. a slice of a raw log line).
+
+    URLs that don't change are returned as they were given (the same object, not a copy), and only URLs
+    that do change are decoded.
+
+    Parameters:
+
+        url (bytes | bytearray | memoryview):
+            A URL encoded as UTF-8.
+
+        **kwargs (optional):
+            Optional keyword arguments that unalix.clear_url() takes.
+
+    Usage example:
+
+        >>> import unalix
+        >>>
+        >>> unalix.clear_url_bytes(b"https://deezer.com/track/891177062?utm_source=deezer")
+        b'https://deezer.com/track/891177062'
+    """
+
+    return get_cleaner(**kwargs).clear_bytes(url)
+
+
+def clear_urls_bytes(
+    urls: typing.Iterable[typing.Union[bytes, bytearray, memoryview]],
+    **kwargs: typing.Any
+) -> typing.Iterator[typing.Union[bytes, bytearray, memoryview]]:
+    """
+    Same as unalix.clear_url_bytes(), for many URLs at once. Results are yielded in the same order as the input.
+
+    Usage example:
+
+        >>> import unalix
+        >>>
+        >>> with open("access.log", "rb") as file:
+        ...     for url in unalix.clear_urls_bytes(line.split(b" ")[6] for line in file):
+        ...         ...
+    """
+
+    return get_cleaner(**kwargs).clear_urls_bytes(urls)
+
+
+# Cleaners of worker processes, by (options, max_unwraps, backend)
+worker_cleaners = {}
+
+def get_worker_cleaner(
+    settings: typing.Tuple[typing.Dict[str, bool], int, str],
+    rulesets: typing.Optional[types.Rulesets] = None
+) -> Cleaner:
+    """
+    Return the cleaner of this (worker) process for the given (options, max_unwraps, backend).
+    """
+
+    options, max_unwraps, backend = settings
+
+    key = (frozenset(options), max_unwraps, backend)
+
+    try:
+        return worker_cleaners[key]
+    except KeyError:
+        pass
+
+    cleaner = Cleaner(rulesets=rulesets, cache=clear_url_cache, max_unwraps=max_unwraps, backend=backend, **options)
+
+    return worker_cleaners.setdefault(key, cleaner)
+
+
+def install_cleaner(settings: typing.Tuple[typing.Dict[str, bool], int, str], rulesets: types.Rulesets) -> None:
+    """
+    Make clear_chunk() use a cleaner bound to the given rulesets in this (worker) process.
+    """
+
+    get_worker_cleaner(settings, rulesets=rulesets)
+
+
+def clear_chunk(settings: typing.Tuple[typing.Dict[str, bool], int, str], chunk: typing.List[str]) -> typing.List[str]:
+
+    return list(get_worker_cleaner(settings).clear_urls(chunk, chunk_size=len(chunk)))
+
+
+def clear_urls(
+    urls: typing.Iterable[typing.Union[str, urllib.parse.ParseResult]],
+    chunk_size: typing.Optional[int] = None,
+    workers: typing.Optional[int] = None,
+    **kwargs: typing.Any
+) -> typing.Iterator[str]:
+    """
+    Clean many URLs at once, yielding the results in the same order as the input.
+
+    Parameters:
+
+        urls (Iterable[str]):
+            Any iterable of URLs, including lazy ones (e.g. a file object or a generator).
+
+        chunk_size (int | optional):
+            How many URLs are taken from the iterable at a time. Defaults to unalix.config.CLEAR_URLS_CHUNK_SIZE.
+
+        workers (int | optional):
+            Number of processes used to clean the URLs. Pass 0 to use one process per CPU. Defaults to cleaning
+            the URLs in the current process.
+
+            URLs are sent to the workers a chunk at a time, so larger chunks mean less overhead per URL.
+
+        **kwargs (optional):
+            Optional keyword arguments that unalix.clear_url() takes.
+
+    Usage example:
+
+        >>> import unalix
+        >>>
+        >>> urls = ["https://deezer.com/track/891177062?utm_source=deezer", "https://natura.com.br/p/2458?consultoria=promotop"]
+        >>>
+        >>> list(unalix.clear_urls(urls))
+        ['https://deezer.com/track/891177062', 'https://natura.com.br/p/2458']
+    """
 
+    return get_cleaner(**kwargs).clear_urls(urls, chunk_size=chunk_size, workers=workers)
@@ -1,4 +1,6 @@
 import asyncio
+import collections
+import concurrent.futures
 import typing
 import http
 import http.cookiejar
@@ -9,6 +11,7 @@ import urllib.parse
 import time
 import datetime
 import os
+import sys
 
 from .. import types
 from .. import config
@@ -18,8 +21,98 @@ from . import cookie_policies
 from . import ssl_context
 from . import url_cleaner
 from . import coreutils
+from . import connection_pool
+from . import async_http
+from . import redirect_cache
+from . import cache_backends
+
+# Body redirects are loaded the first time a response body is parsed
+@coreutils.once
+def get_body_redirects() -> types.BodyRedirects:
+
+    return coreutils.body_redirects_from_files(config.PATH_BODY_REDIRECTS)
+
+
+# The cache used when unalix.config.HTTP_CACHE_ENABLED is True and none is given
+@coreutils.once
+def get_redirect_cache() -> redirect_cache.RedirectCache:
+
+    if config.HTTP_CACHE_PATH is None:
+        return redirect_cache.RedirectCache()
+
+    return redirect_cache.RedirectCache(backend=cache_backends.SQLiteCacheBackend(config.HTTP_CACHE_PATH))
+
+
+# The pool used by unshort_url() when none is given is created on first use
+@coreutils.once
+def get_connection_pool() -> connection_pool.ConnectionPool:
+
+    return connection_pool.ConnectionPool()
+
+
+def release_connection(
+    pool: typing.Optional[connection_pool.ConnectionPool],
+    connection: http.client.HTTPConnection,
+    reusable: typing.Optional[bool] = False
+) -> None:
+
+    if pool is None:
+        connection.close()
+    else:
+        pool.release(connection, reusable=reusable)
+
+
+def merge_headers(*dictionaries: typing.Dict[str, str]) -> typing.Dict[str, str]:
+    """
+    Merge the given header dictionaries, where later values replace earlier ones whatever the case of
+    their names (a request with two "Host" lines is invalid).
+    """
+
+    headers = {}
+    names = {}
+
+    for dictionary in dictionaries:
+        for name, value in dictionary.items():
+            previous = names.get(name.lower())
+
+            if previous is not None:
+                del headers[previous]
+
+            names[name.lower()] = name
+            headers[name] = value
+
+    return headers
+
+
+def drain_response(response: http.client.HTTPResponse, max_size: int) -> bool:
+    """
+    Read what is left of the response body (at most max_size bytes) and return whether the connection
+    can be used for another request.
+    """
+
+    if response.will_close:
+        return False
+
+    try:
+        response.read(max_size + 1)
+    except Exception:
+        return False
+
+    return response.isclosed()
+
+
+def __getattr__(name):
+
+    if name == "body_redirects":
+        return get_body_redirects()
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if sys.version_info < (3, 7):
+    # Module-level __getattr__ is not supported before Python 3.7
+    body_redirects = get_body_redirects()
 
-body_redirects = coreutils.body_redirects_from_files(config.PATH_BODY_REDIRECTS)
 
 def unshort_url(
     url: typing.Union[str, urllib.parse.ParseResult],
@@ -34,6 +127,8 @@ def unshort_url(
     context: typing.Optional[ssl.SSLContext] = None,
     max_retries:  typing.Optional[int] = None,
     status_retry:  typing.Optional[typing.Iterable[typing.Union[int, http.HTTPStatus]]] = None,
+    pool: typing.Optional[typing.Union[connection_pool.ConnectionPool, bool]] = None,
+    cache: typing.Optional[typing.Union[redirect_cache.RedirectCache, bool]] = None,
     **kwargs: typing.Any
 ):
     """
@@ -92,6 +187,27 @@ def unshort_url(
 
             Only takes effect when max_retries > 0.
 
+        pool (unalix.ConnectionPool | optional):
+            Pool of keep-alive connections to send the requests through. Defaults to a pool shared by all
+            calls, whose limits are set by unalix.config.HTTP_POOL_MAX_CONNECTIONS, unalix.config.HTTP_POOL_MAX_CONNECTIONS_PER_HOST
+            and unalix.config.HTTP_POOL_IDLE_TIMEOUT.
+
+            Pass False to open a new connection for every request. Unless custom headers are given, the
+            "Connection" header is set to "keep-alive" when a pool is used.
+
+        cache (unalix.RedirectCache | optional):
+            Cache of redirects and results to skip requests with. Responses are kept for as long as their
+            Cache-Control and Expires headers allow, and errors (including 4xx responses) for at most
+            unalix.config.HTTP_CACHE_NEGATIVE_TTL seconds. Server errors and responses with a status in `status_retry`
+            are never stored.
+
+            Defaults to a cache shared by all calls if unalix.config.HTTP_CACHE_ENABLED is True, and to no cache
+            otherwise. Pass False to not use a cache. The shared cache is kept in an unalix.SQLiteCacheBackend
+            if unalix.config.HTTP_CACHE_PATH is set.
+
+            Entries are only reused by calls with the same headers, cookie policy and SSL context. The cache is not used
+            with custom cookies, custom cookie policies, or with SSL contexts other than unalix.SSL_CONTEXT_VERIFIED and unalix.SSL_CONTEXT_UNVERIFIED.
+
         **kwargs (optional):
             Optional keyword arguments that unalix.clear_url() takes.
 
@@ -133,6 +249,9 @@ def unshort_url(
         cookies_policy if cookies_policy is not None else cookie_policies.COOKIE_STRICT_ALLOW
     )
 
+    # Redirect URLs are cleaned with the same options on every hop
+    cleaner = url_cleaner.get_cleaner(**kwargs)
+
     total_redirects = 0
     total_retries = 0
 
@@ -157,204 +276,337 @@ def unshort_url(
 
     # SSL context for HTTPS requests
     tls_context = (
-        context if context is not None else ssl_context.SSL_CONTEXT_VERIFIED
+        context if context is not None else ssl_context.get_verified_context()
     )
 
-    while True:
+    # Connections are kept alive between hops (and calls) unless pooling is disabled
+    if pool is None:
+        http_pool = get_connection_pool()
+    elif pool is False:
+        http_pool = None
+    else:
+        http_pool = pool
+
+    if http_pool is not None and headers is None:
+        # unalix.config.HTTP_HEADERS asks servers to close the connection
+        http_headers = dict(http_headers, Connection="keep-alive")
+
+    # Redirects and results are reused from the cache when one is used
+    if cache is None:
+        http_cache = get_redirect_cache() if config.HTTP_CACHE_ENABLED else None
+    elif cache is False:
+        http_cache = None
+    else:
+        http_cache = cache
+
+    resolution = None
+
+    # None for arguments the responses can't be cached for
+    cache_settings = (
+        redirect_cache.request_settings(headers, context, cookies, cookies_policy) if http_cache is not None else None
+    )
 
-        if isinstance(url, types.URL_TYPES):
-            url = types.URL(url.geturl())
-        else:
-            url = types.URL(url)
+    if cache_settings is not None:
+        resolution = redirect_cache.Resolution(
+            cache=http_cache,
+            method=http_method,
+            parse_documents=(parse_documents and http_method != "HEAD"),
+            max_redirects=http_max_redirects,
+            status_retry=http_status_retry,
+            options_key=cleaner.options_key,
+            url=(url.geturl() if isinstance(url, types.URL_TYPES) else url),
+            settings=cache_settings
+        )
 
-        if url.scheme == "http":
-            connection = http.client.HTTPConnection(
-                host=url.netloc,
-                port=url.port,
-                timeout=http_timeout
-            )
-        elif url.scheme == "https":
-            connection = http.client.HTTPSConnection(
-                host=url.netloc,
-                port=url.port,
-                timeout=http_timeout,
-                context=tls_context
-            )
-        else:
-            raise exceptions.UnsupportedProtocolError(
-                message="Unrecognized URI or unsupported protocol",
-                url=url
-            ) from None
+        result = resolution.result()
 
-        # Workaround for making http.client's connection objects compatible with
-        # CookieJar's extract_cookies() and add_cookie_header() methods.
+        if result is not None:
+            return types.URL(result)
 
-        # https://docs.python.org/3/library/urllib.request.html#urllib.request.Request.unverifiable
-        connection.unverifiable = True
+    connection = None
 
-        # https://docs.python.org/3/library/urllib.request.html#urllib.request.Request.has_header
-        connection.has_header = lambda header_name: False
-        
-        # https://docs.python.org/3/library/urllib.request.html#urllib.request.Request.get_full_url
-        connection.get_full_url = lambda: str(url)
+    # Set to False after a kept-alive connection turned out to be closed by the server
+    reuse = True
 
-        # https://docs.python.org/3/library/urllib.request.html#urllib.request.Request.origin_req_host
-        connection.origin_req_host = url.netloc
+    try:
+        while True:
 
-        connection.headers = {}
-        connection.cookies = {}
+            if isinstance(url, types.URL_TYPES):
+                url = types.URL(url.geturl())
+            else:
+                url = types.URL(url)
 
-        # https://docs.python.org/3/library/urllib.request.html#urllib.request.Request.add_unredirected_header
-        add_unredirected_header = lambda key, value: connection.headers.update({key: value})
-        connection.add_unredirected_header = add_unredirected_header
+            if url.scheme not in ("http", "https"):
+                raise exceptions.UnsupportedProtocolError(
+                    message="Unrecognized URI or unsupported protocol",
+                    url=url
+                ) from None
 
-        cookie_jar.add_cookie_header(connection)
+            if resolution is not None:
+                hop = resolution.lookup(url)
 
-        # Merge headers added by cookie_jar.add_cookie_header() with default headers
-        connection_headers = dict(http_headers)
-        connection_headers.update(connection.headers)
+                # Skip ahead to the end of the cached part of the chain
+                if hop is not None:
+                    kind, location = hop
 
-        uri = f"{url.path}?{url.query}" if url.query else url.path
+                    if kind == "final":
+                        resolution.store_result(url, total_redirects)
+                        return url
 
-        try:
-            connection.request(
-                method=http_method,
-                url=uri,
-                headers=connection_headers
-            )
-            response = connection.getresponse()
-        except Exception as exception:
-            connection.close()
-            
-            # Retry based on connection error
-            if http_max_retries > 0:
-                total_retries += 1
+                    total_redirects += 1
 
-                if total_retries > http_max_retries:
-                    raise exceptions.MaxRetriesError(
-                        message="Exceeded maximum allowed retries",
+                    # Strip tracking fields from the redirect URL
+                    url = cleaner.clear(location)
+
+                    if total_redirects > http_max_redirects:
+                        raise exceptions.TooManyRedirectsError(
+                            message="Exceeded maximum allowed redirects",
+                            url=url
+                        ) from None
+
+                    continue
+
+            if http_pool is None:
+                reused = False
+
+                if url.scheme == "http":
+                    connection = http.client.HTTPConnection(
+                        host=url.netloc,
+                        port=url.port,
+                        timeout=http_timeout
+                    )
+                else:
+                    connection = http.client.HTTPSConnection(
+                        host=url.netloc,
+                        port=url.port,
+                        timeout=http_timeout,
+                        context=tls_context
+                    )
+            else:
+                try:
+                    connection, reused = http_pool.acquire(
+                        scheme=url.scheme,
+                        host=url.netloc,
+                        port=url.port,
+                        timeout=http_timeout,
+                        context=tls_context,
+                        reuse=reuse
+                    )
+                except TimeoutError as exception:
+                    raise exceptions.ConnectError(
+                        message="Timed out waiting for a connection from the pool",
                         url=url
                     ) from exception
 
-                continue
+            reuse = True
 
-            raise exceptions.ConnectError(
-                message="Connection error",
-                url=url
-            ) from exception
-        else:
-            # Retry based on status code
-            if http_max_retries > 0 and response.code in http_status_retry:
-                retry_after = response.headers.get("Retry-After")
-                if retry_after is not None:
-                    if retry_after.isnumeric():
-                        time.sleep(int(retry_after))
-                    else:
-                        http_date = datetime.datetime.strptime(retry_after, "%a, %d %b %Y %H:%M:%S GMT")
-                        time.sleep(int(http_date.timestamp()) - int(time.time()))
-                
-                total_retries += 1
-                
-                if total_retries > http_max_retries:
-                    raise exceptions.MaxRetriesError(
-                        message="Exceeded maximum allowed retries",
-                        url=url
-                    ) from None
+            # Workaround for making http.client's connection objects compatible with
+            # CookieJar's extract_cookies() and add_cookie_header() methods.
 
-                continue
+            # https://docs.python.org/3/library/urllib.request.html#urllib.request.Request.unverifiable
+            connection.unverifiable = True
 
-        # Extract cookies from response
-        cookie_jar.extract_cookies(
-            response=response, request=connection)
+            # https://docs.python.org/3/library/urllib.request.html#urllib.request.Request.has_header
+            connection.has_header = lambda header_name: False
+            
+            # https://docs.python.org/3/library/urllib.request.html#urllib.request.Request.get_full_url
+            connection.get_full_url = lambda: str(url)
 
-        if response.status in config.http.HTTP_STATUS_REDIRECT:
-            # Handle HTTP redirects
-            redirect_location = response.headers.get("Location")
-            assert redirect_location is not None
-        else:
-            # If there is no "Location", we will look for "Content-Location"
-            redirect_location = response.headers.get("Content-Location")
+            # https://docs.python.org/3/library/urllib.request.html#urllib.request.Request.origin_req_host
+            connection.origin_req_host = url.netloc
 
-        if redirect_location is not None:
-            # https://stackoverflow.com/a/27357138
-            utils.requote_uri(
-                redirect_location.encode(encoding="latin1").decode(encoding='utf-8')
-            )
+            connection.headers = {}
+            connection.cookies = {}
 
-            if not redirect_location.startswith(("http://", "https://")):
-                if redirect_location.startswith("//"):
-                    # new url
-                    redirect_location = urllib.parse.urlunparse((url.scheme, redirect_location.lstrip("/"), "", "", "", ""))
-                elif redirect_location.startswith("/"):
-                    # full path
-                    redirect_location = urllib.parse.urlunparse((url.scheme, (url.netloc if url.port in (80, 443) else f"{url.netloc}:{url.port}") , redirect_location, "", "", ""))
-                else:
-                    # relative path
-                    path = os.path.join(os.path.dirname(url.path), redirect_location)
-                    redirect_location = urllib.parse.urlunparse((url.scheme, (url.netloc if url.port in (80, 443) else f"{url.netloc}:{url.port}"), path, "", "", ""))
+            # https://docs.python.org/3/library/urllib.request.html#urllib.request.Request.add_unredirected_header
+            add_unredirected_header = lambda key, value: connection.headers.update({key: value})
+            connection.add_unredirected_header = add_unredirected_header
+
+            cookie_jar.add_cookie_header(connection)
 
-            # Avoid redirect loops
-            if redirect_location == url:
-                return url
+            # Merge headers added by cookie_jar.add_cookie_header() with default headers
+            connection_headers = dict(http_headers)
+            connection_headers.update(connection.headers)
 
-            total_redirects += 1
+            uri = f"{url.path}?{url.query}" if url.query else url.path
 
-            # Strip tracking fields from the redirect URL
-            url = url_cleaner.clear_url(url=redirect_location, **kwargs)
+            try:
+                connection.request(
+                    method=http_method,
+                    url=uri,
+                    headers=connection_headers
+                )
+                response = connection.getresponse()
+            except Exception as exception:
+                release_connection(http_pool, connection)
+                connection = None
+
+                # The server closed a kept-alive connection; this doesn't count as a retry
+                if reused and http_method in connection_pool.IDEMPOTENT_METHODS and isinstance(exception, connection_pool.STALE_CONNECTION_ERRORS):
+                    reuse = False
+                    continue
 
-            # Response body is ignored in redirects
-            connection.close()
+                # Retry based on connection error
+                if http_max_retries > 0:
+                    total_retries += 1
 
-            if total_redirects > http_max_redirects:
-                raise exceptions.TooManyRedirectsError(
-                    message="Exceeded maximum allowed redirects",
-                    url=url
-                ) from None
+                    if total_retries > http_max_retries:
+                        raise exceptions.MaxRetriesError(
+                            message="Exceeded maximum allowed retries",
+                            url=url
+                        ) from exception
 
-            continue
+                    continue
 
-        if parse_documents and http_method != "HEAD":
-            content = response.read(max_fetch_size)
+                raise exceptions.ConnectError(
+                    message="Connection error",
+                    url=url
+                ) from exception
+            else:
+                # Retry based on status code
+                if http_max_retries > 0 and response.code in http_status_retry:
+                    release_connection(http_pool, connection, drain_response(response, http_max_fetch))
+                    connection = None
+
+                    retry_after = response.headers.get("Retry-After")
+                    if retry_after is not None:
+                        if retry_after.isnumeric():
+                            time.sleep(int(retry_after))
+                        else:
+                            http_date = datetime.datetime.strptime(retry_after, "%a, %d %b %Y %H:%M:%S GMT")
+                            time.sleep(int(http_date.timestamp()) - int(time.time()))
+                    
+                    total_retries += 1
+                    
+                    if total_retries > http_max_retries:
+                        raise exceptions.MaxRetriesError(
+                            message="Exceeded maximum allowed retries",
+                            url=url
+                        ) from None
 
-            # Close connection after reading response body
-            connection.close()
+                    continue
 
-            # Get encoding from Content-Type header
-            encoding = utils.get_encoding_from_headers(response.headers)
+            # Extract cookies from response
+            cookie_jar.extract_cookies(
+                response=response, request=connection)
 
-            # Try to decode the response body using the value returned by "get_encoding_from_headers" or "utf-8" as encoding
-            decoded_content = content.decode(encoding=(encoding or "utf-8"), errors="ignore")
+            if response.status in config.http.HTTP_STATUS_REDIRECT:
+                # Handle HTTP redirects
+                redirect_location = response.headers.get("Location")
+                assert redirect_location is not None
+            else:
+                # If there is no "Location", we will look for "Content-Location"
+                redirect_location = response.headers.get("Content-Location")
 
-            for ruleset in body_redirects.iter():
+            if redirect_location is not None:
+                # https://stackoverflow.com/a/27357138
+                utils.requote_uri(
+                    redirect_location.encode(encoding="latin1").decode(encoding='utf-8')
+                )
 
-                if (ruleset.urlPattern is not None and ruleset.urlPattern.compiled.match(url) or url.netloc in ruleset.domains):
-                    for rule in ruleset.rules.iter():
-                        results = rule.compiled.search(decoded_content)
-                        if isinstance(results, typing.Match):
-                            break
+                if not redirect_location.startswith(("http://", "https://")):
+                    if redirect_location.startswith("//"):
+                        # new url
+                        redirect_location = urllib.parse.urlunparse((url.scheme, redirect_location.lstrip("/"), "", "", "", ""))
+                    elif redirect_location.startswith("/"):
+                        # full path
+                        redirect_location = urllib.parse.urlunparse((url.scheme, (url.netloc if url.port in (80, 443) else f"{url.netloc}:{url.port}") , redirect_location, "", "", ""))
                     else:
-                        continue
+                        # relative path
+                        path = os.path.join(os.path.dirname(url.path), redirect_location)
+                        redirect_location = urllib.parse.urlunparse((url.scheme, (url.netloc if url.port in (80, 443) else f"{url.netloc}:{url.port}"), path, "", "", ""))
 
-                    # Strip tracking fields from the extracted URL
-                    url = url_cleaner.clear_url(url=utils.requote_uri(html.unescape(results.group(1))), **kwargs)
+                if resolution is not None and redirect_location != url:
+                    resolution.store_redirect(url, redirect_location, response.status, response.headers)
 
-                    total_redirects += 1
+                # Response body is ignored in redirects
+                release_connection(http_pool, connection, drain_response(response, http_max_fetch))
+                connection = None
 
-                    if total_redirects > http_max_redirects:
-                        raise exceptions.TooManyRedirectsError(
-                            message="Exceeded maximum allowed redirects",
-                            url=url
-                        ) from None
+                # Avoid redirect loops
+                if redirect_location == url:
+                    return url
 
-                    break
+                total_redirects += 1
+
+                # Strip tracking fields from the redirect URL
+                url = cleaner.clear(redirect_location)
+
+                if total_redirects > http_max_redirects:
+                    raise exceptions.TooManyRedirectsError(
+                        message="Exceeded maximum allowed redirects",
+                        url=url
+                    ) from None
+
+                continue
+
+            if parse_documents and http_method != "HEAD":
+                content = response.read(http_max_fetch)
+
+                # Release connection after reading response body
+                release_connection(http_pool, connection, drain_response(response, 0))
+                connection = None
+
+                # Get encoding from Content-Type header
+                encoding = utils.get_encoding_from_headers(response.headers)
+
+                # Try to decode the response body using the value returned by "get_encoding_from_headers" or "utf-8" as encoding
+                decoded_content = content.decode(encoding=(encoding or "utf-8"), errors="ignore")
+
+                for ruleset in get_body_redirects().iter():
+
+                    if (ruleset.urlPattern is not None and ruleset.urlPattern.compiled.match(url) or ruleset.domains.match(url.netloc)):
+                        for rule in ruleset.rules.iter():
+                            results = rule.compiled.search(decoded_content)
+                            if isinstance(results, typing.Match):
+                                break
+                        else:
+                            continue
+
+                        location = utils.requote_uri(html.unescape(results.group(1)))
+
+                        if resolution is not None:
+                            resolution.store_redirect(url, location, response.status, response.headers, document=True)
+
+                        # Strip tracking fields from the extracted URL
+                        url = cleaner.clear(location)
+
+                        total_redirects += 1
+
+                        if total_redirects > http_max_redirects:
+                            raise exceptions.TooManyRedirectsError(
+                                message="Exceeded maximum allowed redirects",
+                                url=url
+                            ) from None
+
+                        break
+                else:
+                    if resolution is not None:
+                        resolution.store_final(url, response.status, response.headers, total_redirects)
+
+                    return url
+                
+                continue
             else:
-                return url
-            
-            continue
-        else:
-            connection.close()
+                release_connection(http_pool, connection, drain_response(response, http_max_fetch))
+                connection = None
+
+            if resolution is not None:
+                resolution.store_final(url, response.status, response.headers, total_redirects)
 
-        return url
+            return url
+    except exceptions.ConnectError as exception:
+        if resolution is not None:
+            resolution.store_error(exception)
+
+        raise
+    finally:
+        # Connections are never left open when an exception is raised
+        if connection is not None:
+            release_connection(http_pool, connection)
+
+        if resolution is not None:
+            resolution.flush()
 
 
 async def aunshort_url(
@@ -369,6 +621,8 @@ async def aunshort_url(
     context: typing.Optional[ssl.SSLContext] = None,
     max_retries:  typing.Optional[int] = None,
     status_retry:  typing.Optional[typing.Iterable[typing.Union[int, http.HTTPStatus]]] = None,
+    pool: typing.Optional[async_http.AsyncConnectionPool] = None,
+    cache: typing.Optional[typing.Union[redirect_cache.RedirectCache, bool]] = None,
     **kwargs: typing.Any
 ):
     """
@@ -418,6 +672,25 @@ async def aunshort_url(
 
             Only takes effect when max_retries > 0.
 
+        pool (unalix.AsyncConnectionPool | optional):
+            Pool of keep-alive connections to send the requests through. It must belong to the running event loop.
+
+            By default, connections are only kept alive between the redirects of this call, and all of them are closed
+            before it returns. Unless custom headers are given, the "Connection" header is set to "keep-alive".
+
+        cache (unalix.RedirectCache | optional):
+            Cache of redirects and results to skip requests with. Responses are kept for as long as their
+            Cache-Control and Expires headers allow, and errors (including 4xx responses) for at most
+            unalix.config.HTTP_CACHE_NEGATIVE_TTL seconds. Server errors and responses with a status in `status_retry`
+            are never stored.
+
+            Defaults to a cache shared by all calls if unalix.config.HTTP_CACHE_ENABLED is True, and to no cache
+            otherwise. Pass False to not use a cache. The shared cache is kept in an unalix.SQLiteCacheBackend
+            if unalix.config.HTTP_CACHE_PATH is set.
+
+            Entries are only reused by calls with the same headers and SSL context. The cache is not used with
+            SSL contexts other than unalix.SSL_CONTEXT_VERIFIED and unalix.SSL_CONTEXT_UNVERIFIED.
+
         **kwargs (optional):
             Optional keyword arguments that unalix.clear_url() takes.
 
@@ -463,6 +736,9 @@ async def aunshort_url(
             'https://bitly.com/pages/pricing'
     """
 
+    # Redirect URLs are cleaned with the same options on every hop
+    cleaner = url_cleaner.get_cleaner(**kwargs)
+
     total_redirects = 0
     total_retries = 0
 
@@ -489,113 +765,161 @@ async def aunshort_url(
 
     # SSL context for HTTPS requests
     tls_context = (
-        context if context is not None else ssl_context.SSL_CONTEXT_VERIFIED
+        context if context is not None else ssl_context.get_verified_context()
     )
 
     parse_documents = (
         parse_documents and http_method != "HEAD"
     )
 
-    while True:
+    # Connections are kept alive between hops; without a pool, they are closed before returning
+    http_pool = (
+        pool if pool is not None else async_http.AsyncConnectionPool()
+    )
 
-        if isinstance(url, types.URL_TYPES):
-            url = types.URL(url.geturl())
-        else:
-            url = types.URL(url)
+    if headers is None:
+        # unalix.config.HTTP_HEADERS asks servers to close the connection
+        http_headers = dict(http_headers, Connection="keep-alive")
 
-        if url.scheme == "http":
-            future = asyncio.open_connection(
-                host=url.netloc,
-                port=url.port
-            )
-        elif url.scheme == "https":
-            future = asyncio.open_connection(
-                host=url.netloc,
-                port=url.port,
-                ssl=tls_context,
-                ssl_handshake_timeout=ssl_handshake_timeout
-            )
-        else:
-            raise exceptions.UnsupportedProtocolError(
-                message="Unrecognized URI or unsupported protocol",
-                url=url
-            ) from None
+    # Redirects and results are reused from the cache when one is used
+    if cache is None:
+        http_cache = get_redirect_cache() if config.HTTP_CACHE_ENABLED else None
+    elif cache is False:
+        http_cache = None
+    else:
+        http_cache = cache
 
-        reader, writer = None, None
+    resolution = None
 
-        try:
-            reader, writer = await asyncio.wait_for(fut=future, timeout=http_timeout)
+    # None for arguments the responses can't be cached for
+    cache_settings = (
+        redirect_cache.request_settings(headers, context, None, None) if http_cache is not None else None
+    )
 
-            raw_request = (
-                f"{http_method} {f'{url.path}?{url.query}' if url.query else (url.path if url.path else '/')} HTTP/1.0\n" +
-                f"Host: {url.netloc}\n"
-            )
+    if cache_settings is not None:
+        resolution = redirect_cache.Resolution(
+            cache=http_cache,
+            method=http_method,
+            parse_documents=(parse_documents and http_method != "HEAD"),
+            max_redirects=http_max_redirects,
+            status_retry=http_status_retry,
+            options_key=cleaner.options_key,
+            url=(url.geturl() if isinstance(url, types.URL_TYPES) else url),
+            settings=cache_settings
+        )
+
+        result = resolution.result()
+
+        if result is not None:
+            return types.URL(result)
+
+    connection = None
+
+    # Set to False after a kept-alive connection turned out to be closed by the server
+    reuse = True
+
+    try:
+        while True:
+
+            if isinstance(url, types.URL_TYPES):
+                url = types.URL(url.geturl())
+            else:
+                url = types.URL(url)
+
+            if url.scheme not in ("http", "https"):
+                raise exceptions.UnsupportedProtocolError(
+                    message="Unrecognized URI or unsupported protocol",
+                    url=url
+                ) from None
+
+            if resolution is not None:
+                hop = resolution.lookup(url)
+
+                # Skip ahead to the end of the cached part of the chain
+                if hop is not None:
+                    kind, location = hop
+
+                    if kind == "final":
+                        resolution.store_result(url, total_redirects)
+                        return url
+
+                    total_redirects += 1
 
-            for key, value in http_headers.items():
-                raw_request += f"{key}: {value}\n"
-            raw_request += "\n"
+                    # Strip tracking fields from the redirect URL
+                    url = cleaner.clear(location)
 
-            writer.write(
-                data=raw_request.encode(encoding="latin-1")
+                    if total_redirects > http_max_redirects:
+                        raise exceptions.TooManyRedirectsError(
+                            message="Exceeded maximum allowed redirects",
+                            url=url
+                        ) from None
+
+                    continue
+
+            request_headers = merge_headers(
+                {"Host": url.netloc if url.port in (80, 443) else f"{url.netloc}:{url.port}"},
+                http_headers
             )
 
-            if parse_documents:
-                received_data = await asyncio.wait_for(
-                    fut=reader.read(n=http_max_fetch),
-                    timeout=http_timeout
+            target = f"{url.path}?{url.query}" if url.query else (url.path if url.path else "/")
+
+            reused = False
+
+            try:
+                connection, reused = await http_pool.acquire(
+                    scheme=url.scheme,
+                    host=url.netloc,
+                    port=url.port,
+                    timeout=http_timeout,
+                    context=tls_context,
+                    ssl_handshake_timeout=ssl_handshake_timeout,
+                    reuse=reuse
                 )
 
-                parts = received_data.decode(encoding="latin-1").split(sep="\r\n\r\n", maxsplit=1)
+                reuse = True
 
-                if len(parts) < 2:
-                    headers, body = parts[0], ""
-                else:
-                    headers, body = parts
-            else:
-                received_data = await asyncio.wait_for(
-                    fut=reader.readuntil(separator=b"\r\n\r\n"),
+                response, reusable = await asyncio.wait_for(
+                    fut=connection.request(
+                        method=http_method,
+                        target=target,
+                        headers=request_headers,
+                        max_fetch_size=http_max_fetch
+                    ),
                     timeout=http_timeout
                 )
+            except asyncio.CancelledError:
+                # An Exception subclass before Python 3.8
+                raise
+            except Exception as exception:
+                if connection is not None:
+                    await http_pool.release(connection)
+                    connection = None
+
+                # The server closed a kept-alive connection; this doesn't count as a retry
+                if reused and http_method in connection_pool.IDEMPOTENT_METHODS and isinstance(exception, async_http.STALE_CONNECTION_ERRORS):
+                    reuse = False
+                    continue
 
-                headers, body = received_data.decode(encoding="latin-1").strip(), ""
+                # Retry based on connection error
+                if http_max_retries > 0:
+                    total_retries += 1
 
-            headers_d = {}
+                    if total_retries > http_max_retries:
+                        raise exceptions.MaxRetriesError(
+                            message="Exceeded maximum allowed retries",
+                            url=url
+                        ) from exception
 
-            for index, header in enumerate(headers.split(sep="\r\n")):
-                if index == 0:
-                    http_version, status_code, status_message = header.split(sep=" ", maxsplit=2)
                     continue
-                key, value = header.split(sep=": ", maxsplit=1)
-                headers_d[key] = value
-
-            response = types.Response(
-                http_version=float(http_version.split(sep="/")[1]),
-                status_code=int(status_code),
-                status_message=status_message,
-                headers=headers_d,
-                body=body
-            )
-        except Exception as exception:
-            if writer is not None:
-                writer.close()
-
-            # Retry based on connection error
-            if http_max_retries > 0:
-                total_retries += 1
 
-                if total_retries > http_max_retries:
-                    raise exceptions.MaxRetriesError(
-                        message="Exceeded maximum allowed retries",
-                        url=url
-                    ) from exception
+                raise exceptions.ConnectError(
+                    message="Connection error",
+                    url=url
+                ) from exception
 
-                continue
+            await http_pool.release(connection, reusable=reusable)
+            connection = None
 
-            raise exceptions.ConnectError(
-                message="Connection error",
-                url=url
-            ) from exception
-        else:
             # Retry based on status code
             if http_max_retries > 0 and response.status_code in http_status_retry:
                 retry_after = response.headers.get("Retry-After")
@@ -616,75 +940,416 @@ async def aunshort_url(
 
                 continue
 
-        if response.status_code in config.http.HTTP_STATUS_REDIRECT:
-            # Handle HTTP redirects
-            redirect_location = response.headers.get("Location") or response.headers.get("location")
-            assert redirect_location is not None
-        else:
-            # If there is no "Location", we will look for "Content-Location"
-            redirect_location = response.headers.get("Content-Location") or response.headers.get("content-location")
+            if response.status_code in config.http.HTTP_STATUS_REDIRECT:
+                # Handle HTTP redirects
+                redirect_location = response.headers.get("Location")
+                assert redirect_location is not None
+            else:
+                # If there is no "Location", we will look for "Content-Location"
+                redirect_location = response.headers.get("Content-Location")
 
-        if redirect_location is not None:
-            # https://stackoverflow.com/a/27357138
-            utils.requote_uri(
-                redirect_location.encode(encoding="latin1").decode(encoding='utf-8')
-            )
+            if redirect_location is not None:
+                # https://stackoverflow.com/a/27357138
+                utils.requote_uri(
+                    redirect_location.encode(encoding="latin1").decode(encoding='utf-8')
+                )
+
+                if not redirect_location.startswith(("http://", "https://")):
+                    if redirect_location.startswith("//"):
+                        # new url
+                        redirect_location = urllib.parse.urlunparse((url.scheme, redirect_location.lstrip("/"), "", "", "", ""))
+                    elif redirect_location.startswith("/"):
+                        # full path
+                        redirect_location = urllib.parse.urlunparse((url.scheme, (url.netloc if url.port in (80, 443) else f"{url.netloc}:{url.port}") , redirect_location, "", "", ""))
+                    else:
+                        # relative path
+                        path = os.path.join(os.path.dirname(url.path), redirect_location)
+                        redirect_location = urllib.parse.urlunparse((url.scheme, (url.netloc if url.port in (80, 443) else f"{url.netloc}:{url.port}"), path, "", "", ""))
+
+                if resolution is not None and redirect_location != url:
+                    resolution.store_redirect(url, redirect_location, response.status_code, response.headers)
 
-            if not redirect_location.startswith(("http://", "https://")):
-                if redirect_location.startswith("//"):
-                    # new url
-                    redirect_location = urllib.parse.urlunparse((url.scheme, redirect_location.lstrip("/"), "", "", "", ""))
-                elif redirect_location.startswith("/"):
-                    # full path
-                    redirect_location = urllib.parse.urlunparse((url.scheme, (url.netloc if url.port in (80, 443) else f"{url.netloc}:{url.port}") , redirect_location, "", "", ""))
+                # Avoid redirect loops
+                if redirect_location == url:
+                    return url
+
+                total_redirects += 1
+
+                # Strip tracking fields from the redirect URL
+                url = cleaner.clear(redirect_location)
+
+                if total_redirects > http_max_redirects:
+                    raise exceptions.TooManyRedirectsError(
+                        message="Exceeded maximum allowed redirects",
+                        url=url
+                    ) from None
+
+                continue
+
+            if parse_documents:
+                # Get encoding from Content-Type header
+                encoding = utils.get_encoding_from_headers(response.headers)
+
+                # Try to decode the response body using the value returned by "get_encoding_from_headers" or "utf-8" as encoding
+                decoded_content = response.body.decode(encoding=(encoding or "utf-8"), errors="ignore")
+
+                for ruleset in get_body_redirects().iter():
+
+                    if (ruleset.urlPattern is not None and ruleset.urlPattern.compiled.match(url) or ruleset.domains.match(url.netloc)):
+                        for rule in ruleset.rules.iter():
+                            results = rule.compiled.search(decoded_content)
+                            if isinstance(results, typing.Match):
+                                break
+                        else:
+                            continue
+
+                        location = utils.requote_uri(html.unescape(results.group(1)))
+
+                        if resolution is not None:
+                            resolution.store_redirect(url, location, response.status_code, response.headers, document=True)
+
+                        # Strip tracking fields from the extracted URL
+                        url = cleaner.clear(location)
+
+                        total_redirects += 1
+
+                        if total_redirects > http_max_redirects:
+                            raise exceptions.TooManyRedirectsError(
+                                message="Exceeded maximum allowed redirects",
+                                url=url
+                            ) from None
+
+                        break
                 else:
-                    # relative path
-                    path = os.path.join(os.path.dirname(url.path), redirect_location)
-                    redirect_location = urllib.parse.urlunparse((url.scheme, (url.netloc if url.port in (80, 443) else f"{url.netloc}:{url.port}"), path, "", "", ""))
+                    if resolution is not None:
+                        resolution.store_final(url, response.status_code, response.headers, total_redirects)
+
+                    return url
+                
+                continue
 
-            # Avoid redirect loops
-            if redirect_location == url:
-                return url
+            if resolution is not None:
+                resolution.store_final(url, response.status_code, response.headers, total_redirects)
 
-            total_redirects += 1
+            return url
+    except exceptions.ConnectError as exception:
+        if resolution is not None:
+            resolution.store_error(exception)
 
-            # Strip tracking fields from the redirect URL
-            url = url_cleaner.clear_url(url=redirect_location, **kwargs)
+        raise
+    finally:
+        # Sockets are closed before returning, even when an exception is raised
+        if connection is not None:
+            await http_pool.release(connection)
 
-            if total_redirects > http_max_redirects:
-                raise exceptions.TooManyRedirectsError(
-                    message="Exceeded maximum allowed redirects",
-                    url=url
-                ) from None
+        if pool is None:
+            await http_pool.aclose()
 
-            continue
+        if resolution is not None and resolution.pending:
+            if http_cache.backend.blocking:
+                await asyncio.get_event_loop().run_in_executor(None, resolution.flush)
+            else:
+                resolution.flush()
 
-        if parse_documents:
-            for ruleset in body_redirects.iter():
 
-                if (ruleset.urlPattern is not None and ruleset.urlPattern.compiled.match(url) or url.netloc in ruleset.domains):
-                    for rule in ruleset.rules.iter():
-                        results = rule.compiled.search(response.body)
-                        if isinstance(results, typing.Match):
-                            break
-                    else:
-                        continue
+def get_host(url: typing.Union[str, urllib.parse.ParseResult]) -> str:
+    """
+    Return the host that per-host limits apply to, or an empty string for invalid URLs.
+    """
 
-                    # Strip tracking fields from the extracted URL
-                    url = url_cleaner.clear_url(url=utils.requote_uri(html.unescape(results.group(1))), **kwargs)
+    try:
+        return urllib.parse.urlsplit(url if isinstance(url, str) else url.geturl()).netloc.lower()
+    except (ValueError, AttributeError):
+        return ""
 
-                    total_redirects += 1
 
-                    if total_redirects > http_max_redirects:
-                        raise exceptions.TooManyRedirectsError(
-                            message="Exceeded maximum allowed redirects",
-                            url=url
-                        ) from None
+def unshort_urls(
+    urls: typing.Iterable[typing.Union[str, urllib.parse.ParseResult]],
+    concurrency: typing.Optional[int] = None,
+    per_host: typing.Optional[int] = None,
+    ordered: typing.Optional[bool] = False,
+    pool: typing.Optional[connection_pool.ConnectionPool] = None,
+    **kwargs: typing.Any
+) -> typing.Iterator[typing.Tuple[typing.Any, typing.Union[str, Exception]]]:
+    """
+    Unshort the given URLs with unshort_url() in a pool of threads, and yield (url, result) pairs, where result
+    is the unshortened URL or the exception raised while resolving it.
+
+    Parameters:
+
+        urls (typing.Iterable):
+            Any iterable of URLs, including lazy ones. It's only consumed a few URLs ahead of the results.
+
+        concurrency (int | optional):
+            Max number of URLs to resolve at the same time, which is also the max number of open sockets.
+            Defaults to unalix.config.HTTP_MAX_CONCURRENCY.
+
+        per_host (int | optional):
+            Max number of URLs of the same host to resolve at the same time. Defaults to unalix.config.HTTP_MAX_CONCURRENCY_PER_HOST.
 
+            URLs of a busy host wait without blocking the URLs of other hosts.
+
+        ordered (bool | optional):
+            Pass True to get the results in the order of the URLs. By default, they are yielded as they complete.
+
+        pool (unalix.ConnectionPool | optional):
+            Pool of keep-alive connections to send the requests through. By default, a pool limited to `concurrency`
+            connections is used and closed once all URLs are resolved.
+
+        **kwargs (optional):
+            Optional keyword arguments that unalix.unshort_url() takes.
+
+    Usage example:
+
+        >>> import unalix
+        >>>
+        >>> urls = ["https://bitly.is/Pricing-Pop-Up"]
+        >>>
+        >>> for url, result in unalix.unshort_urls(urls, concurrency=32, per_host=4):
+        ...     print(url, result)
+        ...
+        https://bitly.is/Pricing-Pop-Up https://bitly.com/pages/pricing
+    """
+
+    concurrency = concurrency if concurrency is not None else config.HTTP_MAX_CONCURRENCY
+    per_host = per_host if per_host is not None else config.HTTP_MAX_CONCURRENCY_PER_HOST
+
+    # URLs read but not yielded yet (running, waiting for their host or waiting for earlier results)
+    window = concurrency * 4
+
+    http_pool = (
+        pool if pool is not None else connection_pool.ConnectionPool(max_connections=concurrency, max_connections_per_host=concurrency)
+    )
+
+    iterator = iter(urls)
+    exhausted = False
+
+    total = 0
+    yielded = 0
+
+    # future -> (index, url, host)
+    futures = {}
+
+    # host -> number of its URLs being resolved
+    running = {}
+
+    # host -> deque of (index, url) waiting for the host to have room
+    waiting = {}
+
+    # index -> (url, result), for results completed before the earlier ones
+    completed = {}
+
+    def submit(index: int, url: typing.Any, host: str) -> None:
+        futures[executor.submit(unshort_url, url, pool=http_pool, **kwargs)] = (index, url, host)
+        running[host] = running.get(host, 0) + 1
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=concurrency)
+
+    try:
+        while True:
+            for host in list(waiting):
+                queue = waiting[host]
+
+                while queue and len(futures) < concurrency and running.get(host, 0) < per_host:
+                    submit(*queue.popleft(), host)
+
+                if not queue:
+                    del waiting[host]
+
+            while not exhausted and len(futures) < concurrency and total - yielded < window:
+                try:
+                    url = next(iterator)
+                except StopIteration:
+                    exhausted = True
                     break
+
+                host = get_host(url)
+
+                if running.get(host, 0) < per_host:
+                    submit(total, url, host)
+                else:
+                    waiting.setdefault(host, collections.deque()).append((total, url))
+
+                total += 1
+
+            if not futures:
+                break
+
+            done, not_done = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+
+            for future in done:
+                index, url, host = futures.pop(future)
+
+                running[host] -= 1
+
+                if not running[host]:
+                    del running[host]
+
+                exception = future.exception()
+                result = exception if exception is not None else future.result()
+
+                if ordered:
+                    completed[index] = (url, result)
+                    continue
+
+                yielded += 1
+                yield (url, result)
+
+            while yielded in completed:
+                yielded += 1
+                yield completed.pop(yielded - 1)
+    finally:
+        # URLs that didn't start yet are dropped when the generator is closed early
+        for future in futures:
+            future.cancel()
+
+        executor.shutdown(wait=True)
+
+        if pool is None:
+            http_pool.close()
+
+
+async def aunshort_urls(
+    urls: typing.Union[typing.Iterable[typing.Union[str, urllib.parse.ParseResult]], typing.AsyncIterable[typing.Union[str, urllib.parse.ParseResult]]],
+    concurrency: typing.Optional[int] = None,
+    per_host: typing.Optional[int] = None,
+    ordered: typing.Optional[bool] = False,
+    pool: typing.Optional[async_http.AsyncConnectionPool] = None,
+    **kwargs: typing.Any
+) -> typing.AsyncIterator[typing.Tuple[typing.Any, typing.Union[str, Exception]]]:
+    """
+    Unshort the given URLs with aunshort_url(), and yield (url, result) pairs, where result is the unshortened URL
+    or the exception raised while resolving it.
+
+    Takes the same parameters as unalix.unshort_urls(), except that `urls` can also be an async iterable and `pool`
+    is an unalix.AsyncConnectionPool of the running event loop.
+
+    Usage example:
+
+        >>> import asyncio
+        >>>
+        >>> import unalix
+        >>>
+        >>> async def main(urls):
+        ...     async for url, result in unalix.aunshort_urls(urls, concurrency=64, per_host=4):
+        ...         print(url, result)
+        ...
+        >>> asyncio.get_event_loop().run_until_complete(main(["https://bitly.is/Pricing-Pop-Up"]))
+        https://bitly.is/Pricing-Pop-Up https://bitly.com/pages/pricing
+    """
+
+    concurrency = concurrency if concurrency is not None else config.HTTP_MAX_CONCURRENCY
+    per_host = per_host if per_host is not None else config.HTTP_MAX_CONCURRENCY_PER_HOST
+
+    http_pool = (
+        pool if pool is not None else async_http.AsyncConnectionPool(max_connections=concurrency, max_connections_per_host=concurrency)
+    )
+
+    # URLs read but not yielded yet; the producer waits for a slot before reading the next one
+    window = asyncio.Semaphore(concurrency * 4)
+
+    # URLs being resolved
+    slots = asyncio.Semaphore(concurrency)
+
+    # host -> [semaphore, number of its URLs started or waiting]
+    hosts = {}
+
+    # (index, url, result) of completed URLs, and (None, total, exception) once all URLs were read;
+    # never holds more items than the window allows
+    results = asyncio.Queue()
+
+    tasks = set()
+
+    async def resolve(index: int, url: typing.Any) -> None:
+
+        host = get_host(url)
+
+        if host not in hosts:
+            hosts[host] = [asyncio.Semaphore(per_host), 0]
+
+        hosts[host][1] += 1
+
+        try:
+            async with hosts[host][0]:
+                async with slots:
+                    result = await aunshort_url(url, pool=http_pool, **kwargs)
+        except asyncio.CancelledError:
+            # An Exception subclass before Python 3.8; cancelled URLs are not results
+            raise
+        except Exception as exception:
+            result = exception
+        finally:
+            hosts[host][1] -= 1
+
+            if not hosts[host][1]:
+                del hosts[host]
+
+        results.put_nowait((index, url, result))
+
+    async def produce() -> None:
+
+        total = 0
+
+        def start(url: typing.Any) -> None:
+            task = asyncio.ensure_future(resolve(total, url))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        try:
+            if hasattr(urls, "__aiter__"):
+                async for url in urls:
+                    await window.acquire()
+                    start(url)
+                    total += 1
             else:
-                return url
-            
-            continue
-        
-        return url
+                for url in urls:
+                    await window.acquire()
+                    start(url)
+                    total += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as exception:
+            results.put_nowait((None, total, exception))
+        else:
+            results.put_nowait((None, total, None))
+
+    producer = asyncio.ensure_future(produce())
+
+    total = None
+    yielded = 0
+
+    # index -> (url, result), for results completed before the earlier ones
+    completed = {}
+
+    try:
+        while total is None or yielded < total:
+            index, url, result = await results.get()
+
+            if index is None:
+                if result is not None:
+                    raise result
+
+                total = url
+                continue
+
+            if ordered:
+                completed[index] = (url, result)
+
+                while yielded in completed:
+                    yielded += 1
+                    window.release()
+                    yield completed.pop(yielded - 1)
+            else:
+                yielded += 1
+                window.release()
+                yield (url, result)
+    finally:
+        producer.cancel()
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(producer, *tasks, return_exceptions=True)
+
+        if pool is None:
+            await http_pool.aclose()
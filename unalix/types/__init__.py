@@ -1,10 +1,13 @@
 from .objects import Dict, List
-from .patterns import Pattern, Patterns
+from .patterns import Pattern, Patterns, RulePattern, RedirectionPattern
+from .fields import FieldNames, FieldPattern, apply_query_filters, query_filters_match, query_filters_match_bytes
 from .rulesets import Ruleset, Rulesets
 from .body_redirects import BodyRedirect, BodyRedirects
 from .domains import Domains
+from .host_index import HostIndex
+from .lru_cache import LRUCache, CacheInfo
 from .responses import Response
-from .urls import URL, URL_TYPES
+from .urls import URL, MutableURL, URL_TYPES
 
 
 __all__ = [
@@ -12,13 +15,24 @@ __all__ = [
     "List",
     "Pattern",
     "Patterns",
+    "RulePattern",
+    "RedirectionPattern",
+    "FieldNames",
+    "FieldPattern",
+    "apply_query_filters",
+    "query_filters_match",
+    "query_filters_match_bytes",
     "Ruleset",
     "Rulesets",
     "BodyRedirect",
     "BodyRedirects",
     "Domains",
+    "HostIndex",
+    "LRUCache",
+    "CacheInfo",
     "Response",
     "URL",
+    "MutableURL",
     "URL_TYPES"
 ]
 
@@ -7,6 +7,13 @@ from .domains import Domains
 
 class BodyRedirect(Dict):
 
+    __slots__ = (
+        "providerName",
+        "urlPattern",
+        "domains",
+        "rules"
+    )
+
 
     def __init__(
         self,
@@ -24,6 +31,8 @@ class BodyRedirect(Dict):
 
 class BodyRedirects(List):
 
+    __slots__ = ()
+
 
     def add_ruleset(self, ruleset: BodyRedirect):
 
@@ -1,7 +1,57 @@
+import typing
+
 from .objects import List
 
 
 class Domains(List):
+    """
+    List of domain names that is also indexed by two sets, so lookups do not depend on the number of domains.
+
+    Domains starting with a dot (e.g. ".example.com") also match all of their subdomains, like the domain
+    attribute of cookies. Other domains only match themselves. Domain names are case-insensitive.
+    """
+
+    __slots__ = (
+        "hosts",
+        "suffixes"
+    )
+
+
+    def __init__(self, base_list: typing.Optional[typing.Iterable[str]] = None):
+
+        super().__init__()
+
+        self.hosts = set()
+        self.suffixes = set()
+
+        if base_list is not None:
+            for domain in base_list:
+                self.add_domain(domain)
+
+
+    def __contains__(self, item):
+
+        if not isinstance(item, str):
+            return False
+
+        item = item.lower()
+
+        if item.startswith("."):
+            return item[1:] in self.suffixes
+
+        return item in self.hosts
+
+
+    def append(self, item: str) -> None:
+
+        super().append(item)
+
+        item = item.lower()
+
+        if item.startswith("."):
+            self.suffixes.add(item[1:])
+        else:
+            self.hosts.add(item)
 
 
     def add_domain(self, domain: str) -> None:
@@ -9,3 +59,29 @@ class Domains(List):
         if domain not in self:
             self.append(domain)
 
+
+    def match(self, domain: str) -> bool:
+        """
+        Whether the given domain (e.g. the netloc of a URL or the domain attribute of a cookie) is one of
+        these domains or a subdomain of a domain starting with a dot. Takes one set lookup per label.
+        """
+
+        domain = domain.lower().strip(".")
+
+        if domain in self.hosts or domain in self.suffixes:
+            return True
+
+        suffixes = self.suffixes
+
+        if not suffixes:
+            return False
+
+        position = domain.find(".")
+
+        while position != -1:
+            if domain[position + 1:] in suffixes:
+                return True
+
+            position = domain.find(".", position + 1)
+
+        return False
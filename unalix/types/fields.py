@@ -0,0 +1,270 @@
+import re
+import typing
+
+from .patterns import Pattern
+
+
+# Everything up to the end of a field name ("=" or the start of "%3D")
+FIELD_NAME_END = re.compile(r"[^%=]*")
+
+
+class FieldNames:
+    """
+    Removes query fields whose names are literal strings in a single pass over the query.
+
+    Calling this object on a query gives the same result as running, for each name, the rule regex
+
+        (%(?:26|23)|&|^)NAME(?:(?:=|%3[Dd])[^&]*)
+
+    with re.sub(r"\\g<1>", query). Names in `prefixed_names` also match the "(?:%3F)?NAME" form.
+
+    Names must be non-empty and must not contain "%", "=" or "&". Under these conditions the
+    order in which the rules are applied does not matter, so a whole run of literal rules can
+    be replaced with a single FieldNames object.
+    """
+
+    __slots__ = (
+        "names",
+        "prefixed_names",
+        "encoded_names"
+    )
+
+
+    def __init__(
+        self,
+        names: typing.Optional[typing.Iterable[str]] = None,
+        prefixed_names: typing.Optional[typing.Iterable[str]] = None
+    ):
+        self.prefixed_names = frozenset(prefixed_names or ())
+        self.names = frozenset(names or ()) | self.prefixed_names
+        self.encoded_names = frozenset(name.encode("utf-8") for name in self.names)
+
+
+    def __bool__(self) -> bool:
+        return bool(self.names)
+
+
+    def __repr__(self) -> str:
+        return f"unalix.types.FieldNames({sorted(self.names - self.prefixed_names)!r}, {sorted(self.prefixed_names)!r})"
+
+
+    def find(self, field: str) -> typing.Optional[int]:
+        """
+        Return the position where the given field (a query part between two "&") should be cut,
+        or None if none of the names match it.
+        """
+
+        names = self.names
+
+        if "%" not in field:
+            # Fast path: the only place a name can start is the beginning of the field
+            name, separator, value = field.partition("=")
+            return 0 if separator and name in names else None
+
+        start = 0
+
+        while True:
+            if field.startswith("%3F", start):
+                end = FIELD_NAME_END.match(field, start + 3).end()
+                found = field[start + 3:end] in self.prefixed_names
+            else:
+                end = FIELD_NAME_END.match(field, start).end()
+                found = field[start:end] in names
+
+            if found and (field.startswith("=", end) or field.startswith(("%3D", "%3d"), end)):
+                return start
+
+            # Names can also start right after an encoded "&" (%26) or "#" (%23)
+            next_start = None
+
+            for delimiter in ("%26", "%23"):
+                index = field.find(delimiter, start)
+                if index != -1 and (next_start is None or index < next_start):
+                    next_start = index
+
+            if next_start is None:
+                return None
+
+            start = next_start + 3
+
+
+    def __call__(self, query: str) -> str:
+
+        fields = query.split("&")
+        changed = False
+
+        for index, field in enumerate(fields):
+            position = self.find(field)
+
+            if position is not None:
+                fields[index] = field[:position]
+                changed = True
+
+        return "&".join(fields) if changed else query
+
+
+    def matches(self, query: str) -> bool:
+        """
+        Check whether calling this object on the query would change it.
+        """
+
+        for field in query.split("&"):
+            if self.find(field) is not None:
+                return True
+
+        return False
+
+
+class FieldPattern:
+    """
+    Removes the query fields matched by a (non-literal) rule regex.
+
+    The regex only runs on queries containing one of `literals`, which defaults to the required
+    literal of the pattern. Patterns merged from several rules (see coreutils.merge_query_filters())
+    are given the literals of these rules.
+    """
+
+    __slots__ = (
+        "pattern",
+        "literals",
+        "literals_bytes"
+    )
+
+
+    def __init__(self, pattern: Pattern, literals: typing.Optional[typing.Iterable[str]] = None):
+        self.pattern = pattern
+        self.literals = (pattern.literal,) if literals is None else tuple(literals)
+        self.literals_bytes = tuple(literal.encode("utf-8") for literal in self.literals)
+
+
+    def __repr__(self) -> str:
+        return f"unalix.types.FieldPattern({str(self.pattern)!r})"
+
+
+    def may_match(self, query: str) -> bool:
+        """
+        Check whether the query contains one of the literals, which is required for the regex to match.
+        """
+
+        for literal in self.literals:
+            if literal in query:
+                return True
+
+        return False
+
+
+    def __call__(self, query: str) -> str:
+
+        if not self.may_match(query):
+            return query
+
+        return self.pattern.compiled.sub(r"\g<1>", query)
+
+
+    def matches(self, query: str) -> bool:
+        """
+        Check whether calling this object on the query would change it.
+        """
+
+        # A match always covers a separator after the name, so replacing it with the first group changes the query
+        return self.may_match(query) and self.pattern.compiled.search(query) is not None
+
+
+    def matches_bytes(self, query: bytes) -> bool:
+        """
+        Same as matches(), for an ASCII query given as bytes.
+        """
+
+        for literal in self.literals_bytes:
+            if literal in query:
+                break
+        else:
+            return False
+
+        compiled = self.pattern.compiled_bytes
+
+        if compiled is None:
+            return self.matches(query.decode("ascii"))
+
+        return compiled.search(query) is not None
+
+
+def apply_query_filters(query_filters: typing.Sequence[typing.Callable[[str], str]], query: str) -> str:
+    """
+    Run the given query filters (FieldNames and FieldPattern objects) on the query, in order.
+
+    When the query has no "%" in it, field names can only start at the beginning of a field,
+    so the names present in the query are collected once and FieldNames objects that share
+    none of them are skipped.
+    """
+
+    if "%" in query:
+        for query_filter in query_filters:
+            query = query_filter(query)
+
+        return query
+
+    present = None
+
+    for query_filter in query_filters:
+        if query_filter.__class__ is FieldNames:
+            if present is None:
+                present = {field.partition("=")[0] for field in query.split("&")}
+
+            if present.isdisjoint(query_filter.names):
+                continue
+
+        result = query_filter(query)
+
+        if result != query:
+            query = result
+            present = None
+
+    return query
+
+
+def query_filters_match(query_filters: typing.Sequence[typing.Callable[[str], str]], query: str) -> bool:
+    """
+    Check whether apply_query_filters() would change the given query.
+    """
+
+    present = None
+
+    if "%" not in query:
+        present = {field.partition("=")[0] for field in query.split("&")}
+
+    # Filters run on the output of the previous ones, but until one of them matches, that is the query itself
+    for query_filter in query_filters:
+        if query_filter.__class__ is FieldNames:
+            if present is not None and present.isdisjoint(query_filter.names):
+                continue
+        elif not query_filter.may_match(query):
+            continue
+
+        if query_filter.matches(query):
+            return True
+
+    return False
+
+
+def query_filters_match_bytes(query_filters: typing.Sequence[typing.Callable[[str], str]], query: bytes) -> bool:
+    """
+    Same as query_filters_match(), for an ASCII query given as bytes.
+    """
+
+    if b"%" in query:
+        return query_filters_match(query_filters, query.decode("ascii"))
+
+    # Without "%", a name can only match the whole name of a field that has a value
+    present = {
+        name for name, separator, value in (field.partition(b"=") for field in query.split(b"&")) if separator
+    }
+
+    for query_filter in query_filters:
+        if query_filter.__class__ is FieldNames:
+            if not present.isdisjoint(query_filter.encoded_names):
+                return True
+        elif query_filter.matches_bytes(query):
+            return True
+
+    return False
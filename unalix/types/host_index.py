@@ -0,0 +1,50 @@
+import typing
+
+from .objects import Dict
+
+
+class HostIndex(Dict):
+
+    __slots__ = (
+        "labels",
+        "fallback"
+    )
+
+
+    def __init__(
+        self,
+        labels: typing.Optional[typing.Dict[str, typing.List[int]]] = None,
+        fallback: typing.Optional[typing.List[int]] = None
+    ):
+        self.labels = labels if labels is not None else {}
+        self.fallback = fallback if fallback is not None else []
+
+
+    def add_position(self, position: int, label: typing.Optional[str] = None) -> None:
+
+        if label is None:
+            self.fallback.append(position)
+        else:
+            self.labels.setdefault(label, []).append(position)
+
+
+    def lookup(self, netloc: str) -> typing.List[int]:
+
+        positions = None
+
+        for label in netloc.split("."):
+            found = self.labels.get(label)
+
+            if found is None:
+                continue
+
+            if positions is None:
+                positions = set(self.fallback)
+
+            positions.update(found)
+
+        # Positions are appended in ascending order, so the fallback bucket is already sorted
+        if positions is None:
+            return self.fallback
+
+        return sorted(positions)
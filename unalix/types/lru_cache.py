@@ -0,0 +1,178 @@
+import collections
+import sys
+import threading
+import typing
+
+
+CacheInfo = collections.namedtuple(
+    "CacheInfo",
+    ("hits", "misses", "maxsize", "currsize", "bytes", "maxbytes")
+)
+
+
+def estimate_size(value: typing.Any) -> int:
+    """
+    Return the number of bytes used by the strings in the given value (a string or a tuple holding strings).
+
+    Other objects (e.g. the option sets used in cache keys) are shared between entries and are not counted.
+    """
+
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+
+    if isinstance(value, tuple):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+
+    return 0
+
+
+class LRUCache:
+    """
+    A thread-safe cache that evicts the least recently used entries once it holds more than `max_entries`
+    entries or more than `max_bytes` bytes (see estimate_size()). Pass None for no limit.
+
+    Usage example:
+
+        >>> import unalix
+        >>>
+        >>> cache = unalix.types.LRUCache(max_entries=10000, max_bytes=16 * 1024 * 1024)
+        >>> cleaner = unalix.Cleaner(cache=cache)
+        >>>
+        >>> cleaner.clear("https://deezer.com/track/891177062?utm_source=deezer")
+        'https://deezer.com/track/891177062'
+        >>> cleaner.clear("https://deezer.com/track/891177062?utm_source=deezer")
+        'https://deezer.com/track/891177062'
+        >>> cache.cache_info()
+        CacheInfo(hits=1, misses=1, maxsize=10000, currsize=1, bytes=240, maxbytes=16777216)
+    """
+
+    __slots__ = (
+        "max_entries",
+        "max_bytes",
+        "entries",
+        "size",
+        "hits",
+        "misses",
+        "lock"
+    )
+
+
+    def __init__(
+        self,
+        max_entries: typing.Optional[int] = 4096,
+        max_bytes: typing.Optional[int] = None
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.entries = collections.OrderedDict()
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        self.lock = threading.Lock()
+
+
+    def __repr__(self) -> str:
+        return f"unalix.types.LRUCache(max_entries={self.max_entries!r}, max_bytes={self.max_bytes!r})"
+
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+    def __contains__(self, key: typing.Hashable) -> bool:
+        return key in self.entries
+
+
+    def get(self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+
+        with self.lock:
+            try:
+                value, size = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+
+        return value
+
+
+    def put(self, key: typing.Hashable, value: typing.Any) -> None:
+
+        size = estimate_size(key) + estimate_size(value)
+
+        # Entries that could never fit are not stored (and don't evict anything)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        if self.max_entries is not None and self.max_entries < 1:
+            return
+
+        with self.lock:
+            entries = self.entries
+
+            previous = entries.pop(key, None)
+
+            if previous is not None:
+                self.size -= previous[1]
+
+            entries[key] = (value, size)
+            self.size += size
+
+            while (
+                (self.max_entries is not None and len(entries) > self.max_entries) or
+                (self.max_bytes is not None and self.size > self.max_bytes)
+            ):
+                evicted_value, evicted_size = entries.popitem(last=False)[1]
+                self.size -= evicted_size
+
+
+    def evict(self, predicate: typing.Callable[[typing.Any], bool]) -> int:
+        """
+        Remove the entries whose value matches the given predicate, and return how many were removed.
+        """
+
+        with self.lock:
+            entries = self.entries
+
+            keys = [key for key, (value, size) in entries.items() if predicate(value)]
+
+            for key in keys:
+                self.size -= entries.pop(key)[1]
+
+        return len(keys)
+
+
+    def items(self) -> typing.List[typing.Tuple[typing.Hashable, typing.Any]]:
+        """
+        Return a list of the (key, value) pairs, from the least to the most recently used.
+        """
+
+        with self.lock:
+            return [(key, value) for key, (value, size) in self.entries.items()]
+
+
+    def clear(self) -> None:
+
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+
+
+    def cache_info(self) -> CacheInfo:
+
+        with self.lock:
+            return CacheInfo(
+                hits=self.hits,
+                misses=self.misses,
+                maxsize=self.max_entries,
+                currsize=len(self.entries),
+                bytes=self.size,
+                maxbytes=self.max_bytes
+            )
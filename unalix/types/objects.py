@@ -13,6 +13,8 @@ class MetaClass(type, metaclass=type("", (type,), {"__str__": lambda _: "~hi"}))
 # https://github.com/pyrogram/pyrogram/blob/v1.1.0/pyrogram/types/object.py#L31
 class BaseClass(metaclass=MetaClass):
 
+    __slots__ = ()
+
 
     def __str__(self):
 
@@ -25,41 +27,39 @@ class BaseClass(metaclass=MetaClass):
 
 
 class Dict(BaseClass):
+    """
+    Base class for objects that behave like dicts, whose keys are the arguments of their __init__().
 
+    The names of these arguments are looked up once for each class (see __init_subclass__()) and kept
+    in the "fields" class attribute.
+    """
+
+    __slots__ = ()
+
+    fields = ()
 
-    def __iter__(self):
 
-        iterables = {}
+    def __init_subclass__(cls, **kwargs):
 
-        code = self.__init__.__code__
-        arguments = inspect.getargs(code).args
+        super().__init_subclass__(**kwargs)
 
-        arguments.remove("self")
+        arguments = inspect.getargs(cls.__init__.__code__).args
+
+        cls.fields = tuple(argument for argument in arguments if argument != "self")
+
+
+    def __iter__(self):
+
+        for argument in self.fields:
 
-        for argument in arguments:
-            
             attribute = getattr(self, argument)
-            
+
             if isinstance(attribute, List):
-                iterables.update(
-                    {
-                        argument: list(attribute)
-                    }
-                )
+                yield (argument, list(attribute))
             elif isinstance(attribute, Dict):
-                iterables.update(
-                    {
-                        argument: dict(attribute)
-                    }
-                )
+                yield (argument, dict(attribute))
             else:
-                iterables.update(
-                    {
-                        argument: attribute
-                    }
-                )
-
-        yield from iterables.items()
+                yield (argument, attribute)
 
 
     def __getitem__(self, item):
@@ -76,19 +76,14 @@ class Dict(BaseClass):
 
     def __repr__(self):
 
-        code = self.__init__.__code__
-        arguments = inspect.getargs(code).args
-
-        arguments.remove("self")
-
         data = []
 
-        for argument in arguments:
-            
+        for argument in self.fields:
+
             attribute = getattr(self, argument)
-            
+
             if isinstance(attribute, List):
-                data.append(f"{argument}={attribute.__class__.__name__}({repr(attribute.base_list)})")
+                data.append(f"{argument}={attribute.__class__.__name__}({repr(list(attribute.base_list))})")
             else:
                 data.append(f"{argument}={repr(attribute)}")
 
@@ -102,32 +97,29 @@ class Dict(BaseClass):
 
         serialized_object = {}
 
-        code = obj.__init__.__code__
-        arguments = inspect.getargs(code).args
-
-        arguments.remove("self")
-
-        for argument in arguments:
+        for argument in obj.fields:
 
             attribute = getattr(obj, argument)
 
             if isinstance(attribute, List):
-                serialized_object.update(
-                    {
-                        argument: list(attribute)
-                    }
-                )
+                serialized_object[argument] = list(attribute)
             else:
-                serialized_object.update(
-                    {
-                        argument: attribute
-                    }
-                )
+                serialized_object[argument] = attribute
 
         return serialized_object
 
 
 class List(BaseClass):
+    """
+    Base class for list-like objects holding their items in "base_list".
+
+    Lists are built by appending items to them. Once built, freeze() turns "base_list" into a tuple,
+    which uses less memory and can no longer be modified.
+    """
+
+    __slots__ = (
+        "base_list",
+    )
 
 
     def __init__(self, base_list=None):
@@ -140,17 +132,21 @@ class List(BaseClass):
 
     def __iter__(self):
 
-        iterable = []
-
         for item in self.base_list:
             if isinstance(item, Dict):
-                iterable.append(dict(item))
+                yield dict(item)
             elif isinstance(item, (str, int, float, bool, type(None))):
-                iterable.append(item)
+                yield item
             else:
                 raise TypeError
 
-        return iter(iterable)
+
+    def __contains__(self, item):
+
+        if isinstance(item, dict):
+            return any(item == value for value in self)
+
+        return item in self.base_list
 
 
     def __getitem__(self, item):
@@ -165,6 +161,10 @@ class List(BaseClass):
         self.base_list.append(item)
 
 
+    def freeze(self):
+        self.base_list = tuple(self.base_list)
+
+
     def iter(self):
         return iter(self.base_list)
 
@@ -176,7 +176,7 @@ class List(BaseClass):
     def __repr__(self):
 
         class_name = self.__class__.__name__
-        representation = repr(self.base_list)
+        representation = repr(list(self.base_list))
 
         return f"unalix.types.{class_name}({representation})"
 
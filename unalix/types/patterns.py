@@ -1,10 +1,84 @@
+import re
+
 from .objects import Dict, List
 
 
 # Generic patterns
 class Pattern(str):
-    pass
+    """
+    A regex pattern, compiled on first access to its "compiled" attribute.
+
+    The compiled regex is built from the "source" attribute when present (e.g. rules are
+    wrapped in a larger expression, see RulePattern), otherwise from the pattern itself.
+
+    The "literal" attribute holds a string that any match of the regex contains (empty when
+    unknown), so that the regex can be skipped for texts without it. Likewise, "host_label" is
+    set for URL patterns that can only match hosts containing that label.
+
+    "compiled_bytes" and "literal_bytes" are the same for matching ASCII bytes. "compiled_bytes"
+    is None for the few patterns that have no bytes equivalent (e.g. non-ASCII character ranges).
+    """
+
+    literal = ""
+    host_label = None
+
+
+    def __getattr__(self, name):
+
+        if name == "compiled":
+            compiled = re.compile(getattr(self, "source", self))
+        elif name == "compiled_bytes":
+            try:
+                compiled = re.compile(str(getattr(self, "source", self)).encode("utf-8"))
+            except re.error:
+                compiled = None
+        elif name == "literal_bytes":
+            compiled = self.literal.encode("utf-8")
+        else:
+            raise AttributeError(name)
+
+        setattr(self, name, compiled)
+
+        return compiled
+
+
+    def __getstate__(self):
+
+        # Compiled regexes are rebuilt on demand, there is no point in serializing them
+        state = dict(self.__dict__)
+
+        for name in ("compiled", "compiled_bytes", "literal_bytes"):
+            state.pop(name, None)
+
+        return state
+
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+
+class RulePattern(Pattern):
+    """
+    A rule (or referralMarketing) pattern, which matches whole query fields.
+
+    The source is built from the pattern when needed rather than stored in each instance.
+    """
+
+    @property
+    def source(self):
+        return rf"(%(?:26|23)|&|^){self}(?:(?:=|%3[Dd])[^&]*)"
+
+
+class RedirectionPattern(Pattern):
+    """
+    A redirection pattern, which matches up to the end of the URL.
+    """
+
+    @property
+    def source(self):
+        return f"{self}.*"
 
 
 class Patterns(List):
-    pass
+
+    __slots__ = ()
@@ -2,6 +2,14 @@ from .objects import Dict
 
 class Response(Dict):
 
+    __slots__ = (
+        "http_version",
+        "status_code",
+        "status_message",
+        "headers",
+        "body"
+    )
+
     def __init__(
         self,
         http_version,
@@ -1,9 +1,26 @@
+import typing
+
 from .objects import Dict, List
 from .patterns import Pattern, Patterns
+from .host_index import HostIndex
 
 
 class Ruleset(Dict):
 
+    __slots__ = (
+        "providerName",
+        "urlPattern",
+        "completeProvider",
+        "rules",
+        "rawRules",
+        "referralMarketing",
+        "exceptions",
+        "redirections",
+        "forceRedirection",
+        "rulesFilters",
+        "referralMarketingFilters"
+    )
+
 
     def __init__(
         self,
@@ -27,11 +44,27 @@ class Ruleset(Dict):
         self.redirections = redirections
         self.forceRedirection = forceRedirection
 
+        # Callables applied in order to the query and fragment, built from "rules" and
+        # "referralMarketing" at load time (see coreutils.query_filters_from_patterns())
+        self.rulesFilters = []
+        self.referralMarketingFilters = []
+
 
 class Rulesets(List):
 
+    __slots__ = (
+        "host_index",
+    )
 
-    def add_ruleset(self, ruleset: Ruleset):
 
-        self.base_list.append(ruleset)
+    def __init__(self, base_list=None):
+
+        super().__init__(base_list)
 
+        self.host_index = HostIndex()
+
+
+    def add_ruleset(self, ruleset: Ruleset, host_label: typing.Optional[str] = None):
+
+        self.host_index.add_position(len(self.base_list), host_label)
+        self.base_list.append(ruleset)
@@ -1,65 +1,110 @@
+import typing
 import urllib.parse
 import ipaddress
 
 
-class URL(str):
+def split_url(url: str) -> typing.Tuple[str, str, typing.Optional[int], str, str, str, str]:
+    """
+    Split the given URL into (scheme, netloc, port, path, params, query, fragment).
 
+    The port is removed from the netloc and defaults to 80/443 for HTTP/HTTPS URLs.
+    """
 
-    def __init__(self, url):
+    (
+        scheme, netloc, path,
+        params, query, fragment
+    ) = urllib.parse.urlparse(url)
 
-        self.url = url
+    port = None
 
-        (
-            self.scheme, self.netloc, self.path,
-            self.params, self.query, self.fragment
-        ) = urllib.parse.urlparse(url)
+    if netloc.startswith("["):
+        # The port comes after the IPv6 literal ("[::1]:8080")
+        host, separator, part = netloc.rpartition(":")
 
-        self.port = None
+        if separator and "]" not in part:
+            netloc = host
+        else:
+            part = ""
+    else:
+        parts = netloc.split(sep=":")
+        netloc, part = parts[0], (parts[-1] if len(parts) > 1 else "")
 
-        parts = self.netloc.split(sep=":")
+    if part.isnumeric():
+        port = int(part)
 
-        if len(parts) > 1:
-            part = parts[-1]
-            if part.isnumeric():
-                self.port = int(part)
+    if port is None:
+        if scheme == "http":
+            port = 80
+        elif scheme == "https":
+            port = 443
 
-        if self.port is None:
-            if self.scheme == "http":
-                self.port = 80
-            elif self.scheme == "https":
-                self.port = 443
+    return (scheme, netloc, port, path, params, query, fragment)
 
-        self.netloc = parts[0]
 
+def unsplit_url(
+    scheme: str,
+    netloc: str,
+    port: typing.Optional[int],
+    path: str,
+    params: str,
+    query: str,
+    fragment: str
+) -> str:
 
-    def islocal(self) -> bool:
+    if port is not None and port not in (80, 443):
+        netloc = f"{netloc}:{port}"
 
-        local_domains = (
-            "localhost",
-            "localhost.localdomain",
-            "ip6-localhost",
-            "ip6-loopback"
-        )
+    return urllib.parse.urlunparse((
+        scheme, netloc, path,
+        params, query, fragment
+    ))
 
-        try:
-            address = ipaddress.ip_address(self.netloc)
-        except ValueError:
-            return True if self.netloc in local_domains else False
-        else:
-            return True if address.is_private else False
 
+def is_local_host(netloc: str) -> bool:
 
-    def geturl(self):
+    local_domains = (
+        "localhost",
+        "localhost.localdomain",
+        "ip6-localhost",
+        "ip6-loopback"
+    )
 
-        if self.port is not None and self.port not in (80, 443):
-            netloc = f"{self.netloc}:{self.port}"
-        else:
-            netloc = self.netloc
+    # IPv6 literals are kept in brackets
+    if netloc.startswith("[") and netloc.endswith("]"):
+        netloc = netloc[1:-1]
+
+    try:
+        address = ipaddress.ip_address(netloc)
+    except ValueError:
+        return True if netloc in local_domains else False
+    else:
+        return True if address.is_private else False
+
+
+class URL(str):
+
+
+    def __init__(self, url):
+
+        self.url = url
 
-        return urllib.parse.urlunparse((
-            self.scheme, netloc, self.path,
+        (
+            self.scheme, self.netloc, self.port, self.path,
             self.params, self.query, self.fragment
-        ))
+        ) = split_url(url)
+
+
+    def islocal(self) -> bool:
+
+        return is_local_host(self.netloc)
+
+
+    def geturl(self):
+
+        return unsplit_url(
+            self.scheme, self.netloc, self.port, self.path,
+            self.params, self.query, self.fragment
+        )
 
 
     # https://github.com/psf/requests/blob/2c2138e811487b13020eb331482fb991fd399d4e/requests/utils.py#L903
@@ -78,4 +123,97 @@ class URL(str):
         )
 
 
-URL_TYPES = (URL, urllib.parse.ParseResult)
+class MutableURL:
+    """
+    A parsed URL whose path, query and fragment can be modified in place.
+
+    The serialized form is built on demand and cached until one of these components changes,
+    so components that were never touched keep their original strings.
+    """
+
+    __slots__ = (
+        "scheme",
+        "netloc",
+        "port",
+        "params",
+        "_path",
+        "_query",
+        "_fragment",
+        "_url"
+    )
+
+
+    def __init__(self, url: str):
+
+        (
+            self.scheme, self.netloc, self.port, self._path,
+            self.params, self._query, self._fragment
+        ) = split_url(url)
+
+        self._url = None
+
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+
+    @path.setter
+    def path(self, value: str) -> None:
+
+        if value != self._path:
+            self._path = value
+            self._url = None
+
+
+    @property
+    def query(self) -> str:
+        return self._query
+
+
+    @query.setter
+    def query(self, value: str) -> None:
+
+        if value != self._query:
+            self._query = value
+            self._url = None
+
+
+    @property
+    def fragment(self) -> str:
+        return self._fragment
+
+
+    @fragment.setter
+    def fragment(self, value: str) -> None:
+
+        if value != self._fragment:
+            self._fragment = value
+            self._url = None
+
+
+    def islocal(self) -> bool:
+
+        return is_local_host(self.netloc)
+
+
+    def geturl(self) -> str:
+
+        if self._url is None:
+            self._url = unsplit_url(
+                self.scheme, self.netloc, self.port, self._path,
+                self.params, self._query, self._fragment
+            )
+
+        return self._url
+
+
+    def __str__(self) -> str:
+        return self.geturl()
+
+
+    def __repr__(self) -> str:
+        return f"unalix.types.MutableURL({self.geturl()!r})"
+
+
+URL_TYPES = (URL, MutableURL, urllib.parse.ParseResult)
@@ -1,13 +1,15 @@
 from .http import (
     requote_uri,
     get_encoding_from_headers,
-    filter_query
+    filter_query,
+    is_filtered_query
 )
 
 __all__ = [
     "requote_uri",
     "get_encoding_from_headers",
-    "filter_query"
+    "filter_query",
+    "is_filtered_query"
 ]
 
 __locals = locals()
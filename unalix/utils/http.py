@@ -131,3 +131,36 @@ def filter_query(
         names.append(key)
 
     return "&".join(params)
+
+
+def is_filtered_query(
+    query: bytes,
+    stripEmpty: typing.Optional[bool] = False,
+    stripDuplicates: typing.Optional[bool] = False
+) -> bool:
+    """
+    Check whether filter_query() would return the given (ASCII) query unchanged, without decoding it.
+    """
+
+    names = set()
+
+    for param in query.split(b"&"):
+        if not param:
+            return False
+
+        key, separator, value = param.partition(b"=")
+
+        # Extra "=" and "?" are escaped
+        if b"=" in value or b"?" in value:
+            return False
+
+        if stripEmpty and not value:
+            return False
+
+        if stripDuplicates:
+            if key in names:
+                return False
+
+            names.add(key)
+
+    return True